@@ -0,0 +1,117 @@
+#!/usr/bin/python
+import os.path
+import sys
+import time
+import tempfile
+
+import usdStageWithObj
+
+
+def writeTestObj(filename, size):
+    # grid of quads with UVs and normals, split to groups with materials and comments
+    rows = []
+    width = 1000
+    for y in range(width):
+        for x in range(width):
+            rows.append('v %f %f %f\n' % (x * 0.01, y * 0.01, 0.0))
+    block = ''.join(rows)
+    uvs = ''.join('vt %f %f\n' % (x * 0.001, x * 0.001) for x in range(width))
+    normals = 'vn 0 0 1\n'
+    written = 0
+    groupIdx = 0
+    with open(filename, 'w') as file:
+        while written < size:
+            faces = []
+            for x in range(1, width):
+                faces.append('f %d/%d/1 %d/%d/1 %d/%d/1 %d/%d/1\n' % (x, x, x + 1, x + 1, x + width + 1, x + 1, x + width, x))
+            text = ('# group %d\ng group%d\nusemtl mat#%d\n' % (groupIdx, groupIdx, groupIdx % 8) +
+                block + uvs + normals + ''.join(faces) * 100)
+            file.write(text)
+            written += len(text)
+            groupIdx += 1
+
+
+def linesContinuation(fileHandle):
+    # text mode reader used before binary reader
+    for line in fileHandle:
+        line = line.rstrip('\n')
+        line = line.rstrip()
+        while line.endswith('\\'):
+            thisLine = line[:-1]
+            nextLine = next(fileHandle).rstrip('\n')
+            nextLine = nextLine.strip()
+            line = thisLine + ' ' + nextLine
+        yield line
+
+
+def readOld(filename):
+    commands = 0
+    with open(filename) as file:
+        for line in linesContinuation(file):
+            line = line.strip()
+            if not line or '#' == line[0]:
+                continue
+            arguments = list(filter(None, line.split(' ')))
+            commands += len(arguments[0]) > 0
+    return commands
+
+
+def readNew(filename):
+    commands = 0
+    with open(filename, 'rb') as file:
+        for line in usdStageWithObj.binaryLinesContinuation(file):
+            arguments = line.split()
+            commands += len(arguments[0]) > 0
+    return commands
+
+
+def measure(name, function, filename):
+    start = time.time()
+    commands = function(filename)
+    seconds = time.time() - start
+    size = os.path.getsize(filename) / (1024.0 * 1024.0)
+    print('%-4s %8.2f sec %8.1f MB/sec %12d lines' % (name, seconds, size / seconds, commands))
+    return seconds
+
+
+def printUsage():
+    print('usage: benchmarkObjReader [-size MB] [file.obj]\n\
+\n\
+Compares reading of OBJ lines by text mode reader and by binary reader.\n\
+  -size MB      Size of generated OBJ file, when file is not given. Default is 1024.')
+
+
+def main(argumentList):
+    size = 1024
+    filename = ''
+    argumentIndex = 0
+    while argumentIndex < len(argumentList):
+        argument = argumentList[argumentIndex]
+        argumentIndex += 1
+        if argument == '-size' and argumentIndex < len(argumentList):
+            size = float(argumentList[argumentIndex])
+            argumentIndex += 1
+        elif argument == '-h' or argument == '--help':
+            printUsage()
+            return 0
+        else:
+            filename = argument
+
+    generated = not filename
+    if generated:
+        handle, filename = tempfile.mkstemp(suffix='.obj')
+        os.close(handle)
+        print('Generating ' + str(size) + ' MB OBJ file: ' + filename)
+        writeTestObj(filename, size * 1024 * 1024)
+    try:
+        oldSeconds = measure('old', readOld, filename)
+        newSeconds = measure('new', readNew, filename)
+        print('speedup: %.2fx' % (oldSeconds / newSeconds))
+    finally:
+        if generated:
+            os.remove(filename)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
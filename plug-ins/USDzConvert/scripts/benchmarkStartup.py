@@ -0,0 +1,106 @@
+#!/usr/bin/python
+import os.path
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+
+
+def writeTestUsd(filename):
+    # small asset, startup time dominates its conversion time
+    with open(filename, 'w') as file:
+        file.write('#usda 1.0\n(\n    defaultPrim = "model"\n    metersPerUnit = 1\n    upAxis = "Y"\n)\n\n')
+        file.write('def Xform "model"\n{\n    def Mesh "quad"\n    {\n')
+        file.write('        int[] faceVertexCounts = [4]\n        int[] faceVertexIndices = [0, 1, 2, 3]\n')
+        file.write('        point3f[] points = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0)]\n')
+        file.write('    }\n}\n')
+
+
+def runChild(filename, folder):
+    # runs in new interpreter, prints import time and times of two conversions
+    scriptFolder = os.path.dirname(os.path.realpath(__file__))
+    sys.path.insert(0, scriptFolder)
+    start = time.time()
+    import usdzconvert
+    importSeconds = time.time() - start
+
+    seconds = []
+    for conversionIdx in range(2):
+        start = time.time()
+        usdzconvert.tryProcess([filename, os.path.join(folder, 'output' + str(conversionIdx) + '.usdz')])
+        seconds.append(time.time() - start)
+    print('times: %f %f %f' % (importSeconds, seconds[0], seconds[1]))
+    return 0
+
+
+def measureRun(filename, folder):
+    # returns import, first and second conversion times, and time of usdzconvert command
+    output = subprocess.check_output([sys.executable, os.path.realpath(__file__), '-child', filename, folder], stderr=subprocess.STDOUT)
+    lines = [line for line in output.decode('utf-8', 'replace').splitlines() if line.startswith('times: ')]
+    if len(lines) == 0:
+        raise RuntimeError('benchmark process failed:\n' + output.decode('utf-8', 'replace'))
+    times = [float(value) for value in lines[-1].split()[1:]]
+
+    scriptPath = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usdzconvert.py')
+    start = time.time()
+    subprocess.check_output([sys.executable, scriptPath, filename, os.path.join(folder, 'command.usdz')], stderr=subprocess.STDOUT)
+    times.append(time.time() - start)
+    return times
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def printUsage():
+    print('usage: benchmarkStartup [-runs count] [file]\n\
+\n\
+Measures startup of usdzconvert in new processes: module import, first and\n\
+second conversion in the same process, and the whole usdzconvert command.\n\
+  -runs count   Number of measured processes. Default is 10.\n\
+  file          Input file. Default is generated small .usda file.')
+
+
+def main(argumentList):
+    if len(argumentList) == 3 and argumentList[0] == '-child':
+        return runChild(argumentList[1], argumentList[2])
+
+    runs = 10
+    filename = ''
+    argumentIndex = 0
+    while argumentIndex < len(argumentList):
+        argument = argumentList[argumentIndex]
+        argumentIndex += 1
+        if argument == '-runs' and argumentIndex < len(argumentList):
+            runs = int(argumentList[argumentIndex])
+            argumentIndex += 1
+        elif argument == '-h' or argument == '--help':
+            printUsage()
+            return 0
+        else:
+            filename = os.path.abspath(argument)
+
+    folder = tempfile.mkdtemp('benchmarkStartup')
+    try:
+        if not filename:
+            filename = os.path.join(folder, 'model.usda')
+            writeTestUsd(filename)
+        rows = [measureRun(filename, folder) for run in range(runs)]
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    names = ['import', 'first conversion', 'second conversion', 'usdzconvert command']
+    print('%-20s %8s %8s' % ('', 'min', 'median'))
+    for columnIdx in range(len(names)):
+        values = [row[columnIdx] for row in rows]
+        print('%-20s %8.3f %8.3f sec' % (names[columnIdx], min(values), median(values)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
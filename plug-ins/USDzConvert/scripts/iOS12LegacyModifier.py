@@ -1,7 +1,7 @@
 import os.path
 from shutil import copyfile
 import imp
-from pxr import *
+from pxr import Gf, UsdSkel
 
 import usdUtils
 
@@ -0,0 +1,134 @@
+import os.path
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import numpy
+    import usdStageWithFbx
+except (ImportError, SyntaxError):
+    # FBX converter needs pxr, numpy and Python 2
+    usdStageWithFbx = None
+
+
+
+class StubVector:
+    # FBX vector without sequence protocol, its components are read by index
+    def __init__(self, *components):
+        self.components = components
+
+
+    def __getitem__(self, index):
+        return self.components[index]
+
+
+
+class StubArray:
+    def __init__(self, elements):
+        self.elements = elements
+
+
+    def GetCount(self):
+        return len(self.elements)
+
+
+    def GetAt(self, index):
+        return self.elements[index]
+
+
+
+class StubMesh:
+    # FbxMesh accessors used by mesh helpers
+    def __init__(self, polygons, controlPoints):
+        self.polygons = polygons
+        self.controlPoints = controlPoints
+
+
+    def GetPolygonCount(self):
+        return len(self.polygons)
+
+
+    def GetPolygonSize(self, polygonIndex):
+        return len(self.polygons[polygonIndex])
+
+
+    def GetPolygonVertices(self):
+        return [index for polygon in self.polygons for index in polygon]
+
+
+    def IsTriangleMesh(self):
+        return all(len(polygon) == 3 for polygon in self.polygons)
+
+
+    def GetControlPoints(self):
+        return self.controlPoints
+
+
+
+@unittest.skipIf(usdStageWithFbx is None, 'usdStageWithFbx is not available')
+class FbxMeshHelpersTest(unittest.TestCase):
+    def testTopologyOfMixedPolygons(self):
+        mesh = StubMesh([[0, 1, 2, 3], [3, 2, 4]], [])
+        faceVertexCounts, faceVertexIndices = usdStageWithFbx.getMeshTopology(mesh)
+        self.assertEqual(list(faceVertexCounts), [4, 3])
+        self.assertEqual(list(faceVertexIndices), [0, 1, 2, 3, 3, 2, 4])
+
+
+    def testTopologyOfTriangles(self):
+        mesh = StubMesh([[0, 1, 2], [2, 1, 3]], [])
+        faceVertexCounts, faceVertexIndices = usdStageWithFbx.getMeshTopology(mesh)
+        self.assertEqual(list(faceVertexCounts), [3, 3])
+        self.assertEqual(list(faceVertexIndices), [0, 1, 2, 2, 1, 3])
+
+
+    def testTopologyOfEmptyMesh(self):
+        faceVertexCounts, faceVertexIndices = usdStageWithFbx.getMeshTopology(StubMesh([], []))
+        self.assertEqual(len(faceVertexCounts), 0)
+        self.assertEqual(len(faceVertexIndices), 0)
+
+
+    def testControlPoints(self):
+        # homogeneous coordinate of FbxVector4 is dropped
+        mesh = StubMesh([], [(1.0, 2.0, 3.0, 1.0), (4.0, 5.0, 6.0, 1.0)])
+        points = usdStageWithFbx.getControlPoints(mesh)
+        self.assertEqual(points.shape, (2, 3))
+        self.assertEqual(points.dtype, numpy.float32)
+        self.assertEqual(points.tolist(), [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+
+
+    def testControlPointsWithoutSequenceProtocol(self):
+        mesh = StubMesh([], [StubVector(1.0, 2.0, 3.0, 1.0), StubVector(4.0, 5.0, 6.0, 1.0)])
+        points = usdStageWithFbx.getControlPoints(mesh)
+        self.assertEqual(points.tolist(), [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+
+
+    def testEmptyControlPoints(self):
+        self.assertEqual(usdStageWithFbx.getControlPoints(StubMesh([], [])).shape, (0, 3))
+
+
+    def testLayerElementVectors(self):
+        uvs = usdStageWithFbx.getFbxVectors(usdStageWithFbx.getFbxArrayElements(StubArray([(0.5, 0.25), (1.0, 0.0)])), 2)
+        self.assertEqual(uvs.tolist(), [[0.5, 0.25], [1.0, 0.0]])
+
+
+    def testLayerElementIndices(self):
+        indexArray = usdStageWithFbx.getFbxArrayElements(StubArray([2, 0, 1, 1, 5]))
+        self.assertEqual(list(usdStageWithFbx.getLayerElementIndices(indexArray, 4)), [2, 0, 1, 1])
+        self.assertIsNone(usdStageWithFbx.getLayerElementIndices(None, 4))
+
+
+    def testMaterialSubsets(self):
+        # faces keep their order, faces with invalid material indices are skipped
+        subsets = usdStageWithFbx.getMaterialSubsets([1, 0, 1, -1, 2, 0, 7], 3)
+        self.assertEqual([list(subset) for subset in subsets], [[1, 5], [0, 2], [4]])
+
+
+    def testMaterialSubsetsWithUnusedMaterial(self):
+        subsets = usdStageWithFbx.getMaterialSubsets([0, 0], 2)
+        self.assertEqual([list(subset) for subset in subsets], [[0, 1], []])
+
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import os.path
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import usdzconvert
+    if not usdzconvert.usdLibLoaded:
+        usdzconvert = None
+except ImportError:
+    # conversion needs pxr
+    usdzconvert = None
+
+try:
+    import usdStageWithObj
+except (ImportError, SyntaxError):
+    # OBJ converter needs pxr and Python 2
+    usdStageWithObj = None
+
+
+
+class Log:
+    # log file object of one conversion
+    def __init__(self):
+        self.lines = []
+
+
+    def write(self, text):
+        self.lines.append(text)
+
+
+    def flush(self):
+        pass
+
+
+    def getText(self):
+        return ''.join(self.lines)
+
+
+
+def writeUsdInput(folder, index):
+    # mesh size and name depend on index
+    with open(os.path.join(folder, 'model.usda'), 'w') as file:
+        file.write('#usda 1.0\n(\n    defaultPrim = "model"\n    metersPerUnit = 1\n    upAxis = "Y"\n)\n\n')
+        file.write('def Xform "model"\n{\n    def Mesh "part' + str(index) + '"\n    {\n')
+        file.write('        int[] faceVertexCounts = [4]\n        int[] faceVertexIndices = [0, 1, 2, 3]\n')
+        size = index + 1
+        file.write('        point3f[] points = [(0, 0, 0), (%d, 0, 0), (%d, %d, 0), (0, %d, 0)]\n' % (size, size, size, size))
+        file.write('    }\n}\n')
+
+
+def writeObjInput(folder, index):
+    # OBJ file with MTL library, its texture is found by texture lookup in subfolder
+    with open(os.path.join(folder, 'model.obj'), 'w') as file:
+        file.write('mtllib model.mtl\n')
+        file.write('g part' + str(index) + '\n')
+        file.write('usemtl material\n')
+        for y in range(index + 2):
+            for x in range(index + 2):
+                file.write('v %d %d 0\n' % (x, y))
+                file.write('vt %d %d\n' % (x, y))
+        width = index + 2
+        for y in range(width - 1):
+            for x in range(1, width):
+                corner = y * width + x
+                file.write('f %d/%d %d/%d %d/%d %d/%d\n' % (corner, corner, corner + 1, corner + 1,
+                    corner + width + 1, corner + width + 1, corner + width, corner + width))
+    with open(os.path.join(folder, 'model.mtl'), 'w') as file:
+        file.write('newmtl material\nmap_Kd diffuse.png\n')
+    os.makedirs(os.path.join(folder, 'maps'))
+    with open(os.path.join(folder, 'maps', 'diffuse.png'), 'w') as file:
+        file.write('texture ' + str(index))
+
+
+
+@unittest.skipIf(usdzconvert is None, 'usdzconvert is not available')
+class ConverterConcurrencyTest(unittest.TestCase):
+    threadsCount = 6
+    conversionsCount = 3 # in each thread
+
+    def setUp(self):
+        self.rootFolder = tempfile.mkdtemp('usdzconvertTest')
+
+
+    def tearDown(self):
+        shutil.rmtree(self.rootFolder, ignore_errors=True)
+
+
+    def convertInThread(self, index, inputExtension, outputFolder, results):
+        folder = os.path.join(self.rootFolder, 'input' + str(index))
+        tempFolder = os.path.join(self.rootFolder, 'temp' + str(index))
+        os.makedirs(folder)
+        os.makedirs(tempFolder)
+        if inputExtension == '.usda':
+            writeUsdInput(folder, index)
+        else:
+            writeObjInput(folder, index)
+        for conversionIdx in range(self.conversionsCount):
+            log = Log()
+            converter = usdzconvert.Converter(folder, tempFolder, log)
+            if outputFolder:
+                # all threads create folder of each conversion at the same time
+                outputName = os.path.join(outputFolder, str(conversionIdx), 'model' + str(index) + '.usda')
+            else:
+                outputName = 'output' + str(conversionIdx) + '/model.usda'
+            exitCode = converter.tryProcess(['model' + inputExtension, outputName, '-copytextures', '-profile', 'profile.json'])
+            results.append((index, folder, tempFolder, os.path.join(folder, outputName), exitCode, log.getText()))
+
+
+    def convertInThreads(self, inputExtension, outputFolder=''):
+        results = []
+        threads = []
+        for index in range(self.threadsCount):
+            thread = threading.Thread(target=self.convertInThread, args=(index, inputExtension, outputFolder, results))
+            threads.append(thread)
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), self.threadsCount * self.conversionsCount)
+        for index, folder, tempFolder, outputPath, exitCode, log in results:
+            self.assertEqual(exitCode, 0, log)
+
+            # printed text of conversion goes to its own log only
+            self.assertIn('Input file: ' + os.path.join(folder, 'model' + inputExtension), log)
+            self.assertIn('Output file: ' + outputPath, log)
+            for otherIndex in range(self.threadsCount):
+                if otherIndex != index:
+                    self.assertNotIn('input' + str(otherIndex) + '/', log)
+
+            with open(outputPath) as file:
+                self.assertIn('part' + str(index), file.read())
+
+            # temporary files are removed
+            self.assertEqual(os.listdir(tempFolder), [])
+
+        for index in range(self.threadsCount):
+            # profile has stages of one conversion
+            with open(os.path.join(self.rootFolder, 'input' + str(index), 'profile.json')) as file:
+                stages = dict((stage['name'], stage) for stage in json.load(file)['stages'])
+            self.assertEqual(stages['arguments']['calls'], 1)
+            self.assertEqual(stages['import']['calls'], 1)
+        return results
+
+
+    def testUsdConvertersWithSharedOutputFolder(self):
+        # output folder is created by concurrent conversions
+        self.convertInThreads('.usda', os.path.join(self.rootFolder, 'output'))
+
+
+    @unittest.skipIf(usdStageWithObj is None, 'usdStageWithObj is not available')
+    def testObjConvertersInThreads(self):
+        for index, folder, tempFolder, outputPath, exitCode, log in self.convertInThreads('.obj'):
+            # texture is found in folder of this conversion
+            with open(os.path.join(os.path.dirname(outputPath), 'textures', 'diffuse.png')) as file:
+                self.assertEqual(file.read(), 'texture ' + str(index))
+
+
+
+if __name__ == '__main__':
+    unittest.main()
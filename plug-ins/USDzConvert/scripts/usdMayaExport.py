@@ -3,7 +3,7 @@ import maya.api.OpenMaya as om
 import shutil
 import os
 import tempfile
-from usdzconvert import tryProcess
+from usdzconvertServer import tryProcessWithServer
 import maya.mel
 
 
@@ -53,7 +53,7 @@ def export_selection_to_usdz():
                 pass
 
         try:
-            tryProcess([temp_path_usd])
+            tryProcessWithServer([temp_path_usd])
         except:
             pass
         shutil.copy(temp_path_usd, export_path.replace('usdz', 'usd'))
@@ -1,7 +1,10 @@
-from pxr import *
+from pxr import Gf, Sdf, Tf, Usd, UsdGeom, UsdShade, UsdSkel, Vt
 import os, os.path
 import numpy
 import re
+import json
+import hashlib
+import tempfile
 import usdUtils
 
 
@@ -16,6 +19,10 @@ except ImportError:
     usdStageWithFbxLoaded = False
 
 
+# increase when the converter output changes, it invalidates FBX cache
+FBX_CACHE_VERSION = 2
+
+
 class ConvertError(Exception):
     pass
 
@@ -37,6 +44,136 @@ def getFbxNodeTransforms(fbxNode):
     return GfMatrix4dWithFbxMatrix(fbxNode.EvaluateLocalTransform())
 
 
+def getMeshTopology(fbxMesh):
+    # returns faceVertexCounts and faceVertexIndices of FbxMesh as numpy arrays
+    polygonCount = fbxMesh.GetPolygonCount()
+    if polygonCount == 0:
+        return numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int32)
+    if fbxMesh.IsTriangleMesh():
+        faceVertexCounts = numpy.full(polygonCount, 3, dtype=numpy.int32)
+    else:
+        # FBX bindings have no bulk accessor of polygon sizes, map avoids Python code per polygon
+        faceVertexCounts = numpy.array(map(fbxMesh.GetPolygonSize, xrange(polygonCount)), dtype=numpy.int32)
+    polygonVertices = fbxMesh.GetPolygonVertices()
+    if polygonVertices is None:
+        return faceVertexCounts, numpy.zeros(0, dtype=numpy.int32)
+    faceVertexIndices = numpy.asarray(polygonVertices, dtype=numpy.int32)[:int(numpy.sum(faceVertexCounts))]
+    return faceVertexCounts, faceVertexIndices
+
+
+def getFbxVectors(vectors, components):
+    # returns numpy array with first components of FBX vectors
+    # numpy reads vectors with sequence protocol, Python code per vector is a fallback for bindings without it
+    if len(vectors) == 0:
+        return numpy.zeros((0, components), dtype=numpy.float32)
+    try:
+        array = numpy.array(vectors, dtype=numpy.float64)
+    except (TypeError, ValueError):
+        array = None
+    if array is None or array.ndim != 2 or array.shape[1] < components:
+        array = numpy.array([[vector[i] for i in xrange(components)] for vector in vectors], dtype=numpy.float64)
+    return array[:, :components].astype(numpy.float32)
+
+
+def getControlPoints(fbxMesh):
+    # returns control points of FbxMesh as numpy array of float3
+    return getFbxVectors(fbxMesh.GetControlPoints(), 3)
+
+
+def getFbxArrayElements(fbxArray):
+    # fetches all elements of FBX layer element array at once
+    return map(fbxArray.GetAt, xrange(fbxArray.GetCount()))
+
+
+def getLayerElementIndices(indexArray, count):
+    # returns primvar indices for count mapped items, None for direct reference mode
+    if indexArray is None:
+        return None
+    indices = numpy.asarray(indexArray, dtype=numpy.int32).reshape(-1)
+    return indices[:count]
+
+
+def getMaterialSubsets(materialIndices, materialsCount):
+    # returns face indices for each material, faces keep their original order
+    materialIndices = numpy.asarray(materialIndices, dtype=numpy.int64).reshape(-1)
+    faceIndices = numpy.arange(len(materialIndices), dtype=numpy.int32)
+    valid = (materialIndices >= 0) & (materialIndices < materialsCount)
+    materialIndices = materialIndices[valid]
+    faceIndices = faceIndices[valid]
+
+    order = numpy.argsort(materialIndices, kind='mergesort')
+    counts = numpy.bincount(materialIndices, minlength=materialsCount)
+    return numpy.split(faceIndices[order], numpy.cumsum(counts)[:-1])
+
+
+def packSkinInfluences(pointIndices, jointIndices, weights, vertexCount, maxInfluences=0):
+    # packs per influence arrays to fixed width arrays of vertexCount x components
+    # influences are ordered by weight, maxInfluences > 0 keeps only the strongest ones
+    pointIndices = numpy.asarray(pointIndices, dtype=numpy.int64)
+    jointIndices = numpy.asarray(jointIndices, dtype=numpy.int32)
+    weights = numpy.asarray(weights, dtype=numpy.float32)
+
+    order = numpy.lexsort((-weights, pointIndices))
+    pointIndices = pointIndices[order]
+    counts = numpy.bincount(pointIndices, minlength=vertexCount)
+    components = int(counts.max()) if len(counts) > 0 else 0
+    ranks = numpy.arange(len(pointIndices)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+    if maxInfluences > 0 and components > maxInfluences:
+        components = maxInfluences
+        kept = ranks < components
+        order = order[kept]
+        pointIndices = pointIndices[kept]
+        ranks = ranks[kept]
+    components = max(components, 1)
+
+    packedJointIndices = numpy.zeros((vertexCount, components), dtype=numpy.int32)
+    packedWeights = numpy.zeros((vertexCount, components), dtype=numpy.float32)
+    packedJointIndices[pointIndices, ranks] = jointIndices[order]
+    packedWeights[pointIndices, ranks] = weights[order]
+
+    sums = numpy.sum(packedWeights, axis=1, keepdims=True)
+    numpy.divide(packedWeights, sums, out=packedWeights, where=sums > 0)
+    return packedJointIndices.reshape(-1), packedWeights.reshape(-1), components
+
+
+def getSparseOffsets(offsets, threshold=1e-5):
+    # offsets is a list of (pointsCount x 3) arrays of one blend shape channel
+    # returns indices of points displaced by any of them and their offsets
+    offsets = numpy.stack(offsets)
+    displaced = numpy.any(numpy.abs(offsets) > threshold, axis=(0, 2))
+    pointIndices = numpy.nonzero(displaced)[0].astype(numpy.int32)
+    return pointIndices, offsets[:, pointIndices]
+
+
+def getLinearKeyTimes(fbxAnimCurves):
+    # returns key times of curves if all of them are linear or constant, otherwise None
+    keyTimes = []
+    for fbxAnimCurve in fbxAnimCurves:
+        keysCount = fbxAnimCurve.KeyGetCount()
+        values = [fbxAnimCurve.KeyGetValue(i) for i in xrange(keysCount)]
+        if keysCount == 0 or min(values) == max(values):
+            continue
+        for i in xrange(keysCount - 1):
+            if fbxAnimCurve.KeyGetInterpolation(i) != fbx.FbxAnimCurveDef.eInterpolationLinear:
+                return None
+        keyTimes += [fbxAnimCurve.KeyGetTime(i).GetSecondDouble() for i in xrange(keysCount)]
+    return keyTimes
+
+
+animationChannels = {
+    'Lcl Translation': UsdGeom.XformOp.TypeTranslate,
+    'Lcl Rotation': UsdGeom.XformOp.TypeRotateXYZ,
+    'Lcl Scaling': UsdGeom.XformOp.TypeScale
+}
+
+
+vec3ByPrecision = {
+    UsdGeom.XformOp.PrecisionDouble: Gf.Vec3d,
+    UsdGeom.XformOp.PrecisionFloat: Gf.Vec3f,
+    UsdGeom.XformOp.PrecisionHalf: Gf.Vec3h
+}
+
+
 def getFbxNodeGeometricTransform(fbxNode):
     # geometry transform is an additional transform for geometry
     # it is relative to the node transform
@@ -78,8 +215,11 @@ class FbxNodeManager(usdUtils.NodeManager):
 
 
 class FbxConverter:
-    def __init__(self, fbxPath, usdPath, legacyModifier, copyTextures, verbose):
+    def __init__(self, fbxPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle=None, maxSkinInfluences=0, sampleKeyTimes=False):
         self.verbose = verbose
+        self.normalsCreaseAngle = normalsCreaseAngle # generate normals if they are absent
+        self.maxSkinInfluences = maxSkinInfluences # 0 keeps all skin influences per vertex
+        self.sampleKeyTimes = sampleKeyTimes # sample skeletal animation at key times of linear curves
         self.legacyModifier = legacyModifier
         self.copyTextures = copyTextures
         self.asset = usdUtils.Asset(usdPath)
@@ -88,13 +228,27 @@ class FbxConverter:
         self.nodeId = 0
         self.nodePaths = {}
         self.fbxSkinToSkin = {}
+        self.fbxMeshes = {} # fbxMeshes[fbxNode.GetUniqueID()]
+        self.fbxSkins = {} # fbxSkins[fbxNode.GetUniqueID()]
+        self.fbxAnimStacks = []
+        self.animStackIdx = 0
+        self.animCurveNodes = [] # animCurveNodes[animStackIdx][fbxObject.GetUniqueID()]
+        self.animatedNodes = [] # nodes with their USD prims to bake node animations
+        self.animationLayers = [] # filenames of anim stack layers next to USD file
+        self.blendShapeNodes = [] # nodes with blend shapes in order of processing
+        self.blendShapeSkeletonByNode = {} # skeletons without joints for blend shapes of not skinned meshes
+        self.blendShapeNames = {} # blendShapeNames[fbxBlendShapeChannel.GetUniqueID()]
         self.startAnimationTime = 0
         self.stopAnimationTime = 0
         self.skeletonByNode = {} # collect skinned mesh to construct later
         self.copiedTextures = {} # avoid copying textures more then once
+        self.copiedTextureFilenames = set() # to find name collisions of copied textures
+        self.folderIndices = {} # folder walks of texture lookups, dropped with converter
+        self.fileCopier = usdUtils.FileCopier(verbose)
 
         self.extent = [[], []]
 
+        self.fbxManager = None
         self.fbxScene = None
 
         filenameFull = fbxPath.split('/')[-1]
@@ -118,28 +272,41 @@ class FbxConverter:
 
         self.fbxManager = fbxManager
 
-        fbxIOSettings = fbx.FbxIOSettings.Create(fbxManager, fbx.IOSROOT)
-        fbxManager.SetIOSettings(fbxIOSettings)
-
-        fbxImporter = fbx.FbxImporter.Create(fbxManager, "")
-        result = fbxImporter.Initialize(fbxPath, -1, fbxManager.GetIOSettings())
-        if not result:
-            printErrorAndExit("failed to initialize FbxImporter object")
-
-        if fbxImporter.IsFBX():
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_MATERIAL, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_TEXTURE, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_EMBEDDED, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_SHAPE, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_GOBO, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_ANIMATION, True)
-            fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_GLOBAL_SETTINGS, True)
-
-        self.fbxScene = fbx.FbxScene.Create(fbxManager, "")
-        result = fbxImporter.Import(self.fbxScene)
-        fbxImporter.Destroy()
-        if not result:
-            printErrorAndExit("failed to load FBX scene")
+        try:
+            fbxIOSettings = fbx.FbxIOSettings.Create(fbxManager, fbx.IOSROOT)
+            fbxManager.SetIOSettings(fbxIOSettings)
+
+            fbxImporter = fbx.FbxImporter.Create(fbxManager, "")
+            result = fbxImporter.Initialize(fbxPath, -1, fbxManager.GetIOSettings())
+            if not result:
+                printErrorAndExit("failed to initialize FbxImporter object")
+
+            if fbxImporter.IsFBX():
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_MATERIAL, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_TEXTURE, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_EMBEDDED, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_SHAPE, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_GOBO, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_ANIMATION, True)
+                fbxManager.GetIOSettings().SetBoolProp(fbx.EXP_FBX_GLOBAL_SETTINGS, True)
+
+            self.fbxScene = fbx.FbxScene.Create(fbxManager, "")
+            result = fbxImporter.Import(self.fbxScene)
+            fbxImporter.Destroy()
+            if not result:
+                printErrorAndExit("failed to load FBX scene")
+        except:
+            # scene is not loaded, so converter is not returned to be destroyed
+            self.destroy()
+            raise
+
+
+    def destroy(self):
+        # FBX manager owns the scene and all FBX objects, they are not released by garbage collector
+        if self.fbxManager is not None:
+            self.fbxManager.Destroy()
+            self.fbxManager = None
+            self.fbxScene = None
 
 
     def getTextureProperties(self, materialProperty):
@@ -182,7 +349,7 @@ class FbxConverter:
 
         if materialProperty.IsValid():
             srcTextureFilename, texCoordSet, wrapS, wrapT = self.getTextureProperties(materialProperty)
-            srcTextureFilename = usdUtils.resolvePath(srcTextureFilename, self.srcFolder)
+            srcTextureFilename = usdUtils.resolvePath(srcTextureFilename, self.srcFolder, self.folderIndices)
             textureFilename = usdUtils.makeValidPath(srcTextureFilename)
 
         if  textureFilename != '' and (self.copyTextures or srcTextureFilename != textureFilename):
@@ -193,12 +360,13 @@ class FbxConverter:
 
                 # do not rewrite the texture with same basename
                 subfolderIdx = 0
-                while newTextureFilename in self.copiedTextures.values():
+                while newTextureFilename in self.copiedTextureFilenames:
                     newTextureFilename = 'textures/' + str(subfolderIdx) + '/' + os.path.basename(textureFilename)
                     subfolderIdx += 1
 
-                usdUtils.copy(srcTextureFilename, self.dstFolder + newTextureFilename, self.verbose)
+                self.fileCopier.copy(srcTextureFilename, self.dstFolder + newTextureFilename)
                 self.copiedTextures[srcTextureFilename] = newTextureFilename
+                self.copiedTextureFilenames.add(newTextureFilename)
                 textureFilename = newTextureFilename
 
         if textureFilename != '':
@@ -246,42 +414,76 @@ class FbxConverter:
 
     def prepareAnimations(self):
         animStacksCount = self.fbxScene.GetSrcObjectCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimStack.ClassId))
+        self.fbxAnimStacks = [self.fbxScene.GetSrcObject(fbx.FbxCriteria.ObjectType(fbx.FbxAnimStack.ClassId), i) for i in range(animStacksCount)]
+        self.indexAnimCurveNodes()
         if animStacksCount < 1:
             if self.verbose:
                 print 'No animation found'
             return
 
-        fbxAnimStack = self.fbxScene.GetSrcObject(fbx.FbxCriteria.ObjectType(fbx.FbxAnimStack.ClassId), 0)
+        # stage time range is the range of the first anim stack, other stacks have time ranges in their layers
+        self.setCurrentAnimStack(0)
+        self.asset.extentTime(self.startAnimationTime)
+        self.asset.extentTime(self.stopAnimationTime)
+
+
+    def setCurrentAnimStack(self, animStackIdx):
+        fbxAnimStack = self.fbxAnimStacks[animStackIdx]
+        self.fbxScene.SetCurrentAnimationStack(fbxAnimStack)
+        self.animStackIdx = animStackIdx
         timeSpan = fbxAnimStack.GetLocalTimeSpan()
         self.startAnimationTime = timeSpan.GetStart().GetSecondDouble()
         self.stopAnimationTime = timeSpan.GetStop().GetSecondDouble()
-        self.asset.extentTime(self.startAnimationTime)
-        self.asset.extentTime(self.stopAnimationTime)
 
 
-    def processControlPoints(self, fbxMesh, usdMesh):
-        points = [Gf.Vec3f(p[0], p[1], p[2]) for p in fbxMesh.GetControlPoints()]
-        extent = Gf.Range3f()
-        for point in points:
-            extent.UnionWith(point)
+    def getAnimLayers(self):
+        if self.animStackIdx >= len(self.fbxAnimStacks):
+            return []
+        fbxAnimStack = self.fbxAnimStacks[self.animStackIdx]
+        layersCount = fbxAnimStack.GetMemberCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId))
+        return [fbxAnimStack.GetMember(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId), i) for i in range(layersCount)]
+
 
+    def getSkeletonKeyTimes(self, skeleton):
+        fbxAnimCurves = []
+        for fbxAnimLayer in self.getAnimLayers():
+            for fbxNode in skeleton.joints:
+                for fbxProperty in [fbxNode.LclTranslation, fbxNode.LclRotation, fbxNode.LclScaling]:
+                    for channel in ['X', 'Y', 'Z']:
+                        fbxAnimCurve = fbxProperty.GetCurve(fbxAnimLayer, channel)
+                        if fbxAnimCurve is not None:
+                            fbxAnimCurves.append(fbxAnimCurve)
+        for name, fbxMesh, blendShapeIdx, channelIdx, fbxChannel in self.getSkeletonBlendShapeChannels(skeleton):
+            fbxAnimCurves += self.getBlendShapeWeightCurves(fbxMesh, blendShapeIdx, channelIdx)
+
+        keyTimes = getLinearKeyTimes(fbxAnimCurves)
+        if keyTimes is None:
+            return None
+        keyTimes = numpy.array(keyTimes + [self.startAnimationTime, self.stopAnimationTime])
+        keyTimes = keyTimes[(keyTimes >= self.startAnimationTime) & (keyTimes <= self.stopAnimationTime)]
+        return numpy.unique(keyTimes)
+
+
+    def processControlPoints(self, fbxMesh, usdMesh):
+        points = getControlPoints(fbxMesh)
         usdMesh.CreatePointsAttr(points)
-        usdMesh.CreateExtentAttr([Gf.Vec3f(extent.GetMin()), Gf.Vec3f(extent.GetMax())])
+        if len(points) == 0:
+            return
+
+        extentMin = numpy.min(points, axis=0)
+        extentMax = numpy.max(points, axis=0)
+        usdMesh.CreateExtentAttr([Gf.Vec3f(*map(float, extentMin)), Gf.Vec3f(*map(float, extentMax))])
 
-        if not any(self.extent):
-            self.extent[0] = extent.GetMin()
-            self.extent[1] = extent.GetMax()
+        if len(self.extent[0]) == 0:
+            self.extent[0] = extentMin
+            self.extent[1] = extentMax
         else:
-            for i in range(3):
-                self.extent[0][i] = min(self.extent[0][i], extent.GetMin()[i])
-                self.extent[1][i] = max(self.extent[1][i], extent.GetMax()[i])
+            self.extent[0] = numpy.minimum(self.extent[0], extentMin)
+            self.extent[1] = numpy.maximum(self.extent[1], extentMax)
 
 
-    def getVec3fArrayWithLayerElements(self, elements, fbxLayerElements):
-        elementsArray = fbxLayerElements.GetDirectArray()
-        for i in xrange(elementsArray.GetCount()):
-            element = elementsArray.GetAt(i)
-            elements.append(Gf.Vec3f(element[0], element[1], element[2]))
+    def getVec3fArrayWithLayerElements(self, fbxLayerElements):
+        return getFbxVectors(getFbxArrayElements(fbxLayerElements.GetDirectArray()), 3)
 
 
     def getIndicesWithLayerElements(self, fbxMesh, fbxLayerElements):
@@ -290,28 +492,18 @@ class FbxConverter:
         indexToDirect = (
             referenceMode == fbx.FbxLayerElement.eIndexToDirect or
             referenceMode == fbx.FbxLayerElement.eIndex)
+        if not indexToDirect:
+            return None
 
-        indices = []
         if mappingMode == fbx.FbxLayerElement.eByControlPoint:
-            if indexToDirect:
-                for contorlPointIdx in xrange(fbxMesh.GetControlPointsCount()):
-                    indices.append(fbxLayerElements.GetIndexArray().GetAt(contorlPointIdx))
+            count = fbxMesh.GetControlPointsCount()
         elif mappingMode == fbx.FbxLayerElement.eByPolygonVertex:
-            pointIdx = 0
-            for polygonIdx in xrange(fbxMesh.GetPolygonCount()):
-                for vertexIdx in xrange(fbxMesh.GetPolygonSize(polygonIdx)):
-                    if indexToDirect:
-                        indices.append(fbxLayerElements.GetIndexArray().GetAt(pointIdx))
-                    else:
-                        indices.append(pointIdx)
-                    pointIdx += 1
+            count = fbxMesh.GetPolygonVertexCount()
         elif mappingMode == fbx.FbxLayerElement.eByPolygon:
-            for polygonIdx in xrange(fbxMesh.GetPolygonCount()):
-                if indexToDirect:
-                    indices.append(fbxLayerElements.GetIndexArray().GetAt(polygonIdx))
-                else:
-                    indices.append(polygonIdx)
-        return indices
+            count = fbxMesh.GetPolygonCount()
+        else:
+            return None
+        return getLayerElementIndices(getFbxArrayElements(fbxLayerElements.GetIndexArray()), count)
 
 
     def getInterpolationWithLayerElements(self, fbxLayerElements):
@@ -335,18 +527,18 @@ class FbxConverter:
             if fbxLayerNormals is None:
                 continue
 
-            normals = []
-            self.getVec3fArrayWithLayerElements(normals, fbxLayerNormals)
-            if not any(normals):
+            normals = self.getVec3fArrayWithLayerElements(fbxLayerNormals)
+            if len(normals) == 0:
                 continue
 
             indices = self.getIndicesWithLayerElements(fbxMesh, fbxLayerNormals)
             interpolation = self.getInterpolationWithLayerElements(fbxLayerNormals)
             normalPrimvar = usdMesh.CreatePrimvar('normals', Sdf.ValueTypeNames.Normal3fArray, interpolation)
             normalPrimvar.Set(normals)
-            if len(indices) != 0:
+            if indices is not None:
                 normalPrimvar.SetIndices(Vt.IntArray(indices))
-            break # normals can be in one layer only
+            return True # normals can be in one layer only
+        return False
 
 
     def processUVs(self, fbxMesh, usdMesh, vertexIndices):
@@ -355,12 +547,8 @@ class FbxConverter:
             if fbxLayerUVs is None:
                 continue
 
-            uvs = []
-            uvArray = fbxLayerUVs.GetDirectArray()
-            for i in xrange(uvArray.GetCount()):
-                uv = uvArray.GetAt(i)
-                uvs.append(Gf.Vec2f(uv[0], uv[1]))
-            if not any(uvs):
+            uvs = getFbxVectors(getFbxArrayElements(fbxLayerUVs.GetDirectArray()), 2)
+            if len(uvs) == 0:
                 continue
 
             indices = self.getIndicesWithLayerElements(fbxMesh, fbxLayerUVs)
@@ -378,7 +566,7 @@ class FbxConverter:
 
             uvPrimvar = usdMesh.CreatePrimvar(texCoordSet, Sdf.ValueTypeNames.Float2Array, interpolation)
             uvPrimvar.Set(uvs)
-            if len(indices) != 0:
+            if indices is not None:
                 uvPrimvar.SetIndices(Vt.IntArray(indices))
 
 
@@ -388,63 +576,156 @@ class FbxConverter:
             if fbxLayerColors is None:
                 continue
 
-            colors = []
-            colorArray = fbxLayerColors.GetDirectArray()
-            for i in xrange(colorArray.GetCount()):
-                fbxColor = colorArray.GetAt(i)
-                colors.append(Gf.Vec3f(fbxColor.mRed, fbxColor.mGreen, fbxColor.mBlue))
-            if not any(colors):
+            colors = getFbxArrayElements(fbxLayerColors.GetDirectArray())
+            colors = numpy.array([(c.mRed, c.mGreen, c.mBlue) for c in colors], dtype=numpy.float32).reshape(len(colors), 3)
+            if len(colors) == 0:
                 continue
-            
+
             indices = self.getIndicesWithLayerElements(fbxMesh, fbxLayerColors)
             interpolation = self.getInterpolationWithLayerElements(fbxLayerColors)
             displayColorPrimvar = usdMesh.CreateDisplayColorPrimvar(interpolation)
             displayColorPrimvar.Set(colors)
-            if len(indices) != 0:
+            if indices is not None:
                 displayColorPrimvar.SetIndices(Vt.IntArray(indices))
             break # vertex colors can be in one layer only
 
 
+    def getFbxBlendShapeChannels(self, fbxNode):
+        # returns list of (fbxMesh, blendShapeIdx, channelIdx, fbxBlendShapeChannel)
+        fbxMesh = self.getFbxMesh(fbxNode)
+        if fbxMesh is None:
+            return []
+        if fbx.FbxNodeAttribute.eSubDiv == fbxMesh.GetAttributeType():
+            fbxMesh = fbxMesh.GetBaseMesh()
+
+        channels = []
+        for blendShapeIdx in range(fbxMesh.GetDeformerCount(fbx.FbxDeformer.eBlendShape)):
+            fbxBlendShape = fbxMesh.GetDeformer(blendShapeIdx, fbx.FbxDeformer.eBlendShape)
+            for channelIdx in range(fbxBlendShape.GetBlendShapeChannelCount()):
+                fbxChannel = fbxBlendShape.GetBlendShapeChannel(channelIdx)
+                if fbxChannel.GetTargetShapeCount() > 0:
+                    channels.append((fbxMesh, blendShapeIdx, channelIdx, fbxChannel))
+        return channels
+
+
+    def getBlendShapeName(self, fbxChannel):
+        # names are unique, they are shared by meshes and skeletal animations
+        channelId = fbxChannel.GetUniqueID()
+        if channelId not in self.blendShapeNames:
+            name = usdUtils.makeValidIdentifier(fbxChannel.GetName().split(":")[-1])
+            if name in self.blendShapeNames.values():
+                name += '_' + str(len(self.blendShapeNames))
+            self.blendShapeNames[channelId] = name
+        return self.blendShapeNames[channelId]
+
+
+    def getBlendShapeSkeleton(self, fbxNode):
+        if fbxNode in self.blendShapeSkeletonByNode:
+            return self.blendShapeSkeletonByNode[fbxNode]
+        if fbxNode not in self.skeletonByNode:
+            return None
+        skeleton = self.skeletonByNode[fbxNode]
+        if skeleton is None:
+            fbxSkin = self.getFbxSkin(fbxNode)
+            if fbxSkin is not None and fbxSkin in self.fbxSkinToSkin:
+                skeleton = self.fbxSkinToSkin[fbxSkin].skeleton
+        return skeleton
+
+
+    def getSkeletonBlendShapeChannels(self, skeleton):
+        # returns list of (name, fbxMesh, blendShapeIdx, channelIdx, fbxBlendShapeChannel)
+        channels = []
+        for fbxNode in self.blendShapeNodes:
+            if self.getBlendShapeSkeleton(fbxNode) is skeleton:
+                for fbxMesh, blendShapeIdx, channelIdx, fbxChannel in self.getFbxBlendShapeChannels(fbxNode):
+                    channels.append((self.getBlendShapeName(fbxChannel), fbxMesh, blendShapeIdx, channelIdx, fbxChannel))
+        return channels
+
+
+    def getBlendShapeWeightCurves(self, fbxMesh, blendShapeIdx, channelIdx):
+        fbxAnimCurves = []
+        for fbxAnimLayer in self.getAnimLayers():
+            fbxAnimCurve = fbxMesh.GetShapeChannel(blendShapeIdx, channelIdx, fbxAnimLayer)
+            if fbxAnimCurve is not None:
+                fbxAnimCurves.append(fbxAnimCurve)
+        return fbxAnimCurves
+
+
+    def processBlendShapes(self, fbxNode, fbxMesh, usdMesh):
+        points = getControlPoints(fbxMesh)
+        names = []
+        targets = []
+        for fbxMesh, blendShapeIdx, channelIdx, fbxChannel in self.getFbxBlendShapeChannels(fbxNode):
+            targetShapesCount = fbxChannel.GetTargetShapeCount()
+            offsets = []
+            for targetShapeIdx in range(targetShapesCount):
+                shapePoints = getControlPoints(fbxChannel.GetTargetShape(targetShapeIdx))
+                if len(shapePoints) != len(points):
+                    break
+                offsets.append(shapePoints - points)
+            if len(offsets) != targetShapesCount:
+                usdUtils.printWarning("Blend shape " + fbxChannel.GetName() + " has different number of points than mesh " + fbxNode.GetName())
+                continue
+
+            pointIndices, offsets = getSparseOffsets(offsets)
+            if len(pointIndices) == 0:
+                continue
+
+            name = self.getBlendShapeName(fbxChannel)
+            usdBlendShape = UsdSkel.BlendShape.Define(self.usdStage, usdMesh.GetPath().AppendChild(name))
+            usdBlendShape.CreateOffsetsAttr(offsets[-1])
+            usdBlendShape.CreatePointIndicesAttr(Vt.IntArray(pointIndices))
+
+            # all target shapes except the last one are in-betweens
+            fullWeights = fbxChannel.GetTargetShapeFullWeights() if hasattr(fbxChannel, 'GetTargetShapeFullWeights') else None
+            for targetShapeIdx in range(targetShapesCount - 1):
+                fullWeight = fullWeights[targetShapeIdx] if fullWeights is not None else 100.0 * (targetShapeIdx + 1) / targetShapesCount
+                inbetween = usdBlendShape.CreateInbetween('inbetween_' + str(targetShapeIdx))
+                inbetween.SetWeight(fullWeight / 100.0)
+                inbetween.SetOffsets(offsets[targetShapeIdx])
+
+            names.append(name)
+            targets.append(usdBlendShape.GetPath())
+
+        if len(names) == 0:
+            return
+        if self.verbose:
+            print '  blend shapes:', len(names)
+
+        usdSkelBinding = UsdSkel.BindingAPI(usdMesh)
+        usdSkelBinding.CreateBlendShapesAttr(names)
+        usdSkelBinding.CreateBlendShapeTargetsRel().SetTargets(targets)
+        if fbxNode in self.blendShapeSkeletonByNode:
+            usdSkelBinding.CreateSkeletonRel().AddTarget(self.blendShapeSkeletonByNode[fbxNode].usdSkeleton.GetPath())
+
+
     def applySkinning(self, fbxNode, fbxSkin, usdMesh, indices):
         skin = self.fbxSkinToSkin[fbxSkin]
         skeleton = skin.skeleton
 
-        maxPointIndex = 0
-        for clusterIdx in range(fbxSkin.GetClusterCount()):
-            fbxCluster = fbxSkin.GetCluster(clusterIdx)
-            for i in range(fbxCluster.GetControlPointIndicesCount()):
-                pointIndex = fbxCluster.GetControlPointIndices()[i]
-                if maxPointIndex < pointIndex:
-                    maxPointIndex = pointIndex
-        vertexCount = maxPointIndex + 1 # should be equal to number of vertices: max(indices) + 1
-
-        jointIndicesPacked = [[] for i in range(vertexCount)]
-        weightsPacked = [[] for i in range(vertexCount)]
+        pointIndices = []
+        jointIndices = []
+        weights = []
         for clusterIdx in range(fbxSkin.GetClusterCount()):
             fbxCluster = fbxSkin.GetCluster(clusterIdx)
-            for i in range(fbxCluster.GetControlPointIndicesCount()):
-                pointIndex = fbxCluster.GetControlPointIndices()[i]
-                jointIndicesPacked[pointIndex].append(skin.remapIndex(clusterIdx))
-                weightsPacked[pointIndex].append(float(fbxCluster.GetControlPointWeights()[i]))
-
-        components = 0
-        for indicesPerVertex in jointIndicesPacked:
-            if components < len(indicesPerVertex):
-                components = len(indicesPerVertex)
-
-        jointIndices = [0] * vertexCount * components
-        weights = [float(0)] * vertexCount * components
-        for i in range(vertexCount):
-            indicesPerVertex = jointIndicesPacked[i]
-            for j in range(len(indicesPerVertex)):
-                jointIndices[i * components + j] = indicesPerVertex[j]
-                weights[i * components + j] = weightsPacked[i][j]
-        weights = Vt.FloatArray(weights)
-        UsdSkel.NormalizeWeights(weights, components)
+            count = fbxCluster.GetControlPointIndicesCount()
+            if count == 0:
+                continue
+            pointIndices.append(numpy.asarray(fbxCluster.GetControlPointIndices(), dtype=numpy.int64)[:count])
+            weights.append(numpy.asarray(fbxCluster.GetControlPointWeights(), dtype=numpy.float32)[:count])
+            jointIndices.append(numpy.full(count, skin.remapIndex(clusterIdx), dtype=numpy.int32))
+
+        if len(pointIndices) > 0:
+            pointIndices = numpy.concatenate(pointIndices)
+            jointIndices = numpy.concatenate(jointIndices)
+            weights = numpy.concatenate(weights)
+        vertexCount = max(len(usdMesh.GetPointsAttr().Get()), int(numpy.max(pointIndices)) + 1 if len(pointIndices) > 0 else 0)
+
+        jointIndices, weights, components = packSkinInfluences(pointIndices, jointIndices, weights, vertexCount, self.maxSkinInfluences)
 
         usdSkelBinding = UsdSkel.BindingAPI(usdMesh)
-        usdSkelBinding.CreateJointIndicesPrimvar(False, components).Set(jointIndices)
-        usdSkelBinding.CreateJointWeightsPrimvar(False, components).Set(weights)
+        usdSkelBinding.CreateJointIndicesPrimvar(False, components).Set(Vt.IntArray(jointIndices))
+        usdSkelBinding.CreateJointWeightsPrimvar(False, components).Set(Vt.FloatArray(weights))
 
         bindTransform = Gf.Matrix4d(1)
         if fbxSkin.GetClusterCount() > 0:
@@ -479,13 +760,11 @@ class FbxConverter:
             # looks like there is a bug in FBX SDK:
             # GetDirectArray() does not work if .GetCount() has not been called
             materialsCount = fbxLayerMaterials.GetDirectArray().GetCount()
+            materialIndices = getFbxArrayElements(fbxLayerMaterials.GetIndexArray())
 
-            if fbxLayerMaterials.GetIndexArray().GetCount() > 1 and fbxLayerMaterials.GetMappingMode() == fbx.FbxLayerElement.eByPolygon:
+            if len(materialIndices) > 1 and fbxLayerMaterials.GetMappingMode() == fbx.FbxLayerElement.eByPolygon:
                 # subsets
-                subsets = [[] for i in range(materialsCount)]
-                for polygonIdx in range(fbxLayerMaterials.GetIndexArray().GetCount()):
-                    materialIndex = fbxLayerMaterials.GetIndexArray().GetAt(polygonIdx)
-                    subsets[materialIndex].append(polygonIdx)
+                subsets = getMaterialSubsets(materialIndices, materialsCount)
 
                 bindingAPI = UsdShade.MaterialBindingAPI(usdMesh)
                 for materialIndex in range(materialsCount):
@@ -499,7 +778,7 @@ class FbxConverter:
                         usdSubset = UsdShade.MaterialBindingAPI.CreateMaterialBindSubset(bindingAPI, subsetName, Vt.IntArray(subsets[materialIndex]))
                         usdMaterial = self.usdMaterials[fbxMaterial.GetName()]
                         UsdShade.MaterialBindingAPI(usdSubset).Bind(usdMaterial)
-            elif fbxLayerMaterials.GetIndexArray().GetCount() > 0:
+            elif len(materialIndices) > 0:
                 # one material for whole mesh
                 fbxMaterial = fbxLayerMaterials.GetDirectArray().GetAt(0)
                 if fbxMaterial is not None and fbxMaterial.GetName() in self.usdMaterials:
@@ -508,45 +787,92 @@ class FbxConverter:
 
 
     def getFbxMesh(self, fbxNode):
+        nodeId = fbxNode.GetUniqueID()
+        if nodeId in self.fbxMeshes:
+            return self.fbxMeshes[nodeId]
+
+        fbxMesh = None
         fbxNodeAttribute = fbxNode.GetNodeAttribute()
         if fbxNodeAttribute:
             fbxAttributeType = fbxNodeAttribute.GetAttributeType()
             if (fbx.FbxNodeAttribute.eMesh == fbxAttributeType or
                 fbx.FbxNodeAttribute.eSubDiv == fbxAttributeType):
-                return fbxNodeAttribute
-        return None
+                fbxMesh = fbxNodeAttribute
+        self.fbxMeshes[nodeId] = fbxMesh
+        return fbxMesh
 
 
     def getFbxSkin(self, fbxNode):
+        nodeId = fbxNode.GetUniqueID()
+        if nodeId in self.fbxSkins:
+            return self.fbxSkins[nodeId]
+
+        fbxSkin = None
         fbxMesh = self.getFbxMesh(fbxNode)
+        if fbxMesh is not None and fbx.FbxNodeAttribute.eSubDiv == fbxMesh.GetAttributeType():
+            # deformers of subdivision surface are in its base mesh
+            if fbxMesh.GetDeformerCount(fbx.FbxDeformer.eSkin) == 0:
+                fbxMesh = fbxMesh.GetBaseMesh()
         if fbxMesh is not None and fbxMesh.GetDeformerCount(fbx.FbxDeformer.eSkin) > 0:
-            return fbxMesh.GetDeformer(0, fbx.FbxDeformer.eSkin)
-        return None
+            fbxSkin = fbxMesh.GetDeformer(0, fbx.FbxDeformer.eSkin)
+        self.fbxSkins[nodeId] = fbxSkin
+        return fbxSkin
+
+
+    def processCreases(self, fbxMesh, usdMesh, faceVertexCounts, indices):
+        # FBX crease values are in [0, 1] range, USD sharpness 10 is infinitely sharp
+        edgesCount = fbxMesh.GetMeshEdgeCount()
+        edgeCreases = numpy.array([fbxMesh.GetEdgeCreaseInfo(i) for i in xrange(edgesCount)], dtype=numpy.float32)
+        creaseEdges = numpy.nonzero(edgeCreases > 0)[0]
+        if len(creaseEdges) > 0:
+            # each polygon corner starts an edge which ends at the next corner of the polygon
+            polygonStarts = numpy.cumsum(faceVertexCounts) - faceVertexCounts
+            cornerPolygons = numpy.repeat(numpy.arange(len(faceVertexCounts)), faceVertexCounts)
+            cornerPositions = numpy.arange(len(indices)) - polygonStarts[cornerPolygons]
+            nextCorners = numpy.where(cornerPositions + 1 == faceVertexCounts[cornerPolygons], polygonStarts[cornerPolygons], numpy.arange(len(indices)) + 1)
+            cornerEdges = numpy.array([fbxMesh.GetMeshEdgeIndexForPolygon(int(p), int(k)) for p, k in zip(cornerPolygons, cornerPositions)], dtype=numpy.int64)
+
+            edgeCorners = numpy.full(edgesCount, -1, dtype=numpy.int64)
+            valid = (cornerEdges >= 0) & (cornerEdges < edgesCount)
+            edgeCorners[cornerEdges[valid]] = numpy.nonzero(valid)[0]
+            creaseEdges = creaseEdges[edgeCorners[creaseEdges] >= 0]
+            if len(creaseEdges) > 0:
+                corners = edgeCorners[creaseEdges]
+                creaseIndices = numpy.stack([indices[corners], indices[nextCorners[corners]]], axis=1).reshape(-1)
+                usdMesh.CreateCreaseIndicesAttr(Vt.IntArray(creaseIndices))
+                usdMesh.CreateCreaseLengthsAttr(Vt.IntArray(numpy.full(len(creaseEdges), 2, dtype=numpy.int32)))
+                usdMesh.CreateCreaseSharpnessesAttr(Vt.FloatArray(edgeCreases[creaseEdges] * 10.0))
+
+        vertexCreases = numpy.array([fbxMesh.GetVertexCreaseInfo(i) for i in xrange(fbxMesh.GetControlPointsCount())], dtype=numpy.float32)
+        cornerIndices = numpy.nonzero(vertexCreases > 0)[0].astype(numpy.int32)
+        if len(cornerIndices) > 0:
+            usdMesh.CreateCornerIndicesAttr(Vt.IntArray(cornerIndices))
+            usdMesh.CreateCornerSharpnessesAttr(Vt.FloatArray(vertexCreases[cornerIndices] * 10.0))
 
 
     def processMesh(self, fbxNode, newPath, underSkeleton, indent):
         usdMesh = UsdGeom.Mesh.Define(self.usdStage, newPath)
 
-        fbxMesh = fbxNode.GetNodeAttribute()
-        if fbx.FbxNodeAttribute.eSubDiv == fbxMesh.GetAttributeType():
+        fbxMesh = self.getFbxMesh(fbxNode)
+        isSubdivisionSurface = fbx.FbxNodeAttribute.eSubDiv == fbxMesh.GetAttributeType()
+        if isSubdivisionSurface:
+            # refinement is left to renderer, base mesh is a control cage
             fbxMesh = fbxMesh.GetBaseMesh()
+            usdMesh.CreateSubdivisionSchemeAttr(UsdGeom.Tokens.catmullClark)
         else:
             usdMesh.CreateSubdivisionSchemeAttr(UsdGeom.Tokens.none)
 
-        indices = []
-        faceVertexCounts = []
-        for polygonIdx in xrange(fbxMesh.GetPolygonCount()):
-            polygonSize = fbxMesh.GetPolygonSize(polygonIdx)
-            faceVertexCounts.append(polygonSize)
-            for polygonVertexIdx in xrange(polygonSize):
-                index = fbxMesh.GetPolygonVertex(polygonIdx, polygonVertexIdx)
-                indices.append(index)
-        usdMesh.CreateFaceVertexCountsAttr(faceVertexCounts)
-        usdMesh.CreateFaceVertexIndicesAttr(indices)
+        faceVertexCounts, indices = getMeshTopology(fbxMesh)
+        usdMesh.CreateFaceVertexCountsAttr(Vt.IntArray(faceVertexCounts))
+        usdMesh.CreateFaceVertexIndicesAttr(Vt.IntArray(indices))
+        if isSubdivisionSurface:
+            self.processCreases(fbxMesh, usdMesh, faceVertexCounts, indices)
 
         # positions, normals, texture coordinates
         self.processControlPoints(fbxMesh, usdMesh)
-        self.processNormals(fbxMesh, usdMesh, indices)
+        if (not self.processNormals(fbxMesh, usdMesh, indices) and self.normalsCreaseAngle is not None and
+            not isSubdivisionSurface):
+            usdUtils.generateNormals(usdMesh, self.normalsCreaseAngle)
         self.processUVs(fbxMesh, usdMesh, indices)
         self.processVertexColors(fbxMesh, usdMesh, indices)
 
@@ -555,6 +881,7 @@ class FbxConverter:
             self.applySkinning(fbxNode, fbxSkin, usdMesh, indices)
         elif underSkeleton is not None:
             self.bindRigidDeformation(fbxNode, usdMesh, underSkeleton)
+        self.processBlendShapes(fbxNode, fbxMesh, usdMesh)
 
         if self.verbose:
             type = 'Mesh'
@@ -690,8 +1017,13 @@ class FbxConverter:
         self.addScalingOpIfNotEmpty(prim, gs, "geometricScaling")
 
 
+    def getAnimatedSkeletons(self):
+        return self.skinning.skeletons + [self.blendShapeSkeletonByNode[fbxNode] for fbxNode in self.blendShapeNodes if fbxNode in self.blendShapeSkeletonByNode]
+
+
     def processSkeletalAnimation(self, skeletonIdx):
-        skeleton = self.skinning.skeletons[skeletonIdx]
+        skeleton = self.getAnimatedSkeletons()[skeletonIdx]
+        blendShapeChannels = self.getSkeletonBlendShapeChannels(skeleton)
 
         framesCount = int((self.stopAnimationTime - self.startAnimationTime) * self.fps + 0.5) + 1
         startFrame = int(self.startAnimationTime * self.fps + 0.5)
@@ -699,7 +1031,7 @@ class FbxConverter:
         if framesCount == 1:
             if self.verbose:
                 print '  no skeletal animation'
-            return
+            return None
 
         animationName = self.asset.getAnimationsPath() + '/' + 'SkelAnimation'
         if skeletonIdx > 0:
@@ -708,110 +1040,145 @@ class FbxConverter:
             print 'Animation:', animationName
 
         usdSkelAnim = UsdSkel.Animation.Define(self.usdStage, animationName)
-        translateAttr = usdSkelAnim.CreateTranslationsAttr()
-        rotateAttr = usdSkelAnim.CreateRotationsAttr()
-        scaleAttr = usdSkelAnim.CreateScalesAttr()
 
         jointPaths = []
         for fbxNode in skeleton.joints:
             jointPaths.append(skeleton.jointPaths[fbxNode])
 
-        fbxAnimEvaluator = self.fbxScene.GetAnimationEvaluator()
-        for frame in range(framesCount):
-            time = frame / self.fps + self.startAnimationTime
-
-            translations = []
-            rotations = []
-            scales = []
-
-            for fbxNode in skeleton.joints:
-                fbxTime = fbx.FbxTime()
-                fbxTime.SetSecondDouble(time)
-
-                fbxMatrix = fbxAnimEvaluator.GetNodeLocalTransform(fbxNode, fbxTime)
+        times = self.getSkeletonKeyTimes(skeleton) if self.sampleKeyTimes else None
+        if times is not None:
+            timeCodes = times * self.fps
+            if self.verbose:
+                print '  sampling', len(times), 'key times'
+        else:
+            frames = numpy.arange(framesCount)
+            times = frames / self.fps + self.startAnimationTime
+            timeCodes = frames + startFrame
+
+        jointsCount = len(skeleton.joints)
+        translations = numpy.zeros((len(times), jointsCount, 3), dtype=numpy.float32)
+        rotations = numpy.zeros((len(times), jointsCount, 4), dtype=numpy.float32)
+        scales = numpy.zeros((len(times), jointsCount, 3), dtype=numpy.float32)
+
+        # blend shape weights without curves keep their static values
+        blendShapeWeights = numpy.zeros((len(times), len(blendShapeChannels)), dtype=numpy.float32)
+        blendShapeCurves = []
+        for channelIdx in range(len(blendShapeChannels)):
+            name, fbxMesh, blendShapeIdx, fbxChannelIdx, fbxChannel = blendShapeChannels[channelIdx]
+            fbxAnimCurves = self.getBlendShapeWeightCurves(fbxMesh, blendShapeIdx, fbxChannelIdx)
+            blendShapeCurves.append(fbxAnimCurves[0] if len(fbxAnimCurves) > 0 else None)
+            blendShapeWeights[:, channelIdx] = fbxChannel.DeformPercent.Get() / 100.0
 
-                translation = fbxMatrix.GetT()
+        fbxAnimEvaluator = self.fbxScene.GetAnimationEvaluator()
+        fbxTime = fbx.FbxTime()
+        for timeIdx in range(len(times)):
+            fbxTime.SetSecondDouble(float(times[timeIdx]))
+            for jointIdx in range(jointsCount):
+                fbxMatrix = fbxAnimEvaluator.GetNodeLocalTransform(skeleton.joints[jointIdx], fbxTime)
+                t = fbxMatrix.GetT()
                 q = fbxMatrix.GetQ()
-                rotation = Gf.Quatf(float(q[3]), Gf.Vec3f(float(q[0]), float(q[1]), float(q[2])))
-                scale = fbxMatrix.GetS()
-
-                translations.append([translation[0], translation[1], translation[2]])
-                rotations.append(rotation)
-                scales.append([scale[0], scale[1], scale[2]])
+                s = fbxMatrix.GetS()
+                translations[timeIdx, jointIdx] = (t[0], t[1], t[2])
+                rotations[timeIdx, jointIdx] = (q[3], q[0], q[1], q[2])
+                scales[timeIdx, jointIdx] = (s[0], s[1], s[2])
+            for channelIdx in range(len(blendShapeCurves)):
+                if blendShapeCurves[channelIdx] is not None:
+                    blendShapeWeights[timeIdx, channelIdx] = blendShapeCurves[channelIdx].Evaluate(fbxTime) / 100.0
+
+        if jointsCount > 0:
+            usdUtils.setTimeSamples(usdSkelAnim.CreateTranslationsAttr(), timeCodes,
+                [Vt.Vec3fArray(translations[timeIdx]) for timeIdx in range(len(times))])
+            usdUtils.setTimeSamples(usdSkelAnim.CreateRotationsAttr(), timeCodes,
+                [Vt.QuatfArray([Gf.Quatf(*q) for q in rotations[timeIdx].tolist()]) for timeIdx in range(len(times))])
+            usdUtils.setTimeSamples(usdSkelAnim.CreateScalesAttr(), timeCodes,
+                [Vt.Vec3hArray([Gf.Vec3h(*s) for s in scales[timeIdx].tolist()]) for timeIdx in range(len(times))])
+
+        if len(blendShapeChannels) > 0:
+            usdSkelAnim.CreateBlendShapesAttr([channel[0] for channel in blendShapeChannels])
+            usdUtils.setTimeSamples(usdSkelAnim.CreateBlendShapeWeightsAttr(), timeCodes,
+                [Vt.FloatArray(blendShapeWeights[timeIdx]) for timeIdx in range(len(times))])
 
+        usdSkelAnim.CreateJointsAttr(jointPaths)
+        return usdSkelAnim
+
+    def indexAnimCurveNodes(self):
+        # curve nodes of each anim stack by unique ID of the animated object
+        self.animCurveNodes = []
+        for fbxAnimStack in self.fbxAnimStacks:
+            animCurveNodes = {}
+            self.animCurveNodes.append(animCurveNodes)
+            for layerIdx in range(fbxAnimStack.GetMemberCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId))):
+                fbxAnimLayer = fbxAnimStack.GetMember(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId), layerIdx)
+                for curveNodeIdx in range(fbxAnimLayer.GetMemberCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimCurveNode.ClassId))):
+                    fbxAnimCurveNode = fbxAnimLayer.GetMember(fbx.FbxCriteria.ObjectType(fbx.FbxAnimCurveNode.ClassId), curveNodeIdx)
+                    for propertyIdx in range(fbxAnimCurveNode.GetDstPropertyCount()):
+                        fbxProperty = fbxAnimCurveNode.GetDstProperty(propertyIdx)
+                        fbxObject = fbxProperty.GetFbxObject()
+                        if fbxObject is not None:
+                            animCurveNodes.setdefault(fbxObject.GetUniqueID(), []).append((fbxProperty, fbxAnimCurveNode))
+
+
+    def getNodeAnimationChannels(self, fbxNode, animStackIdx):
+        # returns xform op types and time span of node animation in anim stack
+        curveNodes = self.animCurveNodes[animStackIdx].get(fbxNode.GetUniqueID(), [])
+
+        opTypes = []
+        startTime = None
+        stopTime = None
+        for fbxProperty, fbxAnimCurveNode in curveNodes:
+            channelName = str(fbxProperty.GetName()).strip()
+            if channelName not in animationChannels:
+                if self.verbose:
+                    print 'Warnig: animation channel"', channelName, '"is not supported.'
+                continue
 
-            translateAttr.Set(translations, Usd.TimeCode(frame + startFrame))
-            rotateAttr.Set(rotations, Usd.TimeCode(frame + startFrame))
-            scaleAttr.Set(scales, Usd.TimeCode(frame + startFrame))
+            fbxTimeSpan = fbx.FbxTimeSpan()
+            fbxAnimCurveNode.GetAnimationInterval(fbxTimeSpan)
+            curveStartTime = fbxTimeSpan.GetStart().GetSecondDouble()
+            curveStopTime = fbxTimeSpan.GetStop().GetSecondDouble()
+            startTime = curveStartTime if startTime is None else min(startTime, curveStartTime)
+            stopTime = curveStopTime if stopTime is None else max(stopTime, curveStopTime)
 
-        usdSkelAnim.CreateJointsAttr(jointPaths)
-        skeleton.setSkeletalAnimation(usdSkelAnim)
+            opType = animationChannels[channelName]
+            if opType not in opTypes:
+                opTypes.append(opType)
 
+        return opTypes, startTime, stopTime
 
-    def processNodeTransformAnimation(self, fbxNode, fbxProperty, fbxAnimCurveNode, usdGeom):
-        fbxTimeSpan = fbx.FbxTimeSpan()
-        fbxAnimCurveNode.GetAnimationInterval(fbxTimeSpan)
 
-        startTime = fbxTimeSpan.GetStart().GetSecondDouble()
-        stopTime = fbxTimeSpan.GetStop().GetSecondDouble()
+    def processNodeAnimations(self, fbxNode, usdGeom):
+        if self.animStackIdx >= len(self.animCurveNodes):
+            return
+        opTypes, startTime, stopTime = self.getNodeAnimationChannels(fbxNode, self.animStackIdx)
+        if len(opTypes) == 0:
+            return
         framesCount = int((stopTime - startTime) * self.fps + 0.5) + 1
         if framesCount < 1:
             return
-        startFrame = int(startTime * self.fps + 0.5)
-
-        isTranslation = False
-        isRotation = False
-        isScale = False
-
-        channelName = str(fbxProperty.GetName()).strip()
 
-        if channelName == 'Lcl Translation':
-            isTranslation = True
-        elif channelName == 'Lcl Rotation':
-            isRotation = True
-        elif channelName == 'Lcl Scaling':
-            isScale = True
-        else:
-            if self.verbose:
-                print 'Warnig: animation channel"', channelName, '"is not supported.'
+        ops = [self.getXformOp(usdGeom, opType) for opType in opTypes]
+        values = numpy.zeros((len(opTypes), framesCount, 3), dtype=numpy.float32)
+        timeCodes = []
 
-        fbxAnimEvaluator = self.fbxScene.GetAnimationEvaluator()
-        # TODO: for linear curves use key frames only
-        for frame in range(startFrame, startFrame + framesCount):
-            time = frame / self.fps + startTime
-            timeCode = self.asset.toTimeCode(time, True)
-            fbxTime = fbx.FbxTime()
+        fbxTime = fbx.FbxTime()
+        for frame in range(framesCount):
+            time = startTime + frame / self.fps
+            timeCodes.append(self.asset.toTimeCode(time, self.animStackIdx == 0))
             fbxTime.SetSecondDouble(time)
 
-            if isTranslation:
-                op = self.getXformOp(usdGeom, UsdGeom.XformOp.TypeTranslate)
-                v = fbxNode.EvaluateLocalTranslation(fbxTime)
-                op.Set(time = timeCode, value = Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])))
-            elif isRotation:
-                op = self.getXformOp(usdGeom, UsdGeom.XformOp.TypeRotateXYZ)
-                v = fbxNode.EvaluateLocalRotation(fbxTime)
-                op.Set(time = timeCode, value = Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])))
-            elif isScale:
-                op = self.getXformOp(usdGeom, UsdGeom.XformOp.TypeScale)
-                v = fbxNode.EvaluateLocalScaling(fbxTime)
-                op.Set(time = timeCode, value = Gf.Vec3f(float(v[0]), float(v[1]), float(v[2])))
-
+            for opIdx in range(len(opTypes)):
+                if opTypes[opIdx] == UsdGeom.XformOp.TypeTranslate:
+                    v = fbxNode.EvaluateLocalTranslation(fbxTime)
+                elif opTypes[opIdx] == UsdGeom.XformOp.TypeRotateXYZ:
+                    v = fbxNode.EvaluateLocalRotation(fbxTime)
+                else:
+                    v = fbxNode.EvaluateLocalScaling(fbxTime)
+                values[opIdx, frame] = (v[0], v[1], v[2])
 
-    def processNodeAnimations(self, fbxNode, usdGeom):
-        animStacksCount = self.fbxScene.GetSrcObjectCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimStack.ClassId))
-        if animStacksCount < 1:
-            return
-        for animStackIdx in range(animStacksCount):
-            fbxAnimStack = self.fbxScene.GetSrcObject(fbx.FbxCriteria.ObjectType(fbx.FbxAnimStack.ClassId), animStackIdx)
-            for layerIdx in range(fbxAnimStack.GetMemberCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId))):
-                fbxAnimLayer = fbxAnimStack.GetMember(fbx.FbxCriteria.ObjectType(fbx.FbxAnimLayer.ClassId), layerIdx)
-                for curveNodeIdx in range(fbxAnimLayer.GetMemberCount(fbx.FbxCriteria.ObjectType(fbx.FbxAnimCurveNode.ClassId))):
-                    fbxAnimCurveNode = fbxAnimLayer.GetMember(fbx.FbxCriteria.ObjectType(fbx.FbxAnimCurveNode.ClassId), curveNodeIdx)
-                    for propertyIdx in range(fbxAnimCurveNode.GetDstPropertyCount()):
-                        fbxProperty = fbxAnimCurveNode.GetDstProperty(propertyIdx)
-                        fbxObject = fbxProperty.GetFbxObject()
-                        if fbxObject == fbxNode:
-                            self.processNodeTransformAnimation(fbxNode, fbxProperty, fbxAnimCurveNode, usdGeom)
+        # time samples are authored on attribute specs, so values should have precision of xform ops
+        for opIdx in range(len(ops)):
+            gfVec3 = vec3ByPrecision[ops[opIdx].GetPrecision()]
+            usdUtils.setTimeSamples(ops[opIdx].GetAttr(), timeCodes, [gfVec3(*v) for v in values[opIdx].tolist()])
 
 
     def processNode(self, fbxNode, path, underSkeleton, indent):
@@ -837,6 +1204,9 @@ class FbxConverter:
                         print indent + "SkelRoot:", nodeName
                     underSkeleton = skeleton
 
+        if len(self.getFbxBlendShapeChannels(fbxNode)) > 0:
+            self.blendShapeNodes.append(fbxNode)
+
         if underSkeleton and self.getFbxMesh(fbxNode) is not None:
             self.skeletonByNode[fbxNode] = underSkeleton
         elif self.getFbxSkin(fbxNode) is not None:
@@ -845,7 +1215,16 @@ class FbxConverter:
             # if we have a geometric transformation we shouldn't propagate it to node's children
             usdNode = None
             hasGeometricTransform = self.hasGeometricTransform(fbxNode)
-            if underSkeleton is None and hasGeometricTransform and underSkeleton is None:
+            hasBlendShapes = underSkeleton is None and fbxNode in self.blendShapeNodes
+            if underSkeleton is None and hasBlendShapes:
+                # blend shapes of not skinned mesh are driven by skeleton without joints
+                usdNode = UsdSkel.Root.Define(self.usdStage, newPath)
+                skeleton = usdUtils.Skeleton()
+                skeleton.sdfPath = newPath
+                skeleton.usdSkeleton = UsdSkel.Skeleton.Define(self.usdStage, newPath + '/Skeleton')
+                self.blendShapeSkeletonByNode[fbxNode] = skeleton
+                geometryPath = newPath + '/' + nodeName + '_geometry'
+            elif underSkeleton is None and hasGeometricTransform:
                 usdNode = UsdGeom.Xform.Define(self.usdStage, newPath)
                 geometryPath = newPath + '/' + nodeName + '_geometry'
             else:
@@ -861,13 +1240,14 @@ class FbxConverter:
                     usdGeometry = UsdGeom.Xform.Define(self.usdStage, geometryPath)
 
                 self.nodePaths[newPath] = newPath
-                if hasGeometricTransform:
+                if usdNode is not None:
                     self.setNodeTransforms(fbxNode, usdNode)
-                    self.setGeometricTransform(fbxNode, usdGeometry)
-                    self.processNodeAnimations(fbxNode, usdNode)
+                    if hasGeometricTransform:
+                        self.setGeometricTransform(fbxNode, usdGeometry)
+                    self.animatedNodes.append((fbxNode, usdNode))
                 else:
                     self.setNodeTransforms(fbxNode, usdGeometry)
-                    self.processNodeAnimations(fbxNode, usdGeometry)
+                    self.animatedNodes.append((fbxNode, usdGeometry))
 
         # process child nodes recursively
         if underSkeleton is not None:
@@ -955,9 +1335,79 @@ class FbxConverter:
             self.processMesh(fbxNode, newPath, skeleton, '')
 
 
-    def processSkeletalAnimations(self):
-        for skeletonIdx in range(len(self.skinning.skeletons)):
-            self.processSkeletalAnimation(skeletonIdx)
+    def processStackAnimations(self):
+        # returns skeletal animations of current anim stack
+        for fbxNode, usdGeom in self.animatedNodes:
+            self.processNodeAnimations(fbxNode, usdGeom)
+        return [self.processSkeletalAnimation(skeletonIdx) for skeletonIdx in range(len(self.getAnimatedSkeletons()))]
+
+
+    def processAnimations(self):
+        if len(self.fbxAnimStacks) < 2:
+            usdSkelAnims = self.processStackAnimations()
+            for skeletonIdx in range(len(usdSkelAnims)):
+                if usdSkelAnims[skeletonIdx] is not None:
+                    self.getAnimatedSkeletons()[skeletonIdx].setSkeletalAnimation(usdSkelAnims[skeletonIdx])
+            return
+
+        # each anim stack goes to its own layer, which is referenced by its variant, so only the selected one is loaded
+        # xform ops and prims which are shared by all variants are created in the root layer
+        for fbxNode, usdGeom in self.animatedNodes:
+            for animStackIdx in range(len(self.fbxAnimStacks)):
+                for opType in self.getNodeAnimationChannels(fbxNode, animStackIdx)[0]:
+                    self.getXformOp(usdGeom, opType)
+        self.asset.getAnimationsPath()
+
+        usdPrim = self.usdStage.GetPrimAtPath(self.asset.getPath())
+        variantSet = usdPrim.GetVariantSets().AddVariantSet('animation')
+        variantNames = []
+        animationPathsBySkeleton = [None] * len(self.getAnimatedSkeletons())
+        sessionLayer = self.usdStage.GetSessionLayer()
+        for animStackIdx in range(len(self.fbxAnimStacks)):
+            variantName = usdUtils.makeValidIdentifier(self.fbxAnimStacks[animStackIdx].GetName().split(":")[-1])
+            if variantName in variantNames:
+                variantName += '_' + str(animStackIdx)
+            variantNames.append(variantName)
+            layerFilename = self.asset.name + '_' + variantName + '.usdc'
+            if self.verbose:
+                print 'Animation variant:', variantName, 'in', layerFilename
+
+            self.setCurrentAnimStack(animStackIdx)
+            animLayer = Sdf.Layer.CreateNew(self.dstFolder + layerFilename)
+            Sdf.CreatePrimInLayer(animLayer, self.asset.getPath())
+            animLayer.defaultPrim = self.asset.name
+            self.animationLayers.append(layerFilename)
+
+            variantSet.AddVariant(variantName)
+            variantSet.SetVariantSelection(variantName)
+            with variantSet.GetVariantEditContext():
+                usdPrim.GetReferences().AddReference('./' + layerFilename)
+
+            # stage edits go to anim layer, while it is in the layer stack as sublayer of session layer
+            sessionLayer.subLayerPaths.append(animLayer.identifier)
+            self.usdStage.SetEditTarget(animLayer)
+            try:
+                usdSkelAnims = self.processStackAnimations()
+            finally:
+                self.usdStage.SetEditTarget(self.usdStage.GetRootLayer())
+                sessionLayer.subLayerPaths.remove(animLayer.identifier)
+            for skeletonIdx in range(len(usdSkelAnims)):
+                if animationPathsBySkeleton[skeletonIdx] is None and usdSkelAnims[skeletonIdx] is not None:
+                    animationPathsBySkeleton[skeletonIdx] = usdSkelAnims[skeletonIdx].GetPath()
+
+            animLayer.startTimeCode = self.asset.toTimeCode(self.startAnimationTime)
+            animLayer.endTimeCode = self.asset.toTimeCode(self.stopAnimationTime)
+            animLayer.timeCodesPerSecond = self.asset.timeCodesPerSecond
+            animLayer.Save()
+
+        variantSet.SetVariantSelection(variantNames[0])
+        self.setCurrentAnimStack(0)
+
+        # animation prims have the same paths in all anim layers
+        for skeletonIdx in range(len(animationPathsBySkeleton)):
+            if animationPathsBySkeleton[skeletonIdx] is not None:
+                usdSkelAnim = UsdSkel.Animation(self.usdStage.GetPrimAtPath(animationPathsBySkeleton[skeletonIdx]))
+                self.getAnimatedSkeletons()[skeletonIdx].setSkeletalAnimation(usdSkelAnim)
 
 
     def makeUsdStage(self):
@@ -982,27 +1432,136 @@ class FbxConverter:
             else:
                 self.usdStage.SetMetadata("metersPerUnit", metersPerUnit)
 
-        self.processMaterials()
-        self.processSkinning()
-        self.prepareAnimations()
-        self.processNode(self.fbxScene.GetRootNode(), self.asset.getGeomPath(), None, '')
-        self.processSkeletalAnimations()
-        self.processSkinnedMeshes()
+        with usdUtils.profileStage('materials'):
+            self.processMaterials()
+        with usdUtils.profileStage('skinning'):
+            self.processSkinning()
+        with usdUtils.profileStage('animation'):
+            self.prepareAnimations()
+        with usdUtils.profileStage('geometry'):
+            self.processNode(self.fbxScene.GetRootNode(), self.asset.getGeomPath(), None, '')
+        with usdUtils.profileStage('animation'):
+            self.processAnimations()
+        with usdUtils.profileStage('skinning'):
+            self.processSkinnedMeshes()
+        with usdUtils.profileStage('textures'):
+            self.fileCopier.join()
         self.asset.finalize()
         return self.usdStage
 
 
-def usdStageWithFbx(fbxPath, usdPath, legacyModifier, copyTextures, verbose):
+def getFbxCacheKey(fbxPath, usdPath, legacyModifier, copyTextures, normalsCreaseAngle, maxSkinInfluences, sampleKeyTimes):
+    # asset name and copied texture paths depend on output filename
+    options = [FBX_CACHE_VERSION, os.path.basename(usdPath), copyTextures, normalsCreaseAngle, maxSkinInfluences, sampleKeyTimes,
+        legacyModifier.getMetersPerUnit() if legacyModifier is not None else None]
+    sha = hashlib.sha1()
+    sha.update(usdUtils.getFileHash(fbxPath).encode('utf-8'))
+    sha.update(repr(options).encode('utf-8'))
+
+    # cached layer has texture paths resolved against source folder, so textures and folder are part of the key
+    filenameFull = fbxPath.split('/')[-1]
+    srcFolder = fbxPath[:len(fbxPath)-len(filenameFull)]
+    sha.update(('\nfolder ' + srcFolder + ' ' + os.path.abspath(srcFolder or '.') + '\n').encode('utf-8'))
+    folderIndices = {}
+    for filename in sorted(usdUtils.findReferencedFilenames(fbxPath)):
+        path = usdUtils.resolvePath(filename, srcFolder, folderIndices)
+        fileHash = usdUtils.getFileHash(path) if os.path.isfile(path) else 'missing'
+        sha.update(('texture ' + filename + ' ' + path + ' ' + fileHash + '\n').encode('utf-8'))
+    return sha.hexdigest()
+
+
+def loadFbxCache(cacheFolder, cacheKey, usdPath, legacyModifier, verbose):
+    cachePath = os.path.join(cacheFolder, cacheKey)
+    if not os.path.isfile(cachePath + '.usdc') or not os.path.isfile(cachePath + '.json'):
+        return None
+    try:
+        with open(cachePath + '.json', 'r') as file:
+            cacheInfo = json.load(file)
+        cachedLayer = Sdf.Layer.OpenAsAnonymous(cachePath + '.usdc')
+    except (IOError, ValueError, Tf.ErrorException):
+        usdUtils.printWarning("can't read FBX cache " + cachePath)
+        return None
+    if cachedLayer is None:
+        return None
+    if verbose:
+        print 'Using FBX cache:', cachePath + '.usdc'
+
+    # anim stack layers are copied first, so references of root layer are resolved
+    filenameFull = usdPath.split('/')[-1]
+    dstFolder = usdPath[:len(usdPath)-len(filenameFull)]
+    for layerFilename in cacheInfo['animationLayers']:
+        usdUtils.copy(cachePath + '_' + layerFilename, dstFolder + layerFilename, verbose)
+
+    usdStage = Usd.Stage.CreateNew(usdPath)
+    usdStage.GetRootLayer().TransferContent(cachedLayer)
+    with usdUtils.FileCopier(verbose) as fileCopier:
+        for srcTextureFilename, textureFilename in cacheInfo['copiedTextures'].items():
+            fileCopier.copy(srcTextureFilename, dstFolder + textureFilename)
+
+    if legacyModifier is not None and cacheInfo['metersPerUnit'] is not None:
+        legacyModifier.setMetersPerUnit(cacheInfo['metersPerUnit'])
+    return usdStage
+
+
+def saveFbxCache(cacheFolder, cacheKey, usdStage, copiedTextures, animationLayers, legacyModifier):
+    cachePath = os.path.join(cacheFolder, cacheKey)
+    cacheInfo = {
+        'copiedTextures': copiedTextures,
+        'animationLayers': animationLayers,
+        'metersPerUnit': legacyModifier.getMetersPerUnit() if legacyModifier is not None else None
+    }
+    layerFolder = os.path.dirname(usdStage.GetRootLayer().realPath)
+    tmpPaths = []
+    try:
+        usdUtils.makeFolder(cacheFolder)
+        # write to temporary files first, so concurrent runs never see partial cache entries
+        # .json file is renamed last, cache entry is used only when it exists
+        suffixes = ['_' + layerFilename for layerFilename in animationLayers] + ['.usdc', '.json']
+        for suffix in suffixes:
+            handle, tmpPath = tempfile.mkstemp(prefix='.' + cacheKey, suffix=suffix, dir=cacheFolder)
+            os.close(handle)
+            tmpPaths.append(tmpPath)
+        for layerIdx in range(len(animationLayers)):
+            usdUtils.copy(os.path.join(layerFolder, animationLayers[layerIdx]), tmpPaths[layerIdx])
+        usdStage.GetRootLayer().Export(tmpPaths[-2])
+        with open(tmpPaths[-1], 'w') as file:
+            json.dump(cacheInfo, file)
+        for suffixIdx in range(len(suffixes)):
+            os.rename(tmpPaths[suffixIdx], cachePath + suffixes[suffixIdx])
+    except (IOError, OSError, Tf.ErrorException):
+        usdUtils.printWarning("can't write FBX cache " + cachePath)
+        for tmpPath in tmpPaths:
+            if os.path.isfile(tmpPath):
+                os.remove(tmpPath)
+
+
+def usdStageWithFbx(fbxPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle=None, maxSkinInfluences=0, sampleKeyTimes=False, cacheFolder=None):
+    cacheKey = None
+    if cacheFolder:
+        cacheKey = getFbxCacheKey(fbxPath, usdPath, legacyModifier, copyTextures, normalsCreaseAngle, maxSkinInfluences, sampleKeyTimes)
+        usdStage = loadFbxCache(cacheFolder, cacheKey, usdPath, legacyModifier, verbose)
+        if usdStage is not None:
+            return usdStage
+
     if usdStageWithFbxLoaded == False:
         return None
 
+    fbxConverter = None
     try:
-        fbxConverter = FbxConverter(fbxPath, usdPath, legacyModifier, copyTextures, verbose)
-        return fbxConverter.makeUsdStage()
+        with usdUtils.profileStage('parse'):
+            fbxConverter = FbxConverter(fbxPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle, maxSkinInfluences, sampleKeyTimes)
+        with fbxConverter.fileCopier:
+            usdStage = fbxConverter.makeUsdStage()
+        if cacheKey is not None:
+            saveFbxCache(cacheFolder, cacheKey, usdStage, fbxConverter.copiedTextures, fbxConverter.animationLayers, legacyModifier)
+        return usdStage
     except ConvertError:
         return None
     except:
         raise
+    finally:
+        if fbxConverter is not None:
+            fbxConverter.destroy()
 
     return None
 
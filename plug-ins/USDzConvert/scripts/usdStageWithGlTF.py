@@ -1,4 +1,4 @@
-from pxr import *
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade, UsdSkel, Vt
 
 import json
 import struct
@@ -330,7 +330,7 @@ class Accessor:
 
 
 class glTFConverter:
-    def __init__(self, gltfPath, usdPath, legacyModifier, copyTextures, verbose):
+    def __init__(self, gltfPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle=None):
         self.usdStage = None
         self.buffers = []
         self.gltf = None
@@ -340,6 +340,7 @@ class glTFConverter:
         self.nodeNames = {} # to avoid duplicate node names
         self.copyTextures = copyTextures
         self.verbose = verbose
+        self.normalsCreaseAngle = normalsCreaseAngle # generate normals if they are absent
         self.legacyModifier = legacyModifier # for iOS 12 compatibility
         self.skeletonByNode = {} # collect skinned mesh to construct later 
         self._worldTransforms = {} # use self.getWorldTransform(nodeIdx)
@@ -1035,6 +1036,9 @@ class glTFConverter:
 
             usdMesh.CreateSubdivisionSchemeAttr(UsdGeom.Tokens.none)
 
+            if 'NORMAL' not in attributes and self.normalsCreaseAngle is not None:
+                usdUtils.generateNormals(usdMesh, self.normalsCreaseAngle)
+
         # bind material to mesh
         if 'material' in gltfPrimitive:
             materialIdx = gltfPrimitive['material']
@@ -1223,19 +1227,27 @@ class glTFConverter:
         if self.legacyModifier is None:
             # gltf units for all linear distance are meters
             self.usdStage.SetMetadata("metersPerUnit", 1)
-        self.createMaterials()
-        self.prepareSkinning()
-        self.prepareAnimations()
-        self.processNodeChildren(self.gltf['scenes'][0]['nodes'], self.asset.getGeomPath(), None)
-        self.processSkeletonAnimation()
-        self.processSkinnedMeshes()
-        self.processNodeTransformAnimation()
+        with usdUtils.profileStage('materials'):
+            self.createMaterials()
+        with usdUtils.profileStage('skinning'):
+            self.prepareSkinning()
+        with usdUtils.profileStage('animation'):
+            self.prepareAnimations()
+        with usdUtils.profileStage('geometry'):
+            self.processNodeChildren(self.gltf['scenes'][0]['nodes'], self.asset.getGeomPath(), None)
+        with usdUtils.profileStage('animation'):
+            self.processSkeletonAnimation()
+        with usdUtils.profileStage('skinning'):
+            self.processSkinnedMeshes()
+        with usdUtils.profileStage('animation'):
+            self.processNodeTransformAnimation()
         self.asset.finalize()
         return self.usdStage
 
 
 
-def usdStageWithGlTF(gltfPath, usdPath, legacyModifier, copyTextures, verbose):
-    converter = glTFConverter(gltfPath, usdPath, legacyModifier, copyTextures, verbose)
+def usdStageWithGlTF(gltfPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle=None):
+    with usdUtils.profileStage('parse'):
+        converter = glTFConverter(gltfPath, usdPath, legacyModifier, copyTextures, verbose, normalsCreaseAngle)
     return converter.makeUsdStage()
 
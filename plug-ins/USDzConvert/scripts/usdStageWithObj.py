@@ -1,9 +1,11 @@
-from pxr import *
+from pxr import Gf, Sdf, UsdGeom, UsdShade, Vt
 
 import struct
 import sys
 import os.path
+import re
 import time
+import numpy
 
 import usdUtils
 
@@ -14,6 +16,47 @@ __all__ = ['usdStageWithObj']
 INVALID_INDEX = -1
 LAST_ELEMENT = -1
 
+# modes to merge OBJ groups
+MERGE_GROUPS_NONE = ''              # one mesh per group
+MERGE_GROUPS_BY_MATERIAL = 'material' # one mesh per material
+MERGE_GROUPS_TO_SUBSETS = 'subsets' # one mesh with material subsets
+
+OBJ_READ_CHUNK_SIZE = 16 * 1024 * 1024
+
+# '#' starts comment at line start or after whitespace, names like mat#2 keep it
+commentRegex = re.compile(br'(?:^|\s)#')
+
+# MTL statements converted to material inputs
+mtlColorInputs = {
+    'Kd': usdUtils.InputName.diffuseColor,
+    'Ke': usdUtils.InputName.emissiveColor
+}
+
+mtlValueInputs = {
+    'd': usdUtils.InputName.opacity,
+    'Pr': usdUtils.InputName.roughness,
+    'Pm': usdUtils.InputName.metallic
+}
+
+mtlMapInputs = {
+    'map_Kd': (usdUtils.InputName.diffuseColor, 'rgb'),
+    'map_Ke': (usdUtils.InputName.emissiveColor, 'rgb'),
+    'map_d': (usdUtils.InputName.opacity, 'a'),
+    'map_Bump': (usdUtils.InputName.normal, 'rgb'),
+    'map_bump': (usdUtils.InputName.normal, 'rgb'),
+    'bump': (usdUtils.InputName.normal, 'rgb'),
+    'norm': (usdUtils.InputName.normal, 'rgb'),
+    'map_Pr': (usdUtils.InputName.roughness, 'r'),
+    'map_Pm': (usdUtils.InputName.metallic, 'r')
+}
+
+# maximum number of parameters of texture map options, like: map_Kd -s 1 1 1 -clamp on file.png
+mtlMapOptions = {
+    '-blendu': 1, '-blendv': 1, '-bm': 1, '-boost': 1, '-cc': 1, '-clamp': 1, '-imfchan': 1, '-texres': 1, '-type': 1,
+    '-mm': 2,
+    '-o': 3, '-s': 3, '-t': 3
+}
+
 
 def convertObjIndexToUsd(strIndex, elementsCount):
     if not strIndex:
@@ -30,6 +73,8 @@ def convertObjIndexToUsd(strIndex, elementsCount):
 
 def fixExponent(value):
     # allow for scientific notation with X.Y(+/-)eZ
+    if isinstance(value, bytes):
+        value = value.decode('ascii')
     return float(value.lower().replace('+e', 'e+').replace('-e', 'e-'))
 
 
@@ -42,16 +87,85 @@ def floatList(v):
         raise
 
 
-def linesContinuation(fileHandle):
-    for line in fileHandle:
-        line = line.rstrip('\n')
-        line = line.rstrip()
-        while line.endswith('\\'):
-            thisLine = line[:-1]
-            nextLine = next(fileHandle).rstrip('\n')
-            nextLine = nextLine.strip()
-            line = thisLine + ' ' + nextLine
-        yield line
+def isFloat(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def getMtlMapFilename(arguments):
+    # skip texture map options and return the rest as file name (can be with spaces)
+    argIdx = 0
+    while argIdx < len(arguments) and arguments[argIdx] in mtlMapOptions:
+        maxParameters = mtlMapOptions[arguments[argIdx]]
+        argIdx += 1
+        if maxParameters == 1:
+            argIdx += 1
+            continue
+        parameterIdx = 0
+        while parameterIdx < maxParameters and argIdx < len(arguments) and isFloat(arguments[argIdx]):
+            argIdx += 1
+            parameterIdx += 1
+    return ' '.join(arguments[argIdx:])
+
+
+def gatherFaces(faceVertexCounts, faces):
+    # returns vertex counts of faces and indices of their corners in face-vertex arrays
+    faceVertexCounts = numpy.asarray(faceVertexCounts, dtype=numpy.int32)
+    faces = numpy.asarray(faces, dtype=numpy.int32)
+    faceStarts = numpy.cumsum(faceVertexCounts) - faceVertexCounts
+    counts = faceVertexCounts[faces]
+    # offset of each corner from its position in gathered array to its position in source array
+    offsets = faceStarts[faces] - (numpy.cumsum(counts) - counts)
+    corners = numpy.arange(numpy.sum(counts), dtype=numpy.int32) + numpy.repeat(offsets, counts)
+    return counts, corners
+
+
+def decodeName(arguments):
+    # OBJ file is read in binary mode, only names are decoded
+    name = b' '.join(arguments)
+    if isinstance(name, str):
+        return name
+    return name.decode('utf-8', 'replace')
+
+
+def stripComment(line):
+    if b'#' in line:
+        match = commentRegex.search(line)
+        if match:
+            line = line[:match.start()].rstrip()
+    return line
+
+
+def binaryLinesContinuation(fileHandle, chunkSize=OBJ_READ_CHUNK_SIZE):
+    # reads binary file with big chunks, yields stripped lines without comments and empty lines
+    continuedLine = b''
+    tail = b''
+    while True:
+        chunk = fileHandle.read(chunkSize)
+        if chunk:
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+        else:
+            lines = [tail]
+        for line in lines:
+            line = line.strip()
+            if continuedLine:
+                line = continuedLine + b' ' + line
+                continuedLine = b''
+            if line.endswith(b'\\'):
+                continuedLine = line[:-1].rstrip()
+                continue
+            line = stripComment(line)
+            if line:
+                yield line
+        if not chunk:
+            break
+    continuedLine = stripComment(continuedLine)
+    if continuedLine:
+        yield continuedLine
 
 
 
@@ -75,6 +189,7 @@ class Group:
         self.normalsHaveOwnIndices = False  # avoid creating indexed normal UsdAttribute if normal indices are identical to vertex indices
 
         self.faceVertexCounts = []
+        self.faceGroupIndices = None # indices of source groups per face for merged groups
         self.setMaterial(materialIndex)
 
 
@@ -102,9 +217,14 @@ class Group:
 
 
 class ObjConverter:
-    def __init__(self, objPath, usdPath, verbose):
+    def __init__(self, objPath, usdPath, legacyModifier, copyTextures, verbose, mergeGroups=MERGE_GROUPS_NONE, keepGroupNames=False, normalsCreaseAngle=None):
         self.usdPath = usdPath
+        self.legacyModifier = legacyModifier
+        self.copyTextures = copyTextures
         self.verbose = verbose
+        self.mergeGroups = mergeGroups
+        self.keepGroupNames = keepGroupNames
+        self.normalsCreaseAngle = normalsCreaseAngle # generate normals if they are absent
         self.vertices = []
         self.colors = []
         self.uvs = []
@@ -112,15 +232,26 @@ class ObjConverter:
 
         self.groups = {}
         self.currentGroup = None
+        self.groupNames = [] # names of source groups for merged meshes
 
         self.materials = []
         self.materialIndicesByName = {}
+        self.mtlMaterials = {} # materials loaded from MTL files by name
+        self.copiedTextures = {} # avoid copying textures more then once
+        self.copiedTextureFilenames = set() # to find name collisions of copied textures
+        self.folderIndices = {} # folder walks of texture lookups, dropped with converter
         self.currentMaterial = INVALID_INDEX
         self.usdMaterials = []
         self.usdDefaultMaterial = None
         self.asset = None
         self.setGroup()
 
+        filenameFull = objPath.split('/')[-1]
+        self.srcFolder = objPath[:len(objPath)-len(filenameFull)]
+
+        filenameFull = usdPath.split('/')[-1]
+        self.dstFolder = usdPath[:len(usdPath)-len(filenameFull)]
+
         self.parseObjFile(objPath)
 
 
@@ -175,7 +306,7 @@ class ObjConverter:
         # arguments have format like this: ['1/1/1', '2/2/2', '3/3/3']
         faceVertexCount = 0
         for indexStr in arguments:
-            indices = indexStr.split('/')
+            indices = indexStr.split(b'/')
 
             vertexIndex = convertObjIndexToUsd(indices[0], len(self.vertices))
             if vertexIndex == INVALID_INDEX:
@@ -227,18 +358,19 @@ class ObjConverter:
         usdMesh = UsdGeom.Mesh.Define(usdStage, geomPath + '/' + groupName)
         usdMesh.CreateSubdivisionSchemeAttr(UsdGeom.Tokens.none)
 
-        usdMesh.CreateFaceVertexCountsAttr(group.faceVertexCounts)
+        usdMesh.CreateFaceVertexCountsAttr(Vt.IntArray(numpy.asarray(group.faceVertexCounts, dtype=numpy.int32)))
 
         # vertices
-        minVertexIndex = min(group.vertexIndices)
-        maxVertexIndex = max(group.vertexIndices)
+        vertexIndices = numpy.asarray(group.vertexIndices, dtype=numpy.int32)
+        minVertexIndex = int(numpy.min(vertexIndices))
+        maxVertexIndex = int(numpy.max(vertexIndices))
 
         groupVertices = self.vertices[minVertexIndex:maxVertexIndex+1]
         usdMesh.CreatePointsAttr(groupVertices)
         if minVertexIndex == 0: # optimization
-            usdMesh.CreateFaceVertexIndicesAttr(group.vertexIndices)
+            usdMesh.CreateFaceVertexIndicesAttr(Vt.IntArray(vertexIndices))
         else:
-            usdMesh.CreateFaceVertexIndicesAttr(map(lambda x: x - minVertexIndex, group.vertexIndices))
+            usdMesh.CreateFaceVertexIndicesAttr(Vt.IntArray(vertexIndices - minVertexIndex))
 
         extent = Gf.Range3f()
         for pt in groupVertices:
@@ -251,36 +383,46 @@ class ObjConverter:
             colorAttr.Set(self.colors[minVertexIndex:maxVertexIndex+1])
 
         # texture coordinates
-        minUvIndex = min(group.uvIndices)
-        maxUvIndex = max(group.uvIndices)
+        uvIndices = numpy.asarray(group.uvIndices, dtype=numpy.int32)
+        minUvIndex = int(numpy.min(uvIndices))
+        maxUvIndex = int(numpy.max(uvIndices))
 
         if minUvIndex >= 0:
             if group.uvsHaveOwnIndices:
                 uvPrimvar = usdMesh.CreatePrimvar('st', Sdf.ValueTypeNames.TexCoord2fArray, UsdGeom.Tokens.faceVarying)
                 uvPrimvar.Set(self.uvs[minUvIndex:maxUvIndex+1])
                 if minUvIndex == 0:  # optimization
-                    uvPrimvar.SetIndices(Vt.IntArray(group.uvIndices))
+                    uvPrimvar.SetIndices(Vt.IntArray(uvIndices))
                 else:
-                    uvPrimvar.SetIndices(Vt.IntArray(map(lambda x: x - minUvIndex, group.uvIndices)))
+                    uvPrimvar.SetIndices(Vt.IntArray(uvIndices - minUvIndex))
             else:
                 uvPrimvar = usdMesh.CreatePrimvar('st', Sdf.ValueTypeNames.TexCoord2fArray, UsdGeom.Tokens.vertex)
                 uvPrimvar.Set(self.uvs[minUvIndex:maxUvIndex+1])
 
         # normals
-        minNormalIndex = min(group.normalIndices)
-        maxNormalIndex = max(group.normalIndices)
+        normalIndices = numpy.asarray(group.normalIndices, dtype=numpy.int32)
+        minNormalIndex = int(numpy.min(normalIndices))
+        maxNormalIndex = int(numpy.max(normalIndices))
 
         if minNormalIndex >= 0:
             if group.normalsHaveOwnIndices:
                 normalPrimvar = usdMesh.CreatePrimvar('normals', Sdf.ValueTypeNames.Normal3fArray, UsdGeom.Tokens.faceVarying)
                 normalPrimvar.Set(self.normals[minNormalIndex:maxNormalIndex+1])
                 if minNormalIndex == 0:  # optimization
-                    normalPrimvar.SetIndices(Vt.IntArray(group.normalIndices))
+                    normalPrimvar.SetIndices(Vt.IntArray(normalIndices))
                 else:
-                    normalPrimvar.SetIndices(Vt.IntArray(map(lambda x: x - minNormalIndex, group.normalIndices)))
+                    normalPrimvar.SetIndices(Vt.IntArray(normalIndices - minNormalIndex))
             else:
                 normalPrimvar = usdMesh.CreatePrimvar('normals', Sdf.ValueTypeNames.Normal3fArray, UsdGeom.Tokens.vertex)
                 normalPrimvar.Set(self.normals[minNormalIndex:maxNormalIndex+1])
+        elif self.normalsCreaseAngle is not None:
+            usdUtils.generateNormals(usdMesh, self.normalsCreaseAngle)
+
+        # names of source groups as face set primvar
+        if group.faceGroupIndices is not None:
+            groupNamePrimvar = usdMesh.CreatePrimvar('groupName', Sdf.ValueTypeNames.StringArray, UsdGeom.Tokens.uniform)
+            groupNamePrimvar.Set(self.groupNames)
+            groupNamePrimvar.SetIndices(Vt.IntArray(group.faceGroupIndices))
 
         # materials
         if len(group.subsets) == 1:
@@ -306,29 +448,216 @@ class ObjConverter:
                     UsdShade.MaterialBindingAPI(usdSubset).Bind(self.getUsdMaterial(materialIndex))
 
 
-    def parseObjFile(self, objPath):
-        with open(objPath) as file:
-            for line in linesContinuation(file):
-                line = line.strip()
-                if not line or '#' == line[0]:
+    def mergeSubsets(self, parts):
+        # parts is a list of (groupIndex, group, subsets) to merge to one group
+        merged = Group(INVALID_INDEX)
+        merged.subsets = []
+        faceVertexCounts = []
+        vertexIndices = []
+        uvIndices = []
+        normalIndices = []
+        faceMaterials = []
+        faceGroupIndices = []
+        for groupIndex, group, subsets in parts:
+            faces = [numpy.asarray(subset.faces, dtype=numpy.int32) for subset in subsets]
+            counts, corners = gatherFaces(group.faceVertexCounts, numpy.concatenate(faces))
+            faceVertexCounts.append(counts)
+            vertexIndices.append(numpy.asarray(group.vertexIndices, dtype=numpy.int32)[corners])
+            uvIndices.append(numpy.asarray(group.uvIndices, dtype=numpy.int32)[corners])
+            normalIndices.append(numpy.asarray(group.normalIndices, dtype=numpy.int32)[corners])
+            for subset, subsetFaces in zip(subsets, faces):
+                faceMaterials.append(numpy.full(len(subsetFaces), subset.materialIndex, dtype=numpy.int32))
+            faceGroupIndices.append(numpy.full(len(counts), groupIndex, dtype=numpy.int32))
+            merged.uvsHaveOwnIndices = merged.uvsHaveOwnIndices or group.uvsHaveOwnIndices
+            merged.normalsHaveOwnIndices = merged.normalsHaveOwnIndices or group.normalsHaveOwnIndices
+
+        merged.faceVertexCounts = numpy.concatenate(faceVertexCounts)
+        merged.vertexIndices = numpy.concatenate(vertexIndices)
+        merged.uvIndices = numpy.concatenate(uvIndices)
+        merged.normalIndices = numpy.concatenate(normalIndices)
+        if self.keepGroupNames:
+            merged.faceGroupIndices = numpy.concatenate(faceGroupIndices)
+
+        faceMaterials = numpy.concatenate(faceMaterials)
+        for materialIndex in numpy.unique(faceMaterials):
+            subset = Subset(int(materialIndex))
+            subset.faces = numpy.flatnonzero(faceMaterials == materialIndex).astype(numpy.int32)
+            merged.subsets.append(subset)
+        return merged
+
+
+    def getPartAttributes(self, part):
+        # returns if all corners of part have UVs and normals
+        groupIndex, group, subsets = part
+        faces = numpy.concatenate([numpy.asarray(subset.faces, dtype=numpy.int32) for subset in subsets])
+        corners = gatherFaces(group.faceVertexCounts, faces)[1]
+        hasUVs = bool(numpy.min(numpy.asarray(group.uvIndices, dtype=numpy.int32)[corners]) >= 0)
+        hasNormals = bool(numpy.min(numpy.asarray(group.normalIndices, dtype=numpy.int32)[corners]) >= 0)
+        return hasUVs, hasNormals
+
+
+    def addMergedGroups(self, mergedGroups, name, parts):
+        # parts without UVs or normals are merged separately, so other parts keep them
+        partsByAttributes = {}
+        for part in parts:
+            partsByAttributes.setdefault(self.getPartAttributes(part), []).append(part)
+        for (hasUVs, hasNormals), sameParts in sorted(partsByAttributes.items(), reverse=True):
+            suffix = ''
+            if len(partsByAttributes) > 1:
+                suffix = ('' if hasUVs else 'NoUVs') + ('' if hasNormals else 'NoNormals')
+            mergedGroups[name + suffix] = self.mergeSubsets(sameParts)
+
+
+    def makeMergedGroups(self):
+        # returns merged groups by their names
+        self.groupNames = []
+        groupsByMaterial = {}
+        allParts = []
+        for groupName, group in self.groups.iteritems():
+            subsets = [subset for subset in group.subsets if len(subset.faces) > 0]
+            if len(subsets) == 0:
+                continue
+            groupIndex = len(self.groupNames)
+            self.groupNames.append(groupName)
+            allParts.append((groupIndex, group, subsets))
+            for subset in subsets:
+                groupsByMaterial.setdefault(subset.materialIndex, []).append((groupIndex, group, [subset]))
+
+        mergedGroups = {}
+        if len(allParts) == 0:
+            return mergedGroups
+
+        if self.mergeGroups == MERGE_GROUPS_BY_MATERIAL:
+            for materialIndex, parts in groupsByMaterial.iteritems():
+                name = self.materials[materialIndex] if 0 <= materialIndex and materialIndex < len(self.materials) else 'defaultMaterial'
+                self.addMergedGroups(mergedGroups, name + 'Mesh', parts)
+        else:
+            self.addMergedGroups(mergedGroups, 'mesh', allParts)
+        if self.verbose:
+            print '  merged', len(allParts), 'groups to', len(mergedGroups), 'mesh(es)'
+        return mergedGroups
+
+
+    def getTextureFilename(self, filename, mtlFolder):
+        srcTextureFilename = filename.replace('\\', '/')
+        if os.path.isfile(mtlFolder + srcTextureFilename):
+            srcTextureFilename = mtlFolder + srcTextureFilename
+        else:
+            srcTextureFilename = usdUtils.resolvePath(srcTextureFilename, mtlFolder, self.folderIndices)
+        if srcTextureFilename in self.copiedTextures:
+            return self.copiedTextures[srcTextureFilename]
+
+        textureFilename = usdUtils.makeValidPath(srcTextureFilename)
+        if self.copyTextures or srcTextureFilename != textureFilename:
+            newTextureFilename = 'textures/' + os.path.basename(textureFilename)
+
+            # do not rewrite the texture with same basename
+            subfolderIdx = 0
+            while newTextureFilename in self.copiedTextureFilenames:
+                newTextureFilename = 'textures/' + str(subfolderIdx) + '/' + os.path.basename(textureFilename)
+                subfolderIdx += 1
+
+            usdUtils.copy(srcTextureFilename, self.dstFolder + newTextureFilename, self.verbose)
+            self.copiedTextureFilenames.add(newTextureFilename)
+            textureFilename = newTextureFilename
+        else:
+            textureFilename = os.path.abspath(srcTextureFilename)
+
+        self.copiedTextures[srcTextureFilename] = textureFilename
+        return textureFilename
+
+
+    def finalizeMtlMaterial(self, material):
+        if material is None:
+            return
+        opacity = material.inputs.get(usdUtils.InputName.opacity)
+        if isinstance(opacity, usdUtils.Map):
+            # map_d is usually a one channel texture, use alpha channel only if it is diffuse texture
+            diffuse = material.inputs.get(usdUtils.InputName.diffuseColor)
+            if not isinstance(diffuse, usdUtils.Map) or diffuse.file != opacity.file:
+                opacity.channels = 'r'
+        if self.legacyModifier is not None:
+            self.legacyModifier.opacityAndDiffuseOneTexture(material)
+
+
+    def parseMtlFile(self, mtlPath):
+        filenameFull = mtlPath.split('/')[-1]
+        mtlFolder = mtlPath[:len(mtlPath)-len(filenameFull)]
+
+        material = None
+        with open(mtlPath, 'rb') as file:
+            for line in binaryLinesContinuation(file):
+                arguments = decodeName([line]).split()
+                command = arguments[0]
+                arguments = arguments[1:]
+
+                if 'newmtl' == command:
+                    self.finalizeMtlMaterial(material)
+                    name = ' '.join(arguments)
+                    material = usdUtils.Material(name)
+                    self.mtlMaterials[name] = material
+                    if self.verbose:
+                        print '  loading material:', name
+                elif material is None:
                     continue
+                elif command in mtlColorInputs:
+                    if len(arguments) == 0 or not isFloat(arguments[0]):
+                        continue # spectral and xyz colors are not supported
+                    color = floatList(arguments)
+                    if len(color) < 3:
+                        color = [color[0], color[0], color[0]]
+                    material.inputs[mtlColorInputs[command]] = color[0:3]
+                elif command in mtlValueInputs:
+                    if len(arguments) > 0 and isFloat(arguments[-1]):
+                        material.inputs[mtlValueInputs[command]] = float(arguments[-1])
+                elif 'Tr' == command:
+                    if len(arguments) > 0 and isFloat(arguments[-1]):
+                        material.inputs[usdUtils.InputName.opacity] = 1.0 - float(arguments[-1])
+                elif command in mtlMapInputs:
+                    filename = getMtlMapFilename(arguments)
+                    if filename:
+                        inputName, channels = mtlMapInputs[command]
+                        textureFilename = self.getTextureFilename(filename, mtlFolder)
+                        material.inputs[inputName] = usdUtils.Map(channels, textureFilename)
+
+        self.finalizeMtlMaterial(material)
+
+
+    def loadMtlLibrary(self, name):
+        mtlPath = self.srcFolder + name.replace('\\', '/')
+        if os.path.isfile(mtlPath):
+            self.parseMtlFile(mtlPath)
+            return
+        # mtllib can have several file names separated with spaces
+        for filename in name.split(' '):
+            mtlPath = usdUtils.resolvePath(filename, self.srcFolder, self.folderIndices)
+            if os.path.isfile(mtlPath):
+                self.parseMtlFile(mtlPath)
+            else:
+                usdUtils.printWarning("can't find material library " + filename)
+
 
-                arguments = filter(None, line.split(' '))
+    def parseObjFile(self, objPath):
+        with open(objPath, 'rb') as file:
+            for line in binaryLinesContinuation(file):
+                arguments = line.split()
                 command = arguments[0]
                 arguments = arguments[1:]
-                
-                if 'v' == command:
+
+                if b'v' == command:
                     self.addVertex(arguments)
-                elif 'vt' == command:
+                elif b'vt' == command:
                     self.addUV(arguments)
-                elif 'vn' == command:
+                elif b'vn' == command:
                     self.addNormal(arguments)
-                elif 'f' == command:
+                elif b'f' == command:
                     self.addFace(arguments)
-                elif 'g' == command or 'o' == command:
-                    self.setGroup(' '.join(arguments))
-                elif 'usemtl' == command:
-                    self.setMaterial(' '.join(arguments))
+                elif b'g' == command or b'o' == command:
+                    self.setGroup(decodeName(arguments))
+                elif b'usemtl' == command:
+                    self.setMaterial(decodeName(arguments))
+                elif b'mtllib' == command:
+                    self.loadMtlLibrary(decodeName(arguments))
 
         self.checkLastSubsets()
 
@@ -338,26 +667,32 @@ class ObjConverter:
         usdStage = self.asset.makeUsdStage()
 
         # create all materials
-        for matName in self.materials:
-            material = usdUtils.Material(matName)
-            usdMaterial = material.makeUsdMaterial(self.asset)
-            self.usdMaterials.append(usdMaterial)
+        with usdUtils.profileStage('materials'):
+            for matName in self.materials:
+                material = self.mtlMaterials.get(matName)
+                if material is None:
+                    material = usdUtils.Material(matName)
+                usdMaterial = material.makeUsdMaterial(self.asset)
+                self.usdMaterials.append(usdMaterial)
 
         if len(self.vertices) == 0:
             return usdStage
 
         # create all meshes
-        geomPath = self.asset.getGeomPath()
-        for groupName, group in self.groups.iteritems():
-            self.createMesh(geomPath, group, groupName, usdStage)
+        with usdUtils.profileStage('geometry'):
+            geomPath = self.asset.getGeomPath()
+            groups = self.groups if self.mergeGroups == MERGE_GROUPS_NONE else self.makeMergedGroups()
+            for groupName, group in groups.iteritems():
+                self.createMesh(geomPath, group, groupName, usdStage)
 
         return usdStage
 
 
 
-def usdStageWithObj(objPath, usdPath, legacyModifier, verbose=0):
+def usdStageWithObj(objPath, usdPath, legacyModifier, copyTextures, verbose=0, mergeGroups=MERGE_GROUPS_NONE, keepGroupNames=False, normalsCreaseAngle=None):
     start = time.time()
-    converter = ObjConverter(objPath, usdPath, verbose)
+    with usdUtils.profileStage('parse'):
+        converter = ObjConverter(objPath, usdPath, legacyModifier, copyTextures, verbose, mergeGroups, keepGroupNames, normalsCreaseAngle)
     usdStage = converter.makeUsdStage()
     if verbose:
         print '  creating stage from obj file:', time.time() - start, 'sec'
@@ -1,8 +1,26 @@
 import os.path
+import sys
 from shutil import copyfile
 import re
 import math
-from pxr import *
+import hashlib
+import threading
+import struct
+import time
+import zlib
+import json
+import cProfile
+import contextlib
+import numpy
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+from pxr import Gf, Sdf, Usd, UsdGeom, UsdShade, UsdSkel, Vt
+try:
+    import resource
+except ImportError:
+    resource = None
 
 
 class ConvertError(Exception):
@@ -48,19 +66,330 @@ def getIndexByChannel(channel):
     return 0
 
 
+def makeFolder(folder):
+    if folder != '' and not os.path.isdir(folder):
+        try:
+            os.makedirs(folder)
+        except OSError:
+            # folder can be created by another thread or process
+            if not os.path.isdir(folder):
+                raise
+
+
 def copy(srcFile, dstFile, verbose=False):
     if verbose:
         print('Copying file:', srcFile, dstFile)
     if os.path.isfile(srcFile):
-        dstFolder = os.path.dirname(dstFile)
-        if dstFolder != '' and not os.path.isdir(dstFolder):
-            os.makedirs(dstFolder)
+        makeFolder(os.path.dirname(dstFile))
         copyfile(srcFile, dstFile)
     else:
         printWarning("can't find " + srcFile)
 
 
-def resolvePath(textureFileName, folder):
+def getFileHash(filename):
+    sha = hashlib.sha1()
+    with open(filename, 'rb') as file:
+        while True:
+            chunk = file.read(1 << 20)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def isSameFileContent(srcFile, dstFile):
+    if not os.path.isfile(srcFile) or not os.path.isfile(dstFile):
+        return False
+    if os.path.getsize(srcFile) != os.path.getsize(dstFile):
+        return False
+    return getFileHash(srcFile) == getFileHash(dstFile)
+
+
+
+# file names of textures, buffers and materials in binary or text files
+referencedFilenameRegex = re.compile(br'[\w\-./\\:]+\.(?:png|jpg|jpeg|tga|bmp|tif|tiff|gif|exr|hdr|psd|bin|mtl)\b', re.IGNORECASE)
+
+
+def findReferencedFilenames(filename):
+    with open(filename, 'rb') as file:
+        data = file.read()
+    return [match.decode('utf-8', 'replace') for match in set(referencedFilenameRegex.findall(data))]
+
+
+
+class FileCopier:
+    # copies files by a limited number of threads, join() waits for all copies
+    # with statement joins threads also if conversion fails, so they don't leak in long running processes
+    def __init__(self, verbose=False, threadsCount=4):
+        self.verbose = verbose
+        self.threadsCount = threadsCount
+        self.tasks = queue.Queue()
+        self.threads = []
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, excType, excValue, traceback):
+        self.join()
+        return False
+
+
+    def copy(self, srcFile, dstFile):
+        if len(self.threads) < self.threadsCount:
+            thread = threading.Thread(target=self._copyTasks)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        self.tasks.put((srcFile, dstFile))
+
+
+    def join(self):
+        for thread in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+
+    # private:
+    def _copyTasks(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            srcFile, dstFile = task
+            try:
+                if isSameFileContent(srcFile, dstFile):
+                    if self.verbose:
+                        print('File is up to date:', dstFile)
+                    continue
+                copy(srcFile, dstFile, self.verbose)
+            except (IOError, OSError) as error:
+                printWarning("can't copy " + srcFile + ': ' + str(error))
+
+
+
+class UsdzWriter:
+    # writes uncompressed zip archive with file data aligned to 64 bytes, as usdz requires
+    alignment = 64
+    localHeaderFormat = '<4s5H3L2H'
+    centralHeaderFormat = '<4s6H3L5H2L'
+    endOfCentralDirectoryFormat = '<4s4H2LH'
+    chunkSize = 1 << 20
+
+    def __init__(self, filename):
+        self.file = open(filename, 'wb')
+        self.entries = []
+
+
+    def addFile(self, name, srcFile):
+        st = os.stat(srcFile)
+        with open(srcFile, 'rb') as file:
+            self._addEntry(name, st.st_size, st.st_mtime, iter(lambda: file.read(UsdzWriter.chunkSize), b''))
+
+
+    def addData(self, name, data):
+        self._addEntry(name, len(data), time.time(), [data])
+
+
+    def addZipEntry(self, name, zipFile):
+        # streams entry of other zip archive without extracting it
+        info = zipFile.getinfo(name)
+        with zipFile.open(info) as file:
+            self._addEntry(name, info.file_size, time.mktime(info.date_time + (0, 0, -1)), iter(lambda: file.read(UsdzWriter.chunkSize), b''))
+
+
+    def close(self):
+        centralDirectoryStart = self.file.tell()
+        for name, extra, headerStart, dosTime, dosDate, crc, size in self.entries:
+            self.file.write(struct.pack(UsdzWriter.centralHeaderFormat, b'PK\001\002', 0, 10, 0, 0, dosTime, dosDate,
+                crc, size, size, len(name), len(extra), 0, 0, 0, 0, headerStart))
+            self.file.write(name)
+            self.file.write(extra)
+        centralDirectorySize = self.file.tell() - centralDirectoryStart
+        self.file.write(struct.pack(UsdzWriter.endOfCentralDirectoryFormat, b'PK\005\006', 0, 0, len(self.entries), len(self.entries),
+            centralDirectorySize, centralDirectoryStart, 0))
+        self.file.close()
+
+
+    # private:
+    def _getExtraField(self, offset):
+        # padding extra field 0x1986 moves file data to aligned offset
+        headerSize = 4
+        padding = -offset % UsdzWriter.alignment
+        if padding == 0:
+            return b''
+        if padding < headerSize:
+            padding += UsdzWriter.alignment
+        return struct.pack('<2H', 0x1986, padding - headerSize) + b'\0' * (padding - headerSize)
+
+
+    def _addEntry(self, name, size, mtime, chunks):
+        if size >= 0xFFFFFFFF:
+            printError("can't add " + name + ' to usdz package: file is too large.')
+            raise ConvertError()
+        name = name.encode('utf-8')
+        dt = time.localtime(mtime)[0:6]
+        dosDate = (max(dt[0], 1980) - 1980) << 9 | dt[1] << 5 | dt[2]
+        dosTime = dt[3] << 11 | dt[4] << 5 | (dt[5] // 2)
+
+        headerStart = self.file.tell()
+        extra = self._getExtraField(headerStart + struct.calcsize(UsdzWriter.localHeaderFormat) + len(name))
+        # CRC is known after data is written, so local header is updated afterwards
+        self.file.write(struct.pack(UsdzWriter.localHeaderFormat, b'PK\003\004', 10, 0, 0, dosTime, dosDate, 0, size, size, len(name), len(extra)))
+        self.file.write(name)
+        self.file.write(extra)
+        crc = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            self.file.write(chunk)
+        crc &= 0xFFFFFFFF
+        end = self.file.tell()
+        self.file.seek(headerStart + 14)
+        self.file.write(struct.pack('<L', crc))
+        self.file.seek(end)
+        self.entries.append((name, extra, headerStart, dosTime, dosDate, crc, size))
+
+
+def getCpuTimeScope():
+    # CPU time is measured for conversion thread, where it is supported
+    if hasattr(time, 'thread_time'):
+        return 'thread'
+    if resource is not None and hasattr(resource, 'RUSAGE_THREAD'):
+        return 'thread'
+    return 'process'
+
+
+def getCpuTime():
+    # CPU time of current thread, helper threads of conversion aren't included
+    if hasattr(time, 'thread_time'):
+        return time.thread_time()
+    if resource is not None and hasattr(resource, 'RUSAGE_THREAD'):
+        usage = resource.getrusage(resource.RUSAGE_THREAD)
+        return usage.ru_utime + usage.ru_stime
+    # CPU time of all threads of process
+    times = os.times()
+    return times[0] + times[1]
+
+
+def getPeakRSS():
+    # peak resident set size of process in MB, None if it is unknown
+    # memory isn't tracked per thread, so it includes concurrent conversions of process
+    if resource is None:
+        return None
+    peakRSS = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return peakRSS / (1024.0 * 1024.0) if sys.platform == 'darwin' else peakRSS / 1024.0
+
+
+
+class Profiler:
+    # collects wall time, CPU time and peak RSS of nested conversion stages
+    def __init__(self, statsFolder=''):
+        self.statsFolder = statsFolder
+        self.stages = {}
+        self.stageNames = [] # in order of first begin
+        self.stack = []
+        self.statsCount = 0
+
+
+    def begin(self, name):
+        if len(self.stack) > 0:
+            name = self.stack[-1][0] + '/' + name
+        self._getStage(name)
+
+        # cProfile can't be nested, so stats are collected for top level stages only
+        profile = None
+        if self.statsFolder and len(self.stack) == 0:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                profile = None
+        self.stack.append((name, time.time(), getCpuTime(), profile))
+
+
+    def end(self):
+        name, wallStart, cpuStart, profile = self.stack.pop()
+        self.addStage(name, time.time() - wallStart, getCpuTime() - cpuStart)
+        if profile is not None:
+            profile.disable()
+            makeFolder(self.statsFolder)
+            self.statsCount += 1
+            profile.dump_stats(os.path.join(self.statsFolder, '%02d_%s.prof' % (self.statsCount, name)))
+
+
+    def addStage(self, name, wallTime, cpuTime):
+        stage = self._getStage(name)
+        stage['wallTime'] += wallTime
+        stage['cpuTime'] += cpuTime
+        stage['calls'] += 1
+        stage['peakRSS'] = getPeakRSS()
+
+
+    def getReport(self):
+        # stages are still open if conversion failed
+        while len(self.stack) > 0:
+            self.end()
+        return {
+            'stages': [self.stages[name] for name in self.stageNames],
+            'peakRSS': getPeakRSS(),
+            'cpuTimeScope': getCpuTimeScope(),
+            'peakRSSScope': 'process'
+        }
+
+
+    def save(self, filename):
+        with open(filename, 'w') as file:
+            json.dump(self.getReport(), file, indent=2)
+
+
+    # private:
+    def _getStage(self, name):
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = {'name': name, 'wallTime': 0.0, 'cpuTime': 0.0, 'calls': 0, 'peakRSS': None}
+            self.stages[name] = stage
+            self.stageNames.append(name)
+        return stage
+
+
+
+_profilers = threading.local() # profiler of conversion running in current thread
+
+
+def setProfiler(profiler):
+    # binds profiler of conversion to current thread, returns previously bound profiler
+    previousProfiler = getattr(_profilers, 'profiler', None)
+    _profilers.profiler = profiler
+    return previousProfiler
+
+
+def beginStage(name):
+    profiler = getattr(_profilers, 'profiler', None)
+    if profiler is not None:
+        profiler.begin(name)
+
+
+def endStage():
+    profiler = getattr(_profilers, 'profiler', None)
+    if profiler is not None:
+        profiler.end()
+
+
+@contextlib.contextmanager
+def profileStage(name):
+    beginStage(name)
+    try:
+        yield
+    finally:
+        endStage()
+
+
+def resolvePath(textureFileName, folder, folderIndices=None):
+    # folderIndices is owned by one conversion and caches folder walks while it runs
     if textureFileName == '':
         return ''
     if os.path.isfile(textureFileName):
@@ -76,6 +405,9 @@ def resolvePath(textureFileName, folder):
 
     # TODO: try more precise finding with folders info
 
+    if folderIndices is not None:
+        return getFolderIndex(folder, folderIndices).get(basename, textureFileName)
+
     for root, dirnames, filenames in os.walk(folder):
         for filename in filenames:
             if filename == basename:
@@ -84,6 +416,19 @@ def resolvePath(textureFileName, folder):
     return textureFileName
 
 
+def getFolderIndex(folder, folderIndices):
+    # walk folder only once per conversion, next lookups for textures are dictionary lookups
+    index = folderIndices.get(folder)
+    if index is None:
+        index = {}
+        for root, dirnames, filenames in os.walk(folder):
+            for filename in filenames:
+                if filename not in index:
+                    index[filename] = os.path.join(root, filename)
+        folderIndices[folder] = index
+    return index
+
+
 
 class Asset:
     materialsFolder = 'Materials'
@@ -680,3 +1025,347 @@ class Skinning:
         return None
 
 
+
+def setTimeSamples(usdAttr, timeCodes, values):
+    # authors all time samples with one change of attribute spec in current edit target,
+    # values should have value type of the attribute
+    if len(timeCodes) == 0:
+        return
+    # the first sample creates attribute spec in edit target, which can be a variant
+    usdAttr.Set(values[0], Usd.TimeCode(float(timeCodes[0])))
+    attributeSpec = usdAttr.GetStage().GetEditTarget().GetPropertySpecForScenePath(usdAttr.GetPath())
+    timeSamples = dict(attributeSpec.GetInfo('timeSamples'))
+    for timeCode, value in zip(timeCodes, values):
+        timeSamples[float(timeCode)] = value
+    attributeSpec.SetInfo('timeSamples', timeSamples)
+
+
+
+def packRows(arrays):
+    # pack rows of arrays with the same number of rows to one array of void elements,
+    # so whole rows can be compared by numpy.unique
+    count = len(arrays[0])
+    columns = [numpy.ascontiguousarray(array).reshape(count, -1).view(numpy.uint8) for array in arrays]
+    packed = numpy.ascontiguousarray(numpy.hstack(columns))
+    return packed.view(numpy.dtype((numpy.void, packed.shape[1]))).ravel()
+
+
+def uniqueRows(arrays):
+    # returns indices of first unique rows in original order and remapping of all rows to them
+    packed = packRows(arrays)
+    unique, first, inverse = numpy.unique(packed, return_index=True, return_inverse=True)
+    order = numpy.argsort(first)
+    remap = numpy.empty(len(order), dtype=numpy.int32)
+    remap[order] = numpy.arange(len(order), dtype=numpy.int32)
+    return first[order], remap[inverse.ravel()]
+
+
+def setPrimvarValues(primvar, values, shape):
+    if len(shape) == 1:
+        values = values.ravel()
+    primvar.Set(values)
+
+
+def minimizeFaceVaryingPrimvar(primvar, faceVertexIndices, pointsCount, allowVertex=True):
+    # allowVertex is False for subdivision surfaces, where vertex and faceVarying primvars are interpolated differently
+    values = primvar.Get()
+    if values is None or primvar.GetElementSize() != 1:
+        return
+    values = numpy.array(values)
+    if values.dtype.kind not in 'fiub' or len(values) == 0:
+        return
+    shape = values.shape
+    values = values.reshape(len(values), -1)
+    if primvar.IsIndexed():
+        valueIndices = numpy.array(primvar.GetIndices(), dtype=numpy.int32)
+    else:
+        valueIndices = numpy.arange(len(values), dtype=numpy.int32)
+    if len(valueIndices) != len(faceVertexIndices):
+        return
+
+    # merge identical values
+    kept, remap = uniqueRows([values])
+    values = values[kept]
+    valueIndices = remap[valueIndices]
+
+    if len(values) == 1:
+        primvar.SetInterpolation(UsdGeom.Tokens.constant)
+        setPrimvarValues(primvar, values, shape)
+        if primvar.IsIndexed():
+            primvar.SetIndices(Vt.IntArray([0]))
+        return
+
+    # use vertex interpolation if each vertex has only one value
+    if allowVertex and len(uniqueRows([faceVertexIndices, valueIndices])[0]) == len(numpy.unique(faceVertexIndices)):
+        vertexValueIndices = numpy.zeros(pointsCount, dtype=numpy.int32)
+        vertexValueIndices[faceVertexIndices] = valueIndices
+        primvar.SetInterpolation(UsdGeom.Tokens.vertex)
+        if primvar.IsIndexed():
+            setPrimvarValues(primvar, values, shape)
+            primvar.SetIndices(Vt.IntArray(vertexValueIndices))
+        else:
+            setPrimvarValues(primvar, values[vertexValueIndices], shape)
+        return
+
+    setPrimvarValues(primvar, values, shape)
+    primvar.SetIndices(Vt.IntArray(valueIndices))
+
+
+def getCreases(usdMesh, pointsCount):
+    # returns crease indices, lengths and sharpnesses, sharpnesses are per crease or per edge
+    # returns None if creases can't be remapped
+    attrs = [usdMesh.GetCreaseIndicesAttr(), usdMesh.GetCreaseLengthsAttr(), usdMesh.GetCreaseSharpnessesAttr(),
+        usdMesh.GetCornerIndicesAttr(), usdMesh.GetCornerSharpnessesAttr()]
+    if any(attr.GetNumTimeSamples() > 0 for attr in attrs):
+        return None
+    creaseIndices, creaseLengths, creaseSharpnesses, cornerIndices, cornerSharpnesses = [list(attr.Get() or []) for attr in attrs]
+    edgesCount = sum(max(length - 1, 0) for length in creaseLengths)
+    if sum(creaseLengths) != len(creaseIndices) or len(creaseSharpnesses) not in [len(creaseLengths), edgesCount]:
+        return None
+    if len(cornerIndices) != len(cornerSharpnesses):
+        return None
+    if any(index < 0 or index >= pointsCount for index in creaseIndices + cornerIndices):
+        return None
+    return creaseIndices, creaseLengths, creaseSharpnesses, cornerIndices, cornerSharpnesses
+
+
+def remapCreases(usdMesh, creases, remap):
+    # crease edges, which are collapsed to one vertex by welding, are removed
+    creaseIndices, creaseLengths, creaseSharpnesses, cornerIndices, cornerSharpnesses = creases
+    if len(creaseIndices) > 0:
+        sharpnessPerEdge = len(creaseSharpnesses) != len(creaseLengths)
+        newIndices = []
+        newLengths = []
+        newSharpnesses = []
+        start = 0
+        edgeIdx = 0
+        for creaseIdx, length in enumerate(creaseLengths):
+            crease = []
+            for index in creaseIndices[start:start + length]:
+                index = int(remap[index])
+                if len(crease) > 0 and crease[-1] == index:
+                    edgeIdx += 1
+                    continue
+                if len(crease) > 0:
+                    if sharpnessPerEdge:
+                        newSharpnesses.append(creaseSharpnesses[edgeIdx])
+                    edgeIdx += 1
+                crease.append(index)
+            start += length
+            if len(crease) > 1:
+                newIndices += crease
+                newLengths.append(len(crease))
+                if not sharpnessPerEdge:
+                    newSharpnesses.append(creaseSharpnesses[creaseIdx])
+        usdMesh.GetCreaseIndicesAttr().Set(Vt.IntArray(newIndices))
+        usdMesh.GetCreaseLengthsAttr().Set(Vt.IntArray(newLengths))
+        usdMesh.GetCreaseSharpnessesAttr().Set(Vt.FloatArray(newSharpnesses))
+
+    if len(cornerIndices) > 0:
+        # welded corners keep the greatest sharpness
+        corners = {}
+        for index, sharpness in zip(cornerIndices, cornerSharpnesses):
+            index = int(remap[index])
+            corners[index] = max(sharpness, corners.get(index, sharpness))
+        newIndices = sorted(corners.keys())
+        usdMesh.GetCornerIndicesAttr().Set(Vt.IntArray(newIndices))
+        usdMesh.GetCornerSharpnessesAttr().Set(Vt.FloatArray([corners[index] for index in newIndices]))
+
+
+def weldMeshVertices(usdMesh, verbose=False):
+    # welds vertices with identical positions and vertex primvars,
+    # and downgrades faceVarying primvars to vertex (not on subdivision surfaces) or constant interpolation where data allows
+    pointsAttr = usdMesh.GetPointsAttr()
+    faceVertexIndicesAttr = usdMesh.GetFaceVertexIndicesAttr()
+    if pointsAttr.GetNumTimeSamples() > 0 or faceVertexIndicesAttr.GetNumTimeSamples() > 0:
+        return False
+    if usdMesh.GetNormalsAttr().HasAuthoredValue():
+        return False
+    if usdMesh.GetPrim().HasRelationship('skel:blendShapeTargets'):
+        return False # blend shapes keep point indices
+    points = pointsAttr.Get()
+    faceVertexIndices = faceVertexIndicesAttr.Get()
+    if not points or not faceVertexIndices:
+        return False
+    points = numpy.array(points, dtype=numpy.float32)
+    faceVertexIndices = numpy.array(faceVertexIndices, dtype=numpy.int32)
+    pointsCount = len(points)
+    if numpy.min(faceVertexIndices) < 0 or numpy.max(faceVertexIndices) >= pointsCount:
+        return False
+    creases = getCreases(usdMesh, pointsCount)
+    if creases is None:
+        return False
+
+    vertexPrimvars = []
+    faceVaryingPrimvars = []
+    for primvar in UsdGeom.PrimvarsAPI(usdMesh).GetPrimvars():
+        if not primvar.HasAuthoredValue():
+            continue
+        if primvar.GetAttr().GetNumTimeSamples() > 0:
+            return False
+        interpolation = primvar.GetInterpolation()
+        if interpolation == UsdGeom.Tokens.vertex or interpolation == UsdGeom.Tokens.varying:
+            vertexPrimvars.append(primvar)
+        elif interpolation == UsdGeom.Tokens.faceVarying:
+            faceVaryingPrimvars.append(primvar)
+
+    # weld vertices
+    keys = [points]
+    vertexData = []
+    for primvar in vertexPrimvars:
+        if primvar.IsIndexed():
+            values = numpy.array(primvar.GetIndices(), dtype=numpy.int32)
+            shape = values.shape
+        else:
+            values = numpy.array(primvar.Get())
+            shape = values.shape
+            if values.dtype.kind not in 'fiub':
+                return False
+        if len(values) % pointsCount != 0:
+            return False
+        values = values.reshape(pointsCount, -1)
+        keys.append(values)
+        vertexData.append((primvar, values, shape))
+
+    kept, remap = uniqueRows(keys)
+    if len(kept) < pointsCount:
+        if verbose:
+            print('  welding mesh ' + str(usdMesh.GetPath()) + ': ' + str(pointsCount) + ' -> ' + str(len(kept)) + ' vertices')
+        pointsAttr.Set(points[kept])
+        faceVertexIndices = remap[faceVertexIndices]
+        faceVertexIndicesAttr.Set(Vt.IntArray(faceVertexIndices))
+        remapCreases(usdMesh, creases, remap)
+        for primvar, values, shape in vertexData:
+            if primvar.IsIndexed():
+                primvar.SetIndices(Vt.IntArray(values[kept].ravel()))
+            else:
+                setPrimvarValues(primvar, values[kept], shape)
+        pointsCount = len(kept)
+
+    allowVertex = usdMesh.GetSubdivisionSchemeAttr().Get() == UsdGeom.Tokens.none
+    for primvar in faceVaryingPrimvars:
+        minimizeFaceVaryingPrimvar(primvar, faceVertexIndices, pointsCount, allowVertex)
+    return True
+
+
+def weldMeshes(usdStage, verbose=False):
+    for usdPrim in usdStage.Traverse():
+        if usdPrim.IsA(UsdGeom.Mesh):
+            weldMeshVertices(UsdGeom.Mesh(usdPrim), verbose)
+
+
+def getFaceCorners(faceVertexCounts):
+    # returns face index, next corner and previous corner for each corner of faces
+    faceVertexCounts = numpy.asarray(faceVertexCounts, dtype=numpy.int64)
+    faceStarts = numpy.cumsum(faceVertexCounts) - faceVertexCounts
+    cornerFaces = numpy.repeat(numpy.arange(len(faceVertexCounts)), faceVertexCounts)
+    cornerStarts = faceStarts[cornerFaces]
+    cornerCounts = faceVertexCounts[cornerFaces]
+    positions = numpy.arange(len(cornerFaces)) - cornerStarts
+    nextCorners = cornerStarts + (positions + 1) % cornerCounts
+    prevCorners = cornerStarts + (positions - 1) % cornerCounts
+    return cornerFaces, nextCorners, prevCorners
+
+
+def getSmoothCornerPairs(faceVertexIndices, nextCorners, cornerFaces, faceNormals, minCosine):
+    # pairs of corners at the same vertex of two faces, which share a smooth edge
+    verticesFrom = faceVertexIndices
+    verticesTo = faceVertexIndices[nextCorners]
+    verticesCount = int(max(numpy.max(verticesFrom), numpy.max(verticesTo))) + 1
+    edgeKeys = numpy.minimum(verticesFrom, verticesTo) * verticesCount + numpy.maximum(verticesFrom, verticesTo)
+    order = numpy.argsort(edgeKeys, kind='stable')
+    sortedKeys = edgeKeys[order]
+
+    # manifold edges have exactly two half edges
+    same = sortedKeys[1:] == sortedKeys[:-1]
+    pairStarts = same.copy()
+    pairStarts[1:] &= ~same[:-1]
+    pairStarts[:-1] &= ~same[1:]
+    pairStarts = numpy.flatnonzero(pairStarts)
+    halfEdges1 = order[pairStarts]
+    halfEdges2 = order[pairStarts + 1]
+
+    cosines = numpy.sum(faceNormals[cornerFaces[halfEdges1]] * faceNormals[cornerFaces[halfEdges2]], axis=1)
+    smooth = cosines >= minCosine
+    halfEdges1 = halfEdges1[smooth]
+    halfEdges2 = halfEdges2[smooth]
+
+    sameDirection = verticesFrom[halfEdges1] == verticesFrom[halfEdges2]
+    corners1 = numpy.concatenate([halfEdges1, nextCorners[halfEdges1]])
+    corners2 = numpy.concatenate([
+        numpy.where(sameDirection, halfEdges2, nextCorners[halfEdges2]),
+        numpy.where(sameDirection, nextCorners[halfEdges2], halfEdges2)])
+    return corners1, corners2
+
+
+def getConnectedLabels(count, pairs1, pairs2):
+    # label connected components by propagation of minimal labels with pointer jumping
+    labels = numpy.arange(count)
+    while True:
+        minLabels = numpy.minimum(labels[pairs1], labels[pairs2])
+        newLabels = labels.copy()
+        numpy.minimum.at(newLabels, pairs1, minLabels)
+        numpy.minimum.at(newLabels, pairs2, minLabels)
+        newLabels = newLabels[newLabels]
+        if numpy.array_equal(newLabels, labels):
+            return labels
+        labels = newLabels
+
+
+def sumRows(indices, values, count):
+    return numpy.stack([numpy.bincount(indices, weights=values[:, i], minlength=count) for i in range(values.shape[1])], axis=1)
+
+
+def normalizeRows(vectors):
+    lengths = numpy.sqrt(numpy.sum(vectors * vectors, axis=1))
+    lengths[lengths == 0] = 1
+    return vectors / lengths[:, numpy.newaxis]
+
+
+def computeNormals(points, faceVertexCounts, faceVertexIndices, creaseAngle=180):
+    # returns area and angle weighted normals, their indices and interpolation
+    # normals of faces, which meet at an angle greater then creaseAngle (in degrees), are not smoothed
+    points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+    faceVertexIndices = numpy.asarray(faceVertexIndices, dtype=numpy.int64)
+    facesCount = len(faceVertexCounts)
+    cornerFaces, nextCorners, prevCorners = getFaceCorners(faceVertexCounts)
+
+    cornerPoints = points[faceVertexIndices]
+    toNext = cornerPoints[nextCorners] - cornerPoints
+    toPrev = cornerPoints[prevCorners] - cornerPoints
+
+    # face area vectors with Newell's method, length of vector is doubled face area
+    faceAreaVectors = sumRows(cornerFaces, numpy.cross(cornerPoints, cornerPoints[nextCorners]), facesCount)
+    faceNormals = normalizeRows(faceAreaVectors)
+
+    cornerAngles = numpy.arctan2(
+        numpy.sqrt(numpy.sum(numpy.cross(toNext, toPrev) ** 2, axis=1)),
+        numpy.sum(toNext * toPrev, axis=1))
+    weightedNormals = faceAreaVectors[cornerFaces] * cornerAngles[:, numpy.newaxis]
+
+    if creaseAngle >= 180:
+        verticesCount = len(points)
+        normals = normalizeRows(sumRows(faceVertexIndices, weightedNormals, verticesCount))
+        return normals.astype(numpy.float32), None, UsdGeom.Tokens.vertex
+
+    minCosine = math.cos(math.radians(creaseAngle))
+    pairs1, pairs2 = getSmoothCornerPairs(faceVertexIndices, nextCorners, cornerFaces, faceNormals, minCosine)
+    labels = getConnectedLabels(len(faceVertexIndices), pairs1, pairs2)
+    groups, indices = numpy.unique(labels, return_inverse=True)
+    normals = normalizeRows(sumRows(indices.ravel(), weightedNormals, len(groups)))
+    return normals.astype(numpy.float32), indices.ravel().astype(numpy.int32), UsdGeom.Tokens.faceVarying
+
+
+def generateNormals(usdMesh, creaseAngle=180):
+    # creates normals primvar for the mesh without normals
+    points = usdMesh.GetPointsAttr().Get()
+    faceVertexCounts = usdMesh.GetFaceVertexCountsAttr().Get()
+    faceVertexIndices = usdMesh.GetFaceVertexIndicesAttr().Get()
+    if not points or not faceVertexCounts or not faceVertexIndices:
+        return None
+    normals, indices, interpolation = computeNormals(numpy.array(points), numpy.array(faceVertexCounts), numpy.array(faceVertexIndices), creaseAngle)
+    normalPrimvar = usdMesh.CreatePrimvar('normals', Sdf.ValueTypeNames.Normal3fArray, interpolation)
+    normalPrimvar.Set(normals)
+    if indices is not None:
+        normalPrimvar.SetIndices(Vt.IntArray(indices))
+    return normalPrimvar
@@ -1,23 +1,33 @@
 #!/usr/bin/python
 import os.path
-from os import chdir
 import sys
-import importlib, imp
 import tempfile
-from shutil import rmtree
+from shutil import rmtree, copyfile, move
 import zipfile
+import json
+import time
+import multiprocessing
+import hashlib
+import struct
+import threading
 
 usdLibLoaded = True
 kConvertErrorReturnValue = 2
+kCacheVersion = 2
+kDefaultCacheSize = 2048 # in MB
+kWorkerStopTimeout = 10 # in seconds
 
 try:
-    from pxr import *
+    # only modules used by conversion are loaded, UsdUtils is loaded on demand
+    from pxr import Gf, Sdf, Tf, Usd, UsdGeom, UsdShade
     import usdUtils
 except ImportError:
-    usdUtils.printError("failed to import pxr module. Please add path to USD Python bindings to your PYTHONPATH.")
+    print('  \033[91mError: failed to import pxr module. Please add path to USD Python bindings to your PYTHONPATH.\033[0m')
     usdLibLoaded = False
 
-__all__ = ['convert']
+__all__ = ['convert', 'convertBatch', 'Converter']
+
+supportedInputFormats = ['.obj', '.gltf', '.glb', '.fbx', '.usd', '.usda', '.usdc', '.usdz', '.abc']
 
 
 class USDParameters:
@@ -34,6 +44,38 @@ class USDParameters:
         self.defaultMaterial = None
         self.assetName = ''
         self.asset = usdUtils.Asset(assetPath, usdStage)
+        self.stageIndex = StageIndex(usdStage)
+
+
+
+class StageIndex:
+    # one traversal of stage collects geometries and materials for all lookups
+    def __init__(self, usdStage):
+        self.usdStage = usdStage
+        self.geometries = []
+        self.materialPathsByName = {} # material paths in traversal order by name
+        for usdPrim in Usd.PrimRange(usdStage.GetPseudoRoot()):
+            if usdPrim.IsA(UsdGeom.Mesh) or usdPrim.IsA(UsdGeom.Subset):
+                self.geometries.append(usdPrim)
+            elif usdPrim.IsA(UsdShade.Material):
+                self.addMaterial(usdPrim)
+
+
+    def addMaterial(self, usdPrim):
+        paths = self.materialPathsByName.setdefault(usdPrim.GetName(), [])
+        path = str(usdPrim.GetPath())
+        if path not in paths:
+            paths.append(path)
+
+
+    def findMaterial(self, name, byPath):
+        # removed materials stay in index, so prims are validated
+        paths = [name] if byPath else self.materialPathsByName.get(name, [])
+        for path in paths:
+            usdPrim = self.usdStage.GetPrimAtPath(path)
+            if usdPrim.IsValid() and usdPrim.IsA(UsdShade.Material):
+                return UsdShade.Material(usdPrim)
+        return None
 
 
 
@@ -51,13 +93,28 @@ class ParserOut:
         self.metersPerUnit = 0
         self.loop = False
         self.noloop = False
+        self.mergeGroups = ''
+        self.keepGroupNames = False
+        self.weldVertices = False
+        self.generateNormals = False
+        self.creaseAngle = 60.0
+        self.maxSkinInfluences = 0
+        self.sampleKeyTimes = False
+        self.fbxCacheFolder = ''
+        self.cacheFolder = ''
+        self.cacheSize = kDefaultCacheSize
+        self.timeSampleStride = 0
+        self.timeSampleRange = None
+        self.profilePath = ''
+        self.profileStatsFolder = ''
         material = usdUtils.Material('')
         self.materials.append(material)
 
 
 
 class Parser:
-    def __init__(self):
+    def __init__(self, folder=''):
+        self.folder = folder
         self.out = ParserOut()
         self.arguments = []
         self.argumentIndex = 0
@@ -80,6 +137,16 @@ class Parser:
                    [-loop]\n\
                    [-no-loop]\n\
                    [-iOS12]\n\
+                   [-mergeGroups material|subsets]\n\
+                   [-keepGroupNames]\n\
+                   [-weldVertices]\n\
+                   [-generateNormals] [-creaseAngle degrees]\n\
+                   [-maxSkinInfluences count]\n\
+                   [-sampleKeyTimes]\n\
+                   [-fbxCache folder]\n\
+                   [-cacheDir folder] [-cacheSize MB]\n\
+                   [-timeSampleStride stride] [-timeSampleRange start end]\n\
+                   [-profile file.json] [-profileStats folder]\n\
                    [-m materialName]        [-texCoordSet name]\n\
                    [-diffuseColor           r,g,b]\n\
                    [-diffuseColor           <file> fr,fg,fb]\n\
@@ -98,7 +165,9 @@ class Parser:
                    [-clearcoat              c]\n\
                    [-clearcoat              ch <file> fc]\n\
                    [-clearcoatRoughness     c]\n\
-                   [-clearcoatRoughness     ch <file> fc]')
+                   [-clearcoatRoughness     ch <file> fc]\n\
+       usdzconvert -batch [-jobs count] [-outputFolder folder] [-summary file.json]\n\
+                   inputs [-- arguments]')
 
 
     def printHelpAndExit(self):
@@ -123,6 +192,41 @@ Converts 3D model file to usd/usda/usdc/usdz.\n\
                         If no material is present in input file, a material of\n\
                         this name will be generated.\n\
   -iOS12                Make output file compatible with iOS 12 frameworks\n\
+  -mergeGroups material|subsets\n\
+                        Merge OBJ groups to one mesh per material or to one mesh\n\
+                        with material subsets.\n\
+  -keepGroupNames       Keep names of merged OBJ groups in groupName primvar.\n\
+  -weldVertices         Weld identical vertices of meshes and use vertex or\n\
+                        constant interpolation for faceVarying primvars\n\
+                        where possible.\n\
+  -generateNormals      Generate normals for meshes without normals.\n\
+  -creaseAngle degrees  Edges between faces with greater angle stay sharp\n\
+                        for generated normals. Default value is 60.\n\
+  -maxSkinInfluences count\n\
+                        Keep only count strongest joint influences per vertex\n\
+                        of FBX skinned meshes and renormalize their weights.\n\
+  -sampleKeyTimes       Sample FBX skeletal animation at key times only if all\n\
+                        animation curves are linear or constant.\n\
+  -fbxCache folder      Cache converted FBX files in folder and reuse them if\n\
+                        FBX file and conversion arguments are not changed.\n\
+  -cacheDir folder, --cache-dir folder\n\
+                        Cache output files in folder and copy them without\n\
+                        conversion if input file, its textures and buffers,\n\
+                        and arguments are not changed.\n\
+  -cacheSize MB         Remove least recently used files from cache folder\n\
+                        if it is larger than MB megabytes. Default is 2048.\n\
+  -timeSampleStride stride\n\
+                        Keep Alembic time samples at every stride time codes\n\
+                        from start of animation.\n\
+  -timeSampleRange start end\n\
+                        Keep Alembic time samples in range of time codes\n\
+                        [start .. end] and use it as animation range.\n\
+  -profile file.json, --profile file.json\n\
+                        Write wall time, CPU time and peak memory of conversion\n\
+                        stages to JSON file. CPU time is measured for\n\
+                        conversion thread where supported, peak memory is\n\
+                        measured for process.\n\
+  -profileStats folder  Write cProfile stats of each conversion stage to folder.\n\
   -texCoordSet name     The name of the texture coordinates to use for current\n\
                         material. Default texture coordinate set is "st".\n\
                         \n\
@@ -179,6 +283,14 @@ Converts 3D model file to usd/usda/usdc/usdz.\n\
                         Use <file> as texture for clearcoat roughness.\n\
                         ch: (optional) texture color channel (r, g, b or a).\n\
                         fc: (optional) fallback constant in the range [0..1]\n\
+\nbatch mode:\n\
+  -batch inputs         Convert many input files. Inputs are files, folders\n\
+                        which are searched recursively, or manifest text files\n\
+                        with one input file or folder per line.\n\
+  -jobs count           Number of worker processes. Default is CPU count.\n\
+  -outputFolder folder  Write output files to folder instead of input folders.\n\
+  -summary file.json    Write exit status and time of each job to JSON file.\n\
+  -- arguments          Arguments after -- are used for each conversion.\n\
 \n\
 examples:\n\
     usdzconvert chicken.gltf\n\
@@ -204,10 +316,10 @@ examples:\n\
 
     def loadArgumentsFromFile(self, filename):
         self.out.argumentFile = ''
-        if os.path.isfile(filename):
-            self.out.argumentFile = filename
+        if os.path.isfile(os.path.join(self.folder, filename)):
+            self.out.argumentFile = os.path.join(self.folder, filename)
         elif self.out.inFilePath:
-            filename = os.path.dirname(self.out.inFilePath) + '/' + filename
+            filename = os.path.join(self.folder, os.path.dirname(self.out.inFilePath), filename)
             if os.path.isfile(filename):
                 self.out.argumentFile = filename
         if self.out.argumentFile == '':
@@ -359,6 +471,51 @@ examples:\n\
                     self.out.loop = True
                 elif '-no-loop' == argument or '--no-loop' == argument:
                     self.out.noloop = True
+                elif '-mergeGroups' == argument:
+                    self.out.mergeGroups = self.getParameters(1, argument)
+                    if self.out.mergeGroups != 'material' and self.out.mergeGroups != 'subsets':
+                        self.printErrorUsageAndExit('expected material or subsets value for argument ' + argument)
+                elif '-keepGroupNames' == argument:
+                    self.out.keepGroupNames = True
+                elif '-weldVertices' == argument:
+                    self.out.weldVertices = True
+                elif '-generateNormals' == argument:
+                    self.out.generateNormals = True
+                elif '-creaseAngle' == argument:
+                    creaseAngle = self.getParameters(1, argument)
+                    if not isFloat(creaseAngle) or float(creaseAngle) < 0:
+                        self.printErrorUsageAndExit('expected non-negative float value for argument ' + argument)
+                    self.out.creaseAngle = float(creaseAngle)
+                elif '-maxSkinInfluences' == argument:
+                    maxSkinInfluences = self.getParameters(1, argument)
+                    if not maxSkinInfluences.isdigit() or int(maxSkinInfluences) < 1:
+                        self.printErrorUsageAndExit('expected positive integer value for argument ' + argument)
+                    self.out.maxSkinInfluences = int(maxSkinInfluences)
+                elif '-sampleKeyTimes' == argument:
+                    self.out.sampleKeyTimes = True
+                elif '-fbxCache' == argument:
+                    self.out.fbxCacheFolder = self.getParameters(1, argument)
+                elif '-cacheDir' == argument or '--cache-dir' == argument:
+                    self.out.cacheFolder = self.getParameters(1, argument)
+                elif '-cacheSize' == argument or '--cache-size' == argument:
+                    cacheSize = self.getParameters(1, argument)
+                    if not cacheSize.isdigit():
+                        self.printErrorUsageAndExit('expected integer value for argument ' + argument)
+                    self.out.cacheSize = int(cacheSize)
+                elif '-timeSampleStride' == argument:
+                    timeSampleStride = self.getParameters(1, argument)
+                    if not isFloat(timeSampleStride) or float(timeSampleStride) <= 0:
+                        self.printErrorUsageAndExit('expected positive float value for argument ' + argument)
+                    self.out.timeSampleStride = float(timeSampleStride)
+                elif '-timeSampleRange' == argument:
+                    timeSampleRange = self.getParameters(2, argument)
+                    if not isFloat(timeSampleRange[0]) or not isFloat(timeSampleRange[1]) or float(timeSampleRange[0]) > float(timeSampleRange[1]):
+                        self.printErrorUsageAndExit('expected start and end float values for argument ' + argument)
+                    self.out.timeSampleRange = (float(timeSampleRange[0]), float(timeSampleRange[1]))
+                elif '-profile' == argument or '--profile' == argument:
+                    self.out.profilePath = self.getParameters(1, argument)
+                elif '-profileStats' == argument:
+                    self.out.profileStatsFolder = self.getParameters(1, argument)
                 elif '-h' == argument or '--help' == argument:
                     self.printHelpAndExit()
                 elif '-f' == argument:
@@ -413,73 +570,49 @@ def createMaterial(params, materialName):
 
     params.usdMaterials[matPath] = usdMaterial
     params.usdMaterialsByName[materialName] = usdMaterial
+    params.stageIndex.addMaterial(usdMaterial.GetPrim())
     return usdMaterial
 
 
-def getAllUsdMaterials(params, usdParentPrim):
-    for usdPrim in usdParentPrim.GetChildren():
-        if usdPrim.IsA(UsdGeom.Mesh) or usdPrim.IsA(UsdGeom.Subset):
-            bindAPI = UsdShade.MaterialBindingAPI(usdPrim)
-            if bindAPI != None:
-                usdShadeMaterial = None
-                directBinding = bindAPI.GetDirectBinding()
-                matPath = str(directBinding.GetMaterialPath())
-
-                if matPath != '':
-                    usdShadeMaterial = directBinding.GetMaterial()
-
-                if usdShadeMaterial != None and matPath not in params.usdMaterials:
-                    params.usdMaterials[matPath] = usdShadeMaterial
-                    materialNameSplitted = matPath.split('/')
-                    materialName = materialNameSplitted[len(materialNameSplitted) - 1]
-                    params.usdMaterialsByName[materialName] = usdShadeMaterial
-
-        getAllUsdMaterials(params, usdPrim)
-
-
-def addDefaultMaterialToGeometries(params, usdParentPrim):
-    for usdPrim in usdParentPrim.GetChildren():
-        if usdPrim.IsA(UsdGeom.Mesh) or usdPrim.IsA(UsdGeom.Subset):
-            bindAPI = UsdShade.MaterialBindingAPI(usdPrim)
-            if bindAPI != None:
-                usdShadeMaterial = None
-                directBinding = bindAPI.GetDirectBinding()
-                matPath = str(directBinding.GetMaterialPath())
-
-                if matPath != '':
-                    usdShadeMaterial = directBinding.GetMaterial()
-
-                if usdShadeMaterial == None:
-                    if params.defaultMaterial == None:
-                        params.defaultMaterial = createMaterial(params, 'defaultMaterial')
-                    matPath = params.materialsPath + '/defaultMaterial'
-                    usdShadeMaterial = params.defaultMaterial
-                    bindAPI.Bind(usdShadeMaterial)
-
-                if matPath not in params.usdMaterials:
-                    params.usdMaterials[matPath] = usdShadeMaterial
-                    materialNameSplitted = matPath.split('/')
-                    materialName = materialNameSplitted[len(materialNameSplitted) - 1]
-                    params.usdMaterialsByName[materialName] = usdShadeMaterial
-
-        addDefaultMaterialToGeometries(params, usdPrim)
-
-
-def findUsdMaterialRecursively(params, usdParentPrim, name, byPath):
-    for usdPrim in usdParentPrim.GetChildren():
-        if usdPrim.IsA(UsdShade.Material):
-            path = usdPrim.GetPath()
-            if byPath:
-                if path == name:
-                    return UsdShade.Material(usdPrim)
-            else:
-                matName = os.path.basename(str(path))
-                if matName == name:
-                    return UsdShade.Material(usdPrim)
-        usdMaterial = findUsdMaterialRecursively(params, usdPrim, name, byPath)
-        if usdMaterial is not None:
-            return usdMaterial
-    return None
+def registerUsdMaterial(params, matPath, usdShadeMaterial):
+    if matPath not in params.usdMaterials:
+        params.usdMaterials[matPath] = usdShadeMaterial
+        materialNameSplitted = matPath.split('/')
+        materialName = materialNameSplitted[len(materialNameSplitted) - 1]
+        params.usdMaterialsByName[materialName] = usdShadeMaterial
+
+
+def getBoundUsdMaterial(bindAPI):
+    usdShadeMaterial = None
+    directBinding = bindAPI.GetDirectBinding()
+    matPath = str(directBinding.GetMaterialPath())
+    if matPath != '':
+        usdShadeMaterial = directBinding.GetMaterial()
+    return matPath, usdShadeMaterial
+
+
+def getAllUsdMaterials(params):
+    for usdPrim in params.stageIndex.geometries:
+        bindAPI = UsdShade.MaterialBindingAPI(usdPrim)
+        if bindAPI != None:
+            matPath, usdShadeMaterial = getBoundUsdMaterial(bindAPI)
+            if usdShadeMaterial != None:
+                registerUsdMaterial(params, matPath, usdShadeMaterial)
+
+
+def addDefaultMaterialToGeometries(params):
+    for usdPrim in params.stageIndex.geometries:
+        bindAPI = UsdShade.MaterialBindingAPI(usdPrim)
+        if bindAPI != None:
+            matPath, usdShadeMaterial = getBoundUsdMaterial(bindAPI)
+            if usdShadeMaterial == None:
+                if params.defaultMaterial == None:
+                    params.defaultMaterial = createMaterial(params, 'defaultMaterial')
+                matPath = params.materialsPath + '/defaultMaterial'
+                usdShadeMaterial = params.defaultMaterial
+                bindAPI.Bind(usdShadeMaterial)
+
+            registerUsdMaterial(params, matPath, usdShadeMaterial)
 
 
 def findUsdMaterial(params, name):
@@ -505,7 +638,7 @@ def findUsdMaterial(params, name):
         return params.usdMaterials[testMaterialName]
 
     byPath = '/' == name[0]
-    return findUsdMaterialRecursively(params, params.usdStage.GetPseudoRoot(), name, byPath)
+    return params.stageIndex.findMaterial(name, byPath)
 
 
 def copyTexturesFromStageToFolder(params, srcPath, folder):
@@ -535,7 +668,7 @@ def copyTexturesFromStageToFolder(params, srcPath, folder):
             copiedFiles[filename] = filename
 
 
-def copyMaterialTextures(params, material, srcPath, dstPath, folder):
+def copyMaterialTextures(params, material, srcPath, dstPath, folder, currentFolder=''):
     srcFolder = os.path.dirname(srcPath)
     dstFolder = os.path.dirname(dstPath)
     for inputName, input in material.inputs.iteritems():
@@ -554,6 +687,9 @@ def copyMaterialTextures(params, material, srcPath, dstPath, folder):
                 usdUtils.copy(dstFolder + '/' + input.file, folder + '/' + input.file, params.verbose)
                 continue
 
+        if currentFolder and not os.path.isabs(input.file) and os.path.isfile(os.path.join(currentFolder, input.file)):
+            input.file = os.path.join(currentFolder, input.file)
+
         if os.path.isfile(input.file):
             if srcFolder and len(srcFolder) < len(input.file) and srcFolder + '/' == input.file[0:(len(srcFolder)+1)]:
                 input.file = input.file[(len(srcFolder)+1):]
@@ -578,6 +714,203 @@ def createStageMetadata(params):
         params.usdStage.SetMetadataByDictKey("customLayerData", "copyright", str(params.copyright))
 
 
+def getLayerDependencies(layer):
+    if hasattr(layer, 'GetCompositionAssetDependencies'):
+        return layer.GetCompositionAssetDependencies()
+    return layer.GetExternalReferences()
+
+
+def getLocalLayerNames(layer):
+    # returns filenames of layers in folder of layer, which are composed without own dependencies,
+    # or None if layer has other dependencies
+    names = []
+    for dependency in getLayerDependencies(layer):
+        name = os.path.normpath(dependency).replace('\\', '/')
+        if '/' in name or ':' in name:
+            return None
+        dependencyLayer = Sdf.Layer.FindOrOpen(layer.ComputeAbsolutePath(dependency))
+        if dependencyLayer is None or len(getLayerDependencies(dependencyLayer)) > 0:
+            return None
+        names.append(name)
+    return names
+
+
+def getStagePackageAssetPaths(usdStage, withLayers=False):
+    # returns asset paths for usdz archive, or None if layer needs dependencies resolving by UsdUtils
+    # withLayers allows layers, which converters write next to root layer, to be package entries
+    layerNames = getLocalLayerNames(usdStage.GetRootLayer())
+    if layerNames is None or (len(layerNames) > 0 and not withLayers):
+        return None
+
+    assetPaths = set()
+    for usdPrim in usdStage.TraverseAll():
+        for attribute in usdPrim.GetAttributes():
+            typeName = attribute.GetTypeName()
+            if typeName == Sdf.ValueTypeNames.Asset:
+                value = attribute.Get()
+                if value is not None and value.path:
+                    assetPaths.add(value.path)
+            elif typeName == Sdf.ValueTypeNames.AssetArray:
+                for value in attribute.Get() or []:
+                    if value.path:
+                        assetPaths.add(value.path)
+
+    names = layerNames
+    for assetPath in sorted(assetPaths):
+        name = os.path.normpath(assetPath).replace('\\', '/')
+        if os.path.isabs(name) or name.split('/')[0] == '..' or ':' in name:
+            # asset path should be remapped to be inside of package
+            return None
+        names.append(name)
+    return names
+
+
+def getUsdzPackageFiles(usdStage, searchFolders, srcPackage=None, withLayers=False):
+    # returns (name, filePath) pairs, filePath is None for unchanged entries of source usdz package
+    names = getStagePackageAssetPaths(usdStage, withLayers)
+    if names is None:
+        return None
+
+    packageNames = set(srcPackage.namelist()) if srcPackage is not None else set()
+    files = []
+    for name in names:
+        filePath = ''
+        for folder in searchFolders:
+            if os.path.isfile(os.path.join(folder, name)):
+                filePath = os.path.join(folder, name)
+                break
+        if filePath:
+            files.append((name, filePath))
+        elif name in packageNames:
+            files.append((name, None))
+        else:
+            usdUtils.printWarning("can't find " + name + ' for usdz package')
+    return files
+
+
+def createUsdzPackage(layerPath, files, dstPath, verbose, srcPackage=None):
+    # root layer goes first, all files are read once and streamed to archive
+    if verbose:
+        print('Creating usdz package:', dstPath)
+    writer = usdUtils.UsdzWriter(dstPath)
+    try:
+        writer.addFile(os.path.basename(layerPath), layerPath)
+        for name, filePath in files:
+            if verbose:
+                print('  adding file:', name)
+            if filePath is None:
+                writer.addZipEntry(name, srcPackage)
+            else:
+                writer.addFile(name, filePath)
+    finally:
+        writer.close()
+
+
+def thinTimeSamples(layer, stride, timeRange, verbose):
+    # removes time samples out of time range and between stride steps
+    paths = []
+    def collectPath(path):
+        if path.IsPropertyPath() and layer.GetNumTimeSamplesForPath(path) > 0:
+            paths.append(path)
+    layer.Traverse(Sdf.Path.absoluteRootPath, collectPath)
+
+    if timeRange is not None:
+        startTime, endTime = timeRange
+    else:
+        startTime = layer.startTimeCode
+        if not layer.HasStartTimeCode() and len(paths) > 0:
+            startTime = min(layer.ListTimeSamplesForPath(path)[0] for path in paths)
+        endTime = float('inf')
+
+    def isKept(time):
+        if time < startTime - 1e-6 or time > endTime + 1e-6:
+            return False
+        if stride > 0:
+            step = (time - startTime) / stride
+            return abs(step - round(step)) < 1e-6
+        return True
+
+    removedCount = 0
+    with Sdf.ChangeBlock():
+        for path in paths:
+            attributeSpec = layer.GetAttributeAtPath(path)
+            if attributeSpec is None:
+                continue
+            timeSamples = attributeSpec.GetInfo('timeSamples')
+            keptSamples = dict((time, value) for time, value in timeSamples.items() if isKept(time))
+            if len(keptSamples) != len(timeSamples):
+                removedCount += len(timeSamples) - len(keptSamples)
+                attributeSpec.SetInfo('timeSamples', keptSamples)
+        if timeRange is not None:
+            layer.startTimeCode = startTime
+            layer.endTimeCode = endTime
+
+    if verbose:
+        print('Removed', removedCount, 'time samples of', len(paths), 'attributes.')
+
+
+def openUsdzInPlace(srcPath, layerName, srcPackage):
+    # root layer of package is copied to anonymous layer, other entries are read only while packaging
+    packageLayer = Sdf.Layer.FindOrOpen(srcPath)
+    if packageLayer is None:
+        return None
+    usdLayer = Sdf.Layer.CreateAnonymous(layerName)
+    usdLayer.TransferContent(packageLayer)
+    usdStage = Usd.Stage.Open(usdLayer)
+    if getStagePackageAssetPaths(usdStage) is None:
+        # relative composition arcs and asset paths need extracted package
+        return None
+    return usdStage
+
+
+def anchorAssetPaths(layer, anchorLayer):
+    # makes relative asset paths of layer absolute, as they are resolved from anchorLayer
+    def anchor(assetPath):
+        if not assetPath or os.path.isabs(assetPath) or ':' in assetPath:
+            return assetPath
+        return anchorLayer.ComputeAbsolutePath(assetPath)
+
+    from pxr import UsdUtils
+    if hasattr(UsdUtils, 'ModifyAssetPaths'):
+        UsdUtils.ModifyAssetPaths(layer, anchor)
+        return
+
+    # older USD versions
+    for dependency in getLayerDependencies(layer):
+        layer.UpdateExternalReference(dependency, anchor(dependency))
+
+    def anchorValue(value):
+        if isinstance(value, Sdf.AssetPath):
+            return Sdf.AssetPath(anchor(value.path))
+        return Sdf.AssetPathArray([anchor(assetPath.path) for assetPath in value])
+
+    paths = []
+    def collectPath(path):
+        if path.IsPropertyPath():
+            attributeSpec = layer.GetAttributeAtPath(path)
+            if attributeSpec is not None and attributeSpec.typeName in [Sdf.ValueTypeNames.Asset, Sdf.ValueTypeNames.AssetArray]:
+                paths.append(path)
+    layer.Traverse(Sdf.Path.absoluteRootPath, collectPath)
+    for path in paths:
+        attributeSpec = layer.GetAttributeAtPath(path)
+        if attributeSpec.HasDefaultValue():
+            attributeSpec.default = anchorValue(attributeSpec.default)
+        for timeCode in layer.ListTimeSamplesForPath(path):
+            layer.SetTimeSample(path, timeCode, anchorValue(layer.QueryTimeSample(path, timeCode)))
+
+
+def openUsdAnchored(srcPath, layerName):
+    # source layer is copied to anonymous layer with asset paths anchored to source folder,
+    # so its temporary .usdc file is written to any folder and source layer is not edited
+    srcLayer = Sdf.Layer.FindOrOpen(srcPath)
+    if srcLayer is None:
+        return None
+    usdLayer = Sdf.Layer.CreateAnonymous(layerName)
+    usdLayer.TransferContent(srcLayer)
+    anchorAssetPaths(usdLayer, srcLayer)
+    return Usd.Stage.Open(usdLayer)
+
+
 def unzip(filePath, outputDir):
     firstFile = ''
     with zipfile.ZipFile(filePath) as zf:
@@ -588,253 +921,664 @@ def unzip(filePath, outputDir):
     return firstFile
 
 
-def process(argumentList):
-    parser = Parser()
-    parserOut = parser.parse(argumentList)
-
-    srcPath = ''
-    if os.path.isfile(parserOut.inFilePath):
-        srcPath = parserOut.inFilePath
-    elif os.path.dirname(parserOut.inFilePath) == '' and parserOut.argumentFile:
-        # try to find input file in argument file folder which is specified by -f in command line
-        argumentFileDir = os.path.dirname(parserOut.argumentFile)
-        if argumentFileDir:
-            os.chdir(argumentFileDir)
-            if os.path.isfile(parserOut.inFilePath):
-                srcPath = parserOut.inFilePath
-
-    if srcPath == '':
-        parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' does not exist.')
-
-    fileAndExt = os.path.splitext(srcPath)
-    if len(fileAndExt) != 2:
-        parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' has unsupported file extension.')
-
-    print('Input file:', srcPath)
-    srcExt = fileAndExt[1].lower()
-
-    dstIsUsdz = False
-    dstPath = parserOut.outFilePath
-    dstExt = ''
-    if dstPath == '':
-        # default destination file is .usdz file in the same folder as source file
-        dstExt = '.usdz'
-        dstPath = fileAndExt[0] + dstExt
-        dstIsUsdz = True
-
-    dstFileAndExt = os.path.splitext(dstPath)
-    if len(dstFileAndExt) != 2:
-        parser.printErrorUsageAndExit('output file ' + dstPath + ' has unsupported file extension.')
-
-    if not dstIsUsdz:
-        dstExt = dstFileAndExt[1].lower()
-        if dstExt == '.usdz':
-            dstIsUsdz = True
-        elif dstExt != '.usd' and dstExt != '.usdc' and dstExt != '.usda':
-            parser.printErrorUsageAndExit('output file ' + dstPath + ' should have .usdz, .usdc, .usda or .usd extension.')
-
-    tmpFolder = tempfile.mkdtemp('usdzconvert')
-
-    legacyModifier = None
-    if parserOut.iOS12:
-        iOS12Compatible_module = importlib.import_module("iOS12LegacyModifier")
-        legacyModifier = iOS12Compatible_module.createLegacyModifier()
-        legacyModifier.setMetersPerUnit(parserOut.metersPerUnit)
-        print('Converting in iOS12 compatiblity mode.')
-
-    tmpPath = dstFileAndExt[0] + '.usdc' if dstIsUsdz else dstPath
-    tmpBasename = os.path.basename(tmpPath)
-    tmpPath = tmpFolder + '/' + tmpBasename
-    removeTmpPath = False
-    if '.usd' == srcExt or '.usda' == srcExt or '.usdc' == srcExt:
-        # create .usdc file in source file folder
-        srcFolder =  os.path.dirname(srcPath)
-        tmpPath = srcFolder + '/' +  tmpBasename
-        if os.path.isfile(tmpPath):
-            tmpPath = srcFolder + '/' +  next(tempfile._get_candidate_names()) + tmpBasename
-        removeTmpPath = True
-
-    if parserOut.verbose and parserOut.copyTextures and dstIsUsdz:
-        usdUtils.printWarning('argument -copytextures works for .usda and .usdc output files only.')
-
-    copyTextures = parserOut.copyTextures and not dstIsUsdz
-    srcIsUsd = False;
-    srcIsUsdz = False;
-    usdStage = None
-    if '.obj' == srcExt:
-        global usdStageWithObj_module
-        usdStageWithObj_module = importlib.import_module("usdStageWithObj")
-        # this line can be updated with Pixar's backend loader
-        usdStage = usdStageWithObj_module.usdStageWithObj(srcPath, tmpPath, legacyModifier, parserOut.verbose)
-    elif '.gltf' == srcExt or '.glb' == srcExt:
-        global usdStageWithGlTF_module
-        usdStageWithGlTF_module = importlib.import_module("usdStageWithGlTF")
-        usdStage = usdStageWithGlTF_module.usdStageWithGlTF(srcPath, tmpPath, legacyModifier, copyTextures, parserOut.verbose)
-    elif '.fbx' == srcExt:
-        global usdStageWithFbx_module
-        usdStageWithFbx_module = importlib.import_module("usdStageWithFbx")
-        usdStage = usdStageWithFbx_module.usdStageWithFbx(srcPath, tmpPath, legacyModifier, copyTextures, parserOut.verbose)
-    elif '.usd' == srcExt or '.usda' == srcExt or '.usdc' == srcExt:
-        usdStage = Usd.Stage.Open(srcPath)
-        srcIsUsd = True;
-    elif '.usdz' == srcExt:
-        tmpUSDC = unzip(srcPath, tmpFolder)
-        if tmpUSDC == '':
-            parser.printErrorUsageAndExit("can't open input usdz file " + parserOut.inFilePath)
-        usdStage = Usd.Stage.Open(tmpFolder + '/' + tmpUSDC)
-        srcIsUsdz = True;
-    elif '.abc' == srcExt:
-        usdStage = Usd.Stage.Open(srcPath)
-        # To update Alembic USD Stage, first save it to temporary .usdc and reload it
-        tmpUSDC = tmpPath + '.usdc'
-        usdStage.GetRootLayer().Export(tmpUSDC)
-        if parserOut.verbose:
-            print('Temporary USDC file:', tmpUSDC)
-        usdStage = Usd.Stage.Open(tmpUSDC)
-    else:
-        parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' has unsupported file extension.')
+def getReferencedFiles(srcPath, srcExt):
+    # finds files which are loaded with input file, without conversion of input file
+    srcFolder = os.path.dirname(srcPath)
+    srcFolder = srcFolder + '/' if srcFolder else ''
+    folderIndices = {}
+    filenames = []
+    try:
+        if '.gltf' == srcExt or '.glb' == srcExt:
+            with open(srcPath, 'rb') as file:
+                data = file.read()
+            if '.glb' == srcExt:
+                # JSON chunk follows 12 bytes header and 8 bytes chunk header
+                jsonLength = struct.unpack('<I', data[12:16])[0]
+                data = data[20:(20 + jsonLength)]
+            gltf = json.loads(data.decode('utf-8'))
+            for item in gltf.get('buffers', []) + gltf.get('images', []):
+                uri = item.get('uri', '')
+                if uri and uri[:5] != 'data:':
+                    filenames.append(uri)
+        elif '.obj' == srcExt:
+            for filename in usdUtils.findReferencedFilenames(srcPath):
+                filenames.append(filename)
+                mtlPath = usdUtils.resolvePath(filename, srcFolder, folderIndices)
+                if mtlPath.lower().endswith('.mtl') and os.path.isfile(mtlPath):
+                    filenames += usdUtils.findReferencedFilenames(mtlPath)
+        elif '.fbx' == srcExt:
+            filenames = usdUtils.findReferencedFilenames(srcPath)
+        elif '.usd' == srcExt or '.usda' == srcExt or '.usdc' == srcExt:
+            return getUsdDependencies(srcPath)
+    except (IOError, OSError, ValueError, struct.error, Tf.ErrorException):
+        usdUtils.printWarning("can't find files referenced by " + srcPath + ' for conversion cache')
+
+    paths = []
+    for filename in filenames:
+        path = usdUtils.resolvePath(srcFolder + filename, srcFolder, folderIndices)
+        if not os.path.isfile(path):
+            path = usdUtils.resolvePath(filename, srcFolder, folderIndices)
+        paths.append((filename, path))
+    return sorted(set(paths))
+
+
+def getUsdDependencies(srcPath):
+    # layers and assets, like textures, are resolved by USD as for usdz packaging
+    from pxr import UsdUtils
+    srcFolder = os.path.dirname(os.path.abspath(srcPath))
+    paths = []
+    if hasattr(UsdUtils, 'ComputeAllDependencies'):
+        layers, assets, unresolvedPaths = UsdUtils.ComputeAllDependencies(Sdf.AssetPath(srcPath))
+        for path in [layer.realPath for layer in layers] + list(assets):
+            if path and os.path.realpath(path) != os.path.realpath(srcPath):
+                paths.append((os.path.relpath(path, srcFolder), path))
+        for path in unresolvedPaths:
+            paths.append((path, ''))
+        return sorted(set(paths))
+
+    usdStage = Usd.Stage.Open(srcPath)
+    if usdStage is None:
+        return []
+    for layer in usdStage.GetUsedLayers():
+        if layer.realPath and os.path.realpath(layer.realPath) != os.path.realpath(srcPath):
+            paths.append((os.path.relpath(layer.realPath, srcFolder), layer.realPath))
+    for usdPrim in usdStage.TraverseAll():
+        for attribute in usdPrim.GetAttributes():
+            typeName = attribute.GetTypeName()
+            if typeName == Sdf.ValueTypeNames.Asset:
+                values = [attribute.Get()]
+            elif typeName == Sdf.ValueTypeNames.AssetArray:
+                values = attribute.Get() or []
+            else:
+                continue
+            for value in values:
+                if value is not None and value.path:
+                    paths.append((value.path, value.resolvedPath))
+    return sorted(set(paths))
 
-    if usdStage == None:
-        usdUtils.printError("failed to create USD stage.")
-        raise usdUtils.ConvertError()
 
-    params = USDParameters(usdStage, parserOut.verbose, parserOut.url, parserOut.copyright, tmpPath)
-    createStageMetadata(params)
+def findMaterialTexture(filename, srcPath, dstPath, currentFolder):
+    # same search order as copyMaterialTextures
+    srcFolder = os.path.dirname(srcPath)
+    dstFolder = os.path.dirname(dstPath)
+    if srcFolder and os.path.isfile(srcFolder + '/' + filename):
+        return srcFolder + '/' + filename
+    if dstFolder and dstFolder != srcFolder and os.path.isfile(dstFolder + '/' + filename):
+        return dstFolder + '/' + filename
+    if currentFolder and not os.path.isabs(filename) and os.path.isfile(os.path.join(currentFolder, filename)):
+        return os.path.join(currentFolder, filename)
+    if os.path.isfile(filename):
+        return filename
+    return ''
+
+
+def getCacheKey(srcPath, srcExt, dstPath, parserOut, arguments, folder):
+    # arguments are parsed arguments, they include content of argument files
+    sha = hashlib.sha1()
+    sha.update(('usdzconvert ' + str(USDParameters.version) + ' cache ' + str(kCacheVersion) + '\n').encode('utf-8'))
+    sha.update(usdUtils.getFileHash(srcPath).encode('utf-8'))
+    # output file name is used for asset name
+    sha.update(('\noutput ' + os.path.basename(dstPath) + '\n').encode('utf-8'))
+    skipNext = False
+    for argument in arguments:
+        if skipNext or argument in ['-cacheDir', '--cache-dir', '-cacheSize', '--cache-size', '-profile', '--profile', '-profileStats']:
+            # cache and profile options don't change output file
+            skipNext = not skipNext
+            continue
+        if argument == parserOut.inFilePath or argument == parserOut.outFilePath:
+            continue
+        sha.update((argument + '\n').encode('utf-8'))
+    for material in parserOut.materials:
+        for inputName, input in sorted(material.inputs.items()):
+            if not isinstance(input, usdUtils.Map) or not input.file:
+                continue
+            path = findMaterialTexture(input.file, srcPath, dstPath, folder)
+            fileHash = usdUtils.getFileHash(path) if path else 'missing'
+            sha.update(('texture ' + input.file + ' ' + fileHash + '\n').encode('utf-8'))
+    for filename, path in getReferencedFiles(srcPath, srcExt):
+        fileHash = usdUtils.getFileHash(path) if path and os.path.isfile(path) else 'missing'
+        sha.update(('reference ' + filename + ' ' + fileHash + '\n').encode('utf-8'))
+    return sha.hexdigest()
 
-    if parserOut.metersPerUnit != 0 and legacyModifier is None:
-        usdStage.SetMetadata("metersPerUnit", parserOut.metersPerUnit)
 
-    if parserOut.loop and (srcIsUsd or srcIsUsdz):
-        usdStage.SetMetadataByDictKey("customLayerData", "loopStartToEndTimeCode", True)
+def getCacheTmpPath(path):
+    # unique file in the same folder for atomic renaming
+    handle, tmpPath = tempfile.mkstemp('.tmp', '.', os.path.dirname(path) or '.')
+    os.close(handle)
+    return tmpPath
 
-    if parserOut.noloop:
-        usdStage.SetMetadataByDictKey("customLayerData", "loopStartToEndTimeCode", False)
 
-    rootPrim = None
-    if usdStage.HasDefaultPrim():
-        rootPrim = usdStage.GetDefaultPrim()
+def copyFromCache(cachePath, dstPath, verbose):
+    try:
+        # touch cached file for least recently used eviction
+        os.utime(cachePath, None)
+    except OSError:
+        return False
 
-    if rootPrim != None:
-        params.assetName = rootPrim.GetName()
-        params.materialsPath = '/' + params.assetName + '/Materials'
+    usdUtils.makeFolder(os.path.dirname(dstPath))
+    tmpPath = ''
+    try:
+        tmpPath = getCacheTmpPath(dstPath)
+        try:
+            # link needs free name, temporary file only reserves it
+            os.remove(tmpPath)
+            os.link(cachePath, tmpPath)
+        except (OSError, AttributeError):
+            copyfile(cachePath, tmpPath)
+        os.rename(tmpPath, dstPath)
+    except (IOError, OSError):
+        # cached file can be removed by other process
+        if tmpPath and os.path.isfile(tmpPath):
+            os.remove(tmpPath)
+        return False
+    if verbose:
+        print('Copied from conversion cache:', cachePath)
+    return True
 
-        if legacyModifier is not None and legacyModifier.getMetersPerUnit() != 0:
-            usdMetersPerUnit = 0.01
-            scale = legacyModifier.getMetersPerUnit() / usdMetersPerUnit
-            if scale != 1:
-                rootXform = UsdGeom.Xform(rootPrim)
-                rootXform.AddScaleOp(UsdGeom.XformOp.PrecisionFloat, "metersPerUnit").Set(Gf.Vec3f(scale, scale, scale))
 
-    getAllUsdMaterials(params, params.usdStage.GetPseudoRoot())
+def storeInCache(dstPath, cachePath, cacheSize, verbose):
+    cacheFolder = os.path.dirname(cachePath)
+    tmpPath = ''
+    try:
+        usdUtils.makeFolder(cacheFolder)
+        tmpPath = getCacheTmpPath(cachePath)
+        copyfile(dstPath, tmpPath)
+        os.rename(tmpPath, cachePath)
+    except (IOError, OSError):
+        if not os.path.isdir(cacheFolder):
+            usdUtils.printWarning("can't create conversion cache folder " + cacheFolder)
+        elif tmpPath and os.path.isfile(tmpPath):
+            os.remove(tmpPath)
+        return
+    if verbose:
+        print('Stored in conversion cache:', cachePath)
+    evictFromCache(cacheFolder, cacheSize * 1024 * 1024)
+
+
+def evictFromCache(cacheFolder, maxSize):
+    entries = []
+    for filename in os.listdir(cacheFolder):
+        if filename[0] == '.':
+            # temporary file of other process
+            continue
+        try:
+            stat = os.stat(os.path.join(cacheFolder, filename))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, filename))
 
-    if srcIsUsd and dstIsUsdz:
-        # copy textures to temporary folder while creating usdz
-        copyTexturesFromStageToFolder(params, srcPath, tmpFolder)
+    cacheSize = sum(entry[1] for entry in entries)
+    for mtime, size, filename in sorted(entries):
+        if cacheSize <= maxSize:
+            break
+        try:
+            os.remove(os.path.join(cacheFolder, filename))
+        except OSError:
+            pass
+        cacheSize -= size
 
-    if srcIsUsd:
-        if not (len(parserOut.materials) == 1 and parserOut.materials[0].isEmpty()):
-            usdUtils.printWarning('Material arguments are ignored for .usda/usdc input files.')
-    else:
-        # update usd materials with command line material arguments
-        for material in parserOut.materials:
 
-            if legacyModifier is not None:
-                legacyModifier.opacityAndDiffuseOneTexture(material)
+def getNormalsCreaseAngle(parserOut):
+    return parserOut.creaseAngle if parserOut.generateNormals else None
 
-            if material.name == '':
-                # if materials are not specified, then apply default material to all materials
-                if not material.isEmpty():
-                    addDefaultMaterialToGeometries(params, params.usdStage.GetPseudoRoot())
 
-                    copyMaterialTextures(params, material, srcPath, dstPath, tmpFolder)
-                    if legacyModifier is not None:
-                        legacyModifier.makeORMTextures(material, tmpFolder, parserOut.verbose)
+def createUsdStageWithObj(module, srcPath, tmpPath, legacyModifier, copyTextures, parserOut, folder):
+    # this line can be updated with Pixar's backend loader
+    return module.usdStageWithObj(srcPath, tmpPath, legacyModifier, copyTextures, parserOut.verbose,
+        parserOut.mergeGroups, parserOut.keepGroupNames, getNormalsCreaseAngle(parserOut))
 
-                    for path, usdMaterial in params.usdMaterials.iteritems():
-                        surfaceShader = material.getUsdSurfaceShader(usdMaterial, params.usdStage)
-                        material.updateUsdMaterial(usdMaterial, surfaceShader, params.usdStage)
-                continue
 
-            usdMaterial = findUsdMaterial(params, material.path if material.path else material.name)
+def createUsdStageWithGlTF(module, srcPath, tmpPath, legacyModifier, copyTextures, parserOut, folder):
+    return module.usdStageWithGlTF(srcPath, tmpPath, legacyModifier, copyTextures, parserOut.verbose, getNormalsCreaseAngle(parserOut))
 
-            if usdMaterial is not None:
-                # if material does exist remove it
-                matPath = str(usdMaterial.GetPrim().GetPath())
-                if matPath in params.usdMaterials:
-                    del params.usdMaterials[matPath]
-                usdStage.RemovePrim(matPath)
-                usdMaterial = None
 
-            copyMaterialTextures(params, material, srcPath, dstPath, tmpFolder)
-            if legacyModifier is not None:
-                legacyModifier.makeORMTextures(material, tmpFolder, parserOut.verbose)
+def createUsdStageWithFbx(module, srcPath, tmpPath, legacyModifier, copyTextures, parserOut, folder):
+    fbxCacheFolder = os.path.join(folder, parserOut.fbxCacheFolder) if parserOut.fbxCacheFolder else ''
+    return module.usdStageWithFbx(srcPath, tmpPath, legacyModifier, copyTextures, parserOut.verbose, getNormalsCreaseAngle(parserOut),
+        parserOut.maxSkinInfluences, parserOut.sampleKeyTimes, fbxCacheFolder)
 
-            usdMaterial = material.makeUsdMaterial(params.asset)
-            if usdMaterial is None:
-                continue
 
-            surfaceShader = material.getUsdSurfaceShader(usdMaterial, params.usdStage)
-            material.updateUsdMaterial(usdMaterial, surfaceShader, params.usdStage)
-            params.usdMaterials[str(usdMaterial.GetPrim().GetPath())] = usdMaterial
+# input file extension -> (converter module, function which creates USD stage with module)
+# modules are imported on first conversion of their format
+converterRegistry = {
+    '.obj': ('usdStageWithObj', createUsdStageWithObj),
+    '.gltf': ('usdStageWithGlTF', createUsdStageWithGlTF),
+    '.glb': ('usdStageWithGlTF', createUsdStageWithGlTF),
+    '.fbx': ('usdStageWithFbx', createUsdStageWithFbx)
+}
 
-    usdStage.GetRootLayer().Export(tmpPath)
 
-    # prepare destination folder
-    dstFolder = os.path.dirname(dstPath)
-    if dstFolder != '' and not os.path.isdir(dstFolder):
-        if parserOut.verbose:
-            print('Creating folder:', dstFolder)
-        os.makedirs(dstFolder)
-
-    if dstIsUsdz:
-        # construct .usdz archive from the .usdc file
-        UsdUtils.CreateNewARKitUsdzPackage(Sdf.AssetPath(tmpPath), dstPath)
-    else:
-        usdUtils.copy(tmpPath, dstPath)
+def registerConverter(extension, moduleName, createUsdStage):
+    extension = extension.lower()
+    converterRegistry[extension] = (moduleName, createUsdStage)
+    if extension not in supportedInputFormats:
+        supportedInputFormats.append(extension)
+
+
+def getConverter(extension):
+    entry = converterRegistry.get(extension)
+    if entry is None:
+        return None
+    moduleName, createUsdStage = entry
+    __import__(moduleName)
+    module = sys.modules[moduleName]
+    return lambda *arguments: createUsdStage(module, *arguments)
+
+
+outputLock = threading.Lock()
+checkerLock = threading.Lock()
+usdARKitChecker = None # checker module, loaded by getARKitChecker under checkerLock
+
+
+def getARKitChecker():
+    # checker script is loaded once and reused by all conversions
+    global usdARKitChecker
+    with checkerLock:
+        if usdARKitChecker is None:
+            checkerPath = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'usdARKitChecker')
+            try:
+                import importlib.util
+                from importlib.machinery import SourceFileLoader
+            except ImportError:
+                SourceFileLoader = None
+            if SourceFileLoader is not None:
+                loader = SourceFileLoader('usdARKitChecker', checkerPath)
+                module = importlib.util.module_from_spec(importlib.util.spec_from_loader('usdARKitChecker', loader))
+                loader.exec_module(module)
+            else:
+                import imp
+                module = imp.load_source('usdARKitChecker', checkerPath)
+            usdARKitChecker = module
+        return usdARKitChecker
+
+
+
+class ThreadOutput:
+    # replaces sys.stdout to send printed text of each thread to log of its conversion
+    def __init__(self, stream):
+        self.stream = stream
+        self.logs = threading.local()
+
+
+    def setLog(self, log):
+        # returns previous log of current thread
+        previousLog = getattr(self.logs, 'log', None)
+        self.logs.log = log
+        return previousLog
+
+
+    def write(self, text):
+        log = getattr(self.logs, 'log', None)
+        if log is None:
+            self.stream.write(text)
+        else:
+            log.write(text)
+
+
+    def flush(self):
+        log = getattr(self.logs, 'log', None)
+        if log is None:
+            self.stream.flush()
+
+
+
+class Converter:
+    # Conversion context: relative paths are resolved from folder, temporary files are created in tempFolder
+    # and printed text goes to log file object. Converters don't share state, so they can run in threads.
+    def __init__(self, folder='', tempFolder=None, log=None):
+        self.folder = folder
+        self.tempFolder = tempFolder
+        self.log = log
+        self.profiler = None # profiler of last conversion with -profile or -profileStats
+
+
+    def process(self, argumentList):
+        if self.log is None:
+            return self._process(argumentList)
+
+        with outputLock:
+            if not isinstance(sys.stdout, ThreadOutput):
+                sys.stdout = ThreadOutput(sys.stdout)
+            threadOutput = sys.stdout
+        previousLog = threadOutput.setLog(self.log)
+        try:
+            return self._process(argumentList)
+        finally:
+            threadOutput.setLog(previousLog)
+
+
+    def tryProcess(self, argumentList):
+        try:
+            ret = self.process(argumentList)
+        except usdUtils.ConvertError:
+            return kConvertErrorReturnValue
+        except usdUtils.ConvertExit:
+            return 0
+        except:
+            raise
+        return ret
+
+
+    # private:
+    def _process(self, argumentList):
+        startTime = time.time()
+        startCpuTime = usdUtils.getCpuTime()
+        self.profiler = None
+        parser = Parser(self.folder)
+        parserOut = parser.parse(argumentList)
+        if not parserOut.profilePath and not parserOut.profileStatsFolder:
+            return self._convert(parser, parserOut)
+
+        # profiler belongs to this conversion, converter modules reach it by binding to conversion thread
+        self.profiler = usdUtils.Profiler(os.path.join(self.folder, parserOut.profileStatsFolder) if parserOut.profileStatsFolder else '')
+        self.profiler.addStage('arguments', time.time() - startTime, usdUtils.getCpuTime() - startCpuTime)
+        previousProfiler = usdUtils.setProfiler(self.profiler)
+        try:
+            return self._convert(parser, parserOut)
+        finally:
+            usdUtils.setProfiler(previousProfiler)
+            if parserOut.profilePath:
+                self.profiler.save(os.path.join(self.folder, parserOut.profilePath))
+
+
+    def _convert(self, parser, parserOut):
+        # relative paths are relative to this folder instead of current working directory
+        folder = self.folder
+        srcPath = ''
+        if os.path.isfile(os.path.join(folder, parserOut.inFilePath)):
+            srcPath = os.path.join(folder, parserOut.inFilePath)
+        elif os.path.dirname(parserOut.inFilePath) == '' and parserOut.argumentFile:
+            # try to find input file in argument file folder which is specified by -f in command line
+            argumentFileDir = os.path.dirname(parserOut.argumentFile)
+            if argumentFileDir and os.path.isfile(os.path.join(argumentFileDir, parserOut.inFilePath)):
+                folder = argumentFileDir
+                srcPath = os.path.join(folder, parserOut.inFilePath)
+
+        if srcPath == '':
+            parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' does not exist.')
+
+        fileAndExt = os.path.splitext(srcPath)
+        if len(fileAndExt) != 2:
+            parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' has unsupported file extension.')
+
+        print('Input file:', srcPath)
+        srcExt = fileAndExt[1].lower()
+
+        dstIsUsdz = False
+        dstPath = os.path.join(folder, parserOut.outFilePath) if parserOut.outFilePath else ''
+        dstExt = ''
+        if dstPath == '':
+            # default destination file is .usdz file in the same folder as source file
+            dstExt = '.usdz'
+            dstPath = fileAndExt[0] + dstExt
+            dstIsUsdz = True
+
+        dstFileAndExt = os.path.splitext(dstPath)
+        if len(dstFileAndExt) != 2:
+            parser.printErrorUsageAndExit('output file ' + dstPath + ' has unsupported file extension.')
+
+        if not dstIsUsdz:
+            dstExt = dstFileAndExt[1].lower()
+            if dstExt == '.usdz':
+                dstIsUsdz = True
+            elif dstExt != '.usd' and dstExt != '.usdc' and dstExt != '.usda':
+                parser.printErrorUsageAndExit('output file ' + dstPath + ' should have .usdz, .usdc, .usda or .usd extension.')
+
+        cachePath = ''
+        if parserOut.cacheFolder and not (parserOut.copyTextures and not dstIsUsdz):
+            with usdUtils.profileStage('cache'):
+                cacheKey = getCacheKey(srcPath, srcExt, dstPath, parserOut, parser.arguments, folder)
+                cachePath = os.path.join(folder, parserOut.cacheFolder, cacheKey + dstExt)
+                isCopiedFromCache = os.path.isfile(cachePath) and copyFromCache(cachePath, dstPath, parserOut.verbose)
+            if isCopiedFromCache:
+                print('Output file:', dstPath)
+                return 0
+
+        tmpFolder = tempfile.mkdtemp('usdzconvert', dir=self.tempFolder)
+        outputLayerNames = []
+        srcPackage = None
+        try:
+            with usdUtils.profileStage('import'):
+                legacyModifier = None
+                if parserOut.iOS12:
+                    import iOS12LegacyModifier
+                    legacyModifier = iOS12LegacyModifier.createLegacyModifier()
+                    legacyModifier.setMetersPerUnit(parserOut.metersPerUnit)
+                    print('Converting in iOS12 compatiblity mode.')
+
+                tmpPath = dstFileAndExt[0] + '.usdc' if dstIsUsdz else dstPath
+                tmpBasename = os.path.basename(tmpPath)
+                tmpPath = tmpFolder + '/' + tmpBasename
+                srcFolder = os.path.dirname(srcPath)
+                usdzPackageFiles = None
+                usdStage = None
+                if '.usd' == srcExt or '.usda' == srcExt or '.usdc' == srcExt:
+                    if dstIsUsdz:
+                        usdStage = Usd.Stage.Open(srcPath)
+                        if usdStage is not None:
+                            usdzPackageFiles = getUsdzPackageFiles(usdStage, [srcFolder or '.'])
+                            if usdzPackageFiles is None:
+                                # UsdUtils resolves dependencies of temporary .usdc file by absolute paths
+                                usdStage = openUsdAnchored(srcPath, tmpBasename)
+
+                if parserOut.verbose and parserOut.copyTextures and dstIsUsdz:
+                    usdUtils.printWarning('argument -copytextures works for .usda and .usdc output files only.')
+
+                if (parserOut.timeSampleStride > 0 or parserOut.timeSampleRange is not None) and '.abc' != srcExt:
+                    usdUtils.printWarning('arguments -timeSampleStride and -timeSampleRange work for Alembic input files only.')
+
+                copyTextures = parserOut.copyTextures and not dstIsUsdz
+                srcIsUsd = False;
+                srcIsUsdz = False;
+                createUsdStage = getConverter(srcExt)
+                if createUsdStage is not None:
+                    usdStage = createUsdStage(srcPath, tmpPath, legacyModifier, copyTextures, parserOut, folder)
+                elif '.usd' == srcExt or '.usda' == srcExt or '.usdc' == srcExt:
+                    if usdStage is None:
+                        usdStage = Usd.Stage.Open(srcPath)
+                    srcIsUsd = True;
+                elif '.usdz' == srcExt:
+                    if zipfile.is_zipfile(srcPath):
+                        srcPackage = zipfile.ZipFile(srcPath)
+                        usdStage = openUsdzInPlace(srcPath, tmpBasename, srcPackage)
+                        if usdStage is None:
+                            srcPackage.close()
+                            srcPackage = None
+                    if usdStage is None:
+                        tmpUSDC = unzip(srcPath, tmpFolder)
+                        if tmpUSDC == '':
+                            parser.printErrorUsageAndExit("can't open input usdz file " + parserOut.inFilePath)
+                        usdStage = Usd.Stage.Open(tmpFolder + '/' + tmpUSDC)
+                    srcIsUsdz = True;
+                elif '.abc' == srcExt:
+                    # Alembic layer is read only, so its content is edited in anonymous layer and written once by export
+                    abcLayer = Sdf.Layer.FindOrOpen(srcPath)
+                    if abcLayer is not None:
+                        usdLayer = Sdf.Layer.CreateAnonymous(tmpBasename)
+                        usdLayer.TransferContent(abcLayer)
+                        abcLayer = None
+                        if parserOut.timeSampleStride > 0 or parserOut.timeSampleRange is not None:
+                            thinTimeSamples(usdLayer, parserOut.timeSampleStride, parserOut.timeSampleRange, parserOut.verbose)
+                        usdStage = Usd.Stage.Open(usdLayer)
+                else:
+                    parser.printErrorUsageAndExit('input file ' + parserOut.inFilePath + ' has unsupported file extension.')
+
+                if usdStage == None:
+                    usdUtils.printError("failed to create USD stage.")
+                    raise usdUtils.ConvertError()
+
+            with usdUtils.profileStage('geometry'):
+                params = USDParameters(usdStage, parserOut.verbose, parserOut.url, parserOut.copyright, tmpPath)
+                createStageMetadata(params)
+
+                if parserOut.weldVertices:
+                    usdUtils.weldMeshes(usdStage, parserOut.verbose)
+
+                if parserOut.metersPerUnit != 0 and legacyModifier is None:
+                    usdStage.SetMetadata("metersPerUnit", parserOut.metersPerUnit)
+
+                if parserOut.loop and (srcIsUsd or srcIsUsdz):
+                    usdStage.SetMetadataByDictKey("customLayerData", "loopStartToEndTimeCode", True)
+
+                if parserOut.noloop:
+                    usdStage.SetMetadataByDictKey("customLayerData", "loopStartToEndTimeCode", False)
+
+                rootPrim = None
+                if usdStage.HasDefaultPrim():
+                    rootPrim = usdStage.GetDefaultPrim()
+
+                if rootPrim != None:
+                    params.assetName = rootPrim.GetName()
+                    params.materialsPath = '/' + params.assetName + '/Materials'
+
+                    if legacyModifier is not None and legacyModifier.getMetersPerUnit() != 0:
+                        usdMetersPerUnit = 0.01
+                        scale = legacyModifier.getMetersPerUnit() / usdMetersPerUnit
+                        if scale != 1:
+                            rootXform = UsdGeom.Xform(rootPrim)
+                            rootXform.AddScaleOp(UsdGeom.XformOp.PrecisionFloat, "metersPerUnit").Set(Gf.Vec3f(scale, scale, scale))
+
+            with usdUtils.profileStage('materials'):
+                getAllUsdMaterials(params)
+
+                if srcIsUsd:
+                    if not (len(parserOut.materials) == 1 and parserOut.materials[0].isEmpty()):
+                        usdUtils.printWarning('Material arguments are ignored for .usda/usdc input files.')
+                else:
+                    # update usd materials with command line material arguments
+                    for material in parserOut.materials:
+
+                        if legacyModifier is not None:
+                            legacyModifier.opacityAndDiffuseOneTexture(material)
+
+                        if material.name == '':
+                            # if materials are not specified, then apply default material to all materials
+                            if not material.isEmpty():
+                                addDefaultMaterialToGeometries(params)
+
+                                copyMaterialTextures(params, material, srcPath, dstPath, tmpFolder, folder)
+                                if legacyModifier is not None:
+                                    legacyModifier.makeORMTextures(material, tmpFolder, parserOut.verbose)
+
+                                for path, usdMaterial in params.usdMaterials.iteritems():
+                                    surfaceShader = material.getUsdSurfaceShader(usdMaterial, params.usdStage)
+                                    material.updateUsdMaterial(usdMaterial, surfaceShader, params.usdStage)
+                            continue
+
+                        usdMaterial = findUsdMaterial(params, material.path if material.path else material.name)
+
+                        if usdMaterial is not None:
+                            # if material does exist remove it
+                            matPath = str(usdMaterial.GetPrim().GetPath())
+                            if matPath in params.usdMaterials:
+                                del params.usdMaterials[matPath]
+                            usdStage.RemovePrim(matPath)
+                            usdMaterial = None
+
+                        copyMaterialTextures(params, material, srcPath, dstPath, tmpFolder, folder)
+                        if legacyModifier is not None:
+                            legacyModifier.makeORMTextures(material, tmpFolder, parserOut.verbose)
 
-    # copy textures with usda and usdc
-    if copyTextures:
-        copyTexturesFromStageToFolder(params, tmpPath, dstFolder)
+                        usdMaterial = material.makeUsdMaterial(params.asset)
+                        if usdMaterial is None:
+                            continue
 
-    if removeTmpPath:
-        os.remove(tmpPath)
+                        surfaceShader = material.getUsdSurfaceShader(usdMaterial, params.usdStage)
+                        material.updateUsdMaterial(usdMaterial, surfaceShader, params.usdStage)
+                        params.usdMaterials[str(usdMaterial.GetPrim().GetPath())] = usdMaterial
+                        params.stageIndex.addMaterial(usdMaterial.GetPrim())
+
+            with usdUtils.profileStage('export'):
+                usdStage.GetRootLayer().Export(tmpPath)
+
+            with usdUtils.profileStage('packaging'):
+                # prepare destination folder
+                dstFolder = os.path.dirname(dstPath)
+                if dstFolder != '' and not os.path.isdir(dstFolder):
+                    if parserOut.verbose:
+                        print('Creating folder:', dstFolder)
+                    usdUtils.makeFolder(dstFolder)
+
+                if os.path.isfile(dstPath) and os.stat(dstPath).st_nlink > 1:
+                    # don't overwrite content of hard linked file from conversion cache
+                    os.remove(dstPath)
+
+                # output is written in temporary folder and moved, so interrupted conversion doesn't leave partial file
+                packagePath = tmpFolder + '/' + os.path.basename(dstPath)
+                if dstIsUsdz:
+                    if not srcIsUsd:
+                        usdzPackageFiles = getUsdzPackageFiles(usdStage, [tmpFolder], srcPackage, createUsdStage is not None)
+                    if usdzPackageFiles is not None:
+                        createUsdzPackage(tmpPath, usdzPackageFiles, packagePath, parserOut.verbose, srcPackage)
+                        if srcPackage is not None:
+                            # source package can be replaced by destination package
+                            srcPackage.close()
+                            srcPackage = None
+                    else:
+                        # construct .usdz archive from the .usdc file
+                        from pxr import UsdUtils
+                        UsdUtils.CreateNewARKitUsdzPackage(Sdf.AssetPath(tmpPath), packagePath)
+                elif tmpPath != packagePath:
+                    usdUtils.copy(tmpPath, packagePath)
+                if not dstIsUsdz and createUsdStage is not None:
+                    # layers which converter writes next to its output, like FBX anim stacks
+                    outputLayerNames = getLocalLayerNames(usdStage.GetRootLayer()) or []
+                    for name in outputLayerNames:
+                        move(os.path.join(tmpFolder, name), os.path.join(dstFolder, name))
+                move(packagePath, dstPath)
+
+            # copy textures with usda and usdc
+            if copyTextures:
+                with usdUtils.profileStage('textures'):
+                    if srcPackage is not None:
+                        # extract only package entries which are used by output file
+                        for name, filePath in getUsdzPackageFiles(usdStage, [tmpFolder], srcPackage) or []:
+                            if filePath is None:
+                                srcPackage.extract(name, tmpFolder)
+                    # relative texture paths of .usd input are not changed by conversion
+                    copyTexturesFromStageToFolder(params, srcPath if srcIsUsd else tmpPath, dstFolder)
+        finally:
+            # temporary files are removed also when conversion fails or is interrupted
+            if srcPackage is not None:
+                srcPackage.close()
+            rmtree(tmpFolder, ignore_errors=True)
+        print('Output file:', dstPath)
+
+        arkitCheckerReturn = 0
+        if dstIsUsdz:
+            # ARKit checker code
+            with usdUtils.profileStage('arkitCheck'):
+                usdcheckerArgs = [dstPath]
+                if parserOut.verbose:
+                    usdcheckerArgs.append('-v')
+                usdARKitChecker = getARKitChecker()
+                arkitCheckerReturn = usdARKitChecker.main(usdcheckerArgs)
+
+        if cachePath and arkitCheckerReturn == 0 and len(outputLayerNames) == 0:
+            # cache entries are single files
+            with usdUtils.profileStage('cache'):
+                storeInCache(dstPath, cachePath, parserOut.cacheSize, parserOut.verbose)
+
+        return arkitCheckerReturn
 
-    rmtree(tmpFolder, ignore_errors=True)
-    print('Output file:', dstPath)
 
-    arkitCheckerReturn = 0
-    if dstIsUsdz:
-        # ARKit checker code
-        usdcheckerArgs = [dstPath]
-        if parserOut.verbose:
-            usdcheckerArgs.append('-v')
-        scriptFolder = os.path.dirname(os.path.realpath(__file__))
-        usdARKitChecker = imp.load_source('main', scriptFolder + '/usdARKitChecker')
-        arkitCheckerReturn = usdARKitChecker.main(usdcheckerArgs)
 
-    return arkitCheckerReturn
+def process(argumentList):
+    return Converter().process(argumentList)
+
 
 def tryProcess(argumentList):
-    try:
-        ret = process(argumentList)
-    except usdUtils.ConvertError:
-        return kConvertErrorReturnValue
-    except usdUtils.ConvertExit:
-        return 0
-    except:
-        raise
-    return ret
+    return Converter().tryProcess(argumentList)
 
 
 def convert(fileList, optionDictionary):
-    supportedFormats = ['.obj', '.gltf', '.glb', '.fbx', '.usd', '.usda', '.usdc', '.usdz', '.abc'];
     argumentList = []
 
     for file in fileList:
         fileAndExt = os.path.splitext(file)
         if len(fileAndExt) == 2:
             ext = fileAndExt[1].lower();
-            if ext in supportedFormats:
+            if ext in supportedInputFormats:
                 # source file to convert
                 argumentList.append(file)
 
@@ -860,7 +1604,248 @@ def convert(fileList, optionDictionary):
     return tryProcess(argumentList)
 
 
+def collectBatchInputs(items):
+    inputs = []
+    for item in items:
+        if os.path.isdir(item):
+            for folder, subfolders, filenames in os.walk(item):
+                subfolders.sort()
+                for filename in sorted(filenames):
+                    if os.path.splitext(filename)[1].lower() in supportedInputFormats:
+                        inputs.append(os.path.join(folder, filename))
+        elif os.path.splitext(item)[1].lower() in supportedInputFormats:
+            inputs.append(item)
+        elif os.path.isfile(item):
+            # manifest file, paths are relative to its folder
+            with open(item, 'r') as file:
+                lines = [line.strip() for line in file]
+            manifestFolder = os.path.dirname(item)
+            inputs += collectBatchInputs([os.path.join(manifestFolder, line) for line in lines if line and not line.startswith('#')])
+        else:
+            usdUtils.printWarning("can't find batch input " + item)
+    return inputs
+
+
+def processBatchJob(job, jobFolder):
+    inputPath, outputPath, arguments = job
+    result = {'input': inputPath, 'output': outputPath, 'exitCode': 0, 'error': ''}
+    startTime = time.time()
+    try:
+        result['exitCode'] = Converter(tempFolder=jobFolder).tryProcess([inputPath, outputPath] + arguments)
+    except Exception as error:
+        result['exitCode'] = kConvertErrorReturnValue
+        result['error'] = str(error)
+    result['time'] = time.time() - startTime
+    return result
+
+
+def runBatchWorker(connection):
+    # runs in worker process, converts jobs one by one until it receives None
+    while True:
+        try:
+            item = connection.recv()
+        except EOFError:
+            break
+        if item is None:
+            break
+        job, jobFolder = item
+        connection.send(processBatchJob(job, jobFolder))
+    connection.close()
+
+
+def getBatchContext():
+    # forked workers share modules which are imported before workers are started
+    if hasattr(multiprocessing, 'get_context') and 'fork' in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
+def importConverters(extensions):
+    for extension in sorted(set(extensions)):
+        try:
+            getConverter(extension)
+        except (ImportError, SyntaxError):
+            # error is reported by conversion of the job
+            pass
+
+
+
+class BatchWorker:
+    # worker process with the job which it converts
+    def __init__(self, context):
+        self.connection, workerConnection = context.Pipe()
+        self.process = context.Process(target=runBatchWorker, args=(workerConnection,))
+        self.process.start()
+        workerConnection.close()
+        self.jobIdx = None
+        self.jobFolder = ''
+        self.startTime = 0
+
+
+    def startJob(self, jobIdx, job):
+        # returns False if worker has exited
+        self.jobIdx = jobIdx
+        self.jobFolder = tempfile.mkdtemp('usdzconvert')
+        self.startTime = time.time()
+        try:
+            self.connection.send((job, self.jobFolder))
+        except (IOError, OSError):
+            self.finishJob()
+            return False
+        return True
+
+
+    def getResult(self):
+        # returns result of the job, None while job is converted or {} if worker has exited
+        if self.connection.poll():
+            try:
+                return self.connection.recv()
+            except EOFError:
+                return {}
+        return None if self.process.is_alive() else {}
+
+
+    def finishJob(self):
+        if self.jobFolder:
+            rmtree(self.jobFolder, ignore_errors=True)
+        self.jobIdx = None
+        self.jobFolder = ''
+
+
+    def stop(self):
+        # idle worker exits by itself, busy worker is terminated
+        if self.jobIdx is None and self.process.is_alive():
+            try:
+                self.connection.send(None)
+                self.process.join(kWorkerStopTimeout)
+            except (IOError, OSError):
+                pass
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join()
+        self.connection.close()
+        self.finishJob()
+
+
+
+def runBatchJobs(jobs, jobsCount):
+    # workers convert many jobs, so each worker imports modules once,
+    # a crashed worker fails only its job and is replaced by a new worker
+    context = getBatchContext()
+    results = [None] * len(jobs)
+    pending = list(range(len(jobs)))
+    workers = []
+    try:
+        while pending or any(worker.jobIdx is not None for worker in workers):
+            for worker in list(workers):
+                if worker.jobIdx is None and pending:
+                    jobIdx = pending.pop(0)
+                    if not worker.startJob(jobIdx, jobs[jobIdx]):
+                        pending.insert(0, jobIdx)
+                        worker.stop()
+                        workers.remove(worker)
+            while pending and len(workers) < jobsCount:
+                worker = BatchWorker(context)
+                workers.append(worker)
+                jobIdx = pending.pop(0)
+                if not worker.startJob(jobIdx, jobs[jobIdx]):
+                    pending.insert(0, jobIdx)
+
+            time.sleep(0.05)
+            for worker in list(workers):
+                if worker.jobIdx is None:
+                    continue
+                result = worker.getResult()
+                if result is None:
+                    continue
+                jobIdx = worker.jobIdx
+                if not result:
+                    inputPath, outputPath, arguments = jobs[jobIdx]
+                    worker.stop()
+                    workers.remove(worker)
+                    result = {'input': inputPath, 'output': outputPath, 'exitCode': kConvertErrorReturnValue,
+                        'error': 'conversion process exited with code ' + str(worker.process.exitcode), 'time': time.time() - worker.startTime}
+                    usdUtils.printError("can't convert " + inputPath + ': ' + result['error'])
+                worker.finishJob()
+                results[jobIdx] = result
+    finally:
+        for worker in workers:
+            worker.stop()
+    return results
+
+
+def convertBatch(inputs, arguments, jobsCount=0, outputFolder='', summaryPath=''):
+    inputs = collectBatchInputs(inputs)
+    jobs = []
+    outputPaths = set()
+    for inputPath in inputs:
+        outputPath = os.path.splitext(inputPath)[0] + '.usdz'
+        if outputFolder:
+            outputPath = os.path.join(outputFolder, os.path.basename(outputPath))
+            if outputPath in outputPaths:
+                outputPath = os.path.splitext(outputPath)[0] + '_' + str(len(jobs)) + '.usdz'
+        outputPaths.add(outputPath)
+        jobs.append((inputPath, outputPath, arguments))
+
+    startTime = time.time()
+    jobsCount = jobsCount if jobsCount > 0 else multiprocessing.cpu_count()
+    importConverters([os.path.splitext(inputPath)[1].lower() for inputPath in inputs])
+    results = runBatchJobs(jobs, jobsCount)
+
+    failedCount = len([result for result in results if result['exitCode'] != 0])
+    print('Converted', len(results) - failedCount, 'of', len(results), 'files.')
+    if summaryPath:
+        summary = {
+            'succeeded': len(results) - failedCount,
+            'failed': failedCount,
+            'time': time.time() - startTime,
+            'jobs': results
+        }
+        with open(summaryPath, 'w') as file:
+            json.dump(summary, file, indent=2)
+    return 0 if failedCount == 0 else kConvertErrorReturnValue
+
+
+def tryProcessBatch(argumentList):
+    jobsCount = 0
+    outputFolder = ''
+    summaryPath = ''
+    inputs = []
+    arguments = []
+    argumentIndex = 0
+    while argumentIndex < len(argumentList):
+        argument = argumentList[argumentIndex]
+        argumentIndex += 1
+        if argument == '--':
+            arguments = argumentList[argumentIndex:]
+            break
+        elif argument in ['-jobs', '-outputFolder', '-summary']:
+            if argumentIndex >= len(argumentList):
+                usdUtils.printError('expected value for argument ' + argument)
+                return kConvertErrorReturnValue
+            value = argumentList[argumentIndex]
+            argumentIndex += 1
+            if argument == '-jobs':
+                if not value.isdigit():
+                    usdUtils.printError('expected integer value for argument ' + argument)
+                    return kConvertErrorReturnValue
+                jobsCount = int(value)
+            elif argument == '-outputFolder':
+                outputFolder = value
+            else:
+                summaryPath = value
+        else:
+            inputs.append(argument)
+
+    if len(inputs) == 0:
+        usdUtils.printError('no inputs for batch conversion.')
+        return kConvertErrorReturnValue
+    return convertBatch(inputs, arguments, jobsCount, outputFolder, summaryPath)
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '-batch':
+        return tryProcessBatch(sys.argv[2:])
     return tryProcess(sys.argv[1:])
 
 
@@ -0,0 +1,484 @@
+#!/usr/bin/python
+import os.path
+import sys
+import json
+import time
+import socket
+import signal
+import stat
+import tempfile
+import threading
+import importlib
+import multiprocessing
+from shutil import rmtree
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver
+
+kConvertErrorReturnValue = 2
+kTerminateTimeout = 10 # in seconds, before cancelled conversion is killed
+
+
+def getDefaultSocketPath():
+    # socket is in folder of this user, other users can't create or replace it
+    runtimeFolder = os.environ.get('XDG_RUNTIME_DIR', '')
+    if runtimeFolder and os.path.isdir(runtimeFolder):
+        return os.path.join(runtimeFolder, 'usdzconvert.sock')
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return os.path.join(tempfile.gettempdir(), 'usdzconvert-' + str(uid), 'server.sock')
+
+
+kDefaultSocketPath = getDefaultSocketPath()
+
+# Protocol: client sends one JSON line per request, server answers with JSON lines
+#   request:  {"command": "convert", "arguments": [...], "folder": cwd}
+#             {"command": "cancel"} while conversion is running
+#             {"command": "ping"}, {"command": "stop"}
+#   answers:  {"type": "progress", "message": line} for each printed line
+#             {"type": "result", "exitCode": 0, "error": "", "cancelled": false, "time": seconds}
+
+
+def warmUp(verbose):
+    # modules are imported once by launcher and inherited by forked conversion processes
+    usdzconvert = importlib.import_module('usdzconvert')
+    usdzconvert.getARKitChecker()
+    for name in ['usdStageWithObj', 'usdStageWithGlTF', 'usdStageWithFbx', 'iOS12LegacyModifier']:
+        try:
+            importlib.import_module(name)
+        except (ImportError, SyntaxError):
+            # converter module can be unavailable or not supported by this Python version
+            if verbose:
+                print('Module ' + name + ' is not available.')
+
+
+def getProcessContext():
+    # fork keeps warm modules in conversion processes, it is not available on Windows
+    if hasattr(multiprocessing, 'get_context'):
+        if 'fork' in multiprocessing.get_all_start_methods():
+            return multiprocessing.get_context('fork')
+    return multiprocessing
+
+
+
+class ProgressWriter:
+    def __init__(self, file):
+        self.file = file
+        self.line = ''
+
+
+    def write(self, text):
+        self.line += text
+        while '\n' in self.line:
+            line, self.line = self.line.split('\n', 1)
+            self.send({'type': 'progress', 'message': line})
+
+
+    def send(self, message):
+        self.file.write((json.dumps(message) + '\n').encode('utf-8'))
+        self.file.flush()
+
+
+    def flush(self):
+        pass
+
+
+
+def runConversion(arguments, folder, jobFolder, address):
+    # runs in conversion process, printed lines and result are sent to request handler by job socket
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.connect(address)
+    writer = ProgressWriter(connection.makefile('wb'))
+    sys.stdout = writer
+    sys.stderr = writer
+    # cancellation unwinds conversion, so it removes its temporary files
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(kConvertErrorReturnValue))
+    error = ''
+    try:
+        os.chdir(folder)
+        usdzconvert = importlib.import_module('usdzconvert')
+        exitCode = usdzconvert.Converter(folder, jobFolder).tryProcess(arguments)
+    except Exception as e:
+        exitCode = kConvertErrorReturnValue
+        error = str(e)
+    if writer.line:
+        writer.write('\n')
+    writer.send({'type': 'result', 'exitCode': exitCode, 'error': error})
+    connection.close()
+
+
+def runLauncher(connection, serverConnection, verbose):
+    # single threaded process which forks conversions, so fork doesn't copy locks held by server threads
+    # interrupt stops server, which closes connection to launcher
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # forked copy of server end of connection would keep connection open
+    serverConnection.close()
+    warmUp(verbose)
+    connection.send('ready')
+    context = getProcessContext()
+    while True:
+        # finished conversions are joined by active_children
+        context.active_children()
+        if not connection.poll(1):
+            continue
+        try:
+            arguments, folder, jobFolder, address = connection.recv()
+        except EOFError:
+            break
+        worker = context.Process(target=runConversion, args=(arguments, folder, jobFolder, address))
+        worker.start()
+        connection.send(worker.pid)
+    for worker in context.active_children():
+        worker.terminate()
+
+
+
+class Launcher:
+    def __init__(self, verbose):
+        context = getProcessContext()
+        self.connection, launcherConnection = context.Pipe()
+        # launcher isn't daemon process, because it has children, it exits when connection is closed
+        self.process = context.Process(target=runLauncher, args=(launcherConnection, self.connection, verbose))
+        self.process.start()
+        launcherConnection.close()
+        self.lock = threading.Lock()
+        try:
+            self.connection.recv()
+        except EOFError:
+            self.process.join()
+            raise RuntimeError('usdzconvert server failed to load modules')
+
+
+    def start(self, arguments, folder, jobFolder, address):
+        # returns process id of conversion, or None if launcher is not running
+        with self.lock:
+            try:
+                self.connection.send((arguments, folder, jobFolder, address))
+                return self.connection.recv()
+            except (IOError, OSError, EOFError):
+                return None
+
+
+    def stop(self):
+        self.connection.close()
+        self.process.join()
+
+
+
+def isProcessRunning(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def send(self, message):
+        try:
+            self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+            self.wfile.flush()
+            return True
+        except (IOError, OSError, socket.error):
+            return False
+
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line.decode('utf-8'))
+        except ValueError:
+            self.send({'type': 'result', 'exitCode': kConvertErrorReturnValue, 'error': 'invalid request'})
+            return
+
+        command = request.get('command', '')
+        if command == 'ping':
+            self.send({'type': 'result', 'exitCode': 0, 'error': ''})
+        elif command == 'stop':
+            self.send({'type': 'result', 'exitCode': 0, 'error': ''})
+            threading.Thread(target=self.server.shutdown).start()
+        elif command == 'convert':
+            self.convert(request.get('arguments', []), request.get('folder', os.getcwd()))
+        else:
+            self.send({'type': 'result', 'exitCode': kConvertErrorReturnValue, 'error': 'unknown command ' + str(command)})
+
+
+    def watchCancellation(self, pid, finished, cancelled):
+        # client cancels with cancel command or by closing connection
+        try:
+            while not finished.is_set():
+                line = self.rfile.readline()
+                if not line or json.loads(line.decode('utf-8')).get('command') == 'cancel':
+                    break
+        except (IOError, OSError, ValueError, socket.error):
+            pass
+        if finished.is_set():
+            return
+        cancelled.set()
+        try:
+            os.kill(pid, signal.SIGTERM)
+            if not finished.wait(kTerminateTimeout):
+                os.kill(pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+
+    def acceptConversion(self, listener, pid):
+        # conversion process connects to job socket, or exits before it
+        listener.settimeout(1)
+        while True:
+            try:
+                connection, address = listener.accept()
+                connection.settimeout(None)
+                return connection
+            except socket.timeout:
+                if not isProcessRunning(pid):
+                    return None
+
+
+    def convert(self, arguments, folder):
+        startTime = time.time()
+        # each conversion has own temporary folder, it is removed with everything left by cancelled conversion
+        jobFolder = tempfile.mkdtemp('usdzconvert-job')
+        result = {'type': 'result', 'exitCode': kConvertErrorReturnValue, 'error': 'conversion process exited unexpectedly'}
+        cancelled = threading.Event()
+        try:
+            address = os.path.join(jobFolder, 'job.sock')
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(address)
+            listener.listen(1)
+            pid = self.server.launcher.start(arguments, folder, jobFolder, address)
+            connection = None
+            if pid is None:
+                result['error'] = 'conversion launcher is not running'
+            else:
+                connection = self.acceptConversion(listener, pid)
+            listener.close()
+
+            if connection is not None:
+                finished = threading.Event()
+                watcher = threading.Thread(target=self.watchCancellation, args=(pid, finished, cancelled))
+                watcher.daemon = True
+                watcher.start()
+
+                # job socket is closed when conversion process exits
+                file = connection.makefile('rb')
+                for line in file:
+                    message = json.loads(line.decode('utf-8'))
+                    if message['type'] == 'progress':
+                        self.send(message)
+                    else:
+                        result['exitCode'] = message['exitCode']
+                        result['error'] = message['error']
+                file.close()
+                connection.close()
+                finished.set()
+        finally:
+            rmtree(jobFolder, ignore_errors=True)
+
+        if cancelled.is_set():
+            result['exitCode'] = kConvertErrorReturnValue
+            result['error'] = 'conversion is cancelled'
+        result['cancelled'] = cancelled.is_set()
+        result['time'] = time.time() - startTime
+        self.send(result)
+
+
+
+class ConvertServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+
+def isSecureFolder(folder):
+    # folder belongs to this user or root, and other users can't replace files in it
+    if not hasattr(os, 'getuid'):
+        return True
+    try:
+        linkStat = os.lstat(folder)
+        folderStat = os.stat(folder)
+    except OSError:
+        return False
+    owners = [0, os.getuid()]
+    if linkStat.st_uid not in owners or folderStat.st_uid not in owners or not stat.S_ISDIR(folderStat.st_mode):
+        return False
+    return (folderStat.st_mode & (stat.S_IWGRP | stat.S_IWOTH)) == 0 or (folderStat.st_mode & stat.S_ISVTX) != 0
+
+
+def isOwnSocket(socketPath):
+    # socket is created by server of this user
+    if not hasattr(os, 'getuid'):
+        return os.path.exists(socketPath)
+    try:
+        socketStat = os.lstat(socketPath)
+    except OSError:
+        return False
+    return (socketStat.st_uid == os.getuid() and stat.S_ISSOCK(socketStat.st_mode) and
+        isSecureFolder(os.path.dirname(os.path.abspath(socketPath))))
+
+
+def isServerRunning(socketPath=kDefaultSocketPath):
+    return sendRequest({'command': 'ping'}, socketPath) is not None
+
+
+def sendRequest(request, socketPath=kDefaultSocketPath, progress=None):
+    # returns result of request or None if server is not running
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    if not isOwnSocket(socketPath):
+        if os.path.lexists(socketPath):
+            print('usdzconvert server socket is not trusted, it can belong to other user: ' + socketPath)
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socketPath)
+    except socket.error:
+        client.close()
+        return None
+
+    result = None
+    try:
+        client.sendall((json.dumps(request) + '\n').encode('utf-8'))
+        file = client.makefile('rb')
+        while True:
+            try:
+                line = file.readline()
+            except KeyboardInterrupt:
+                client.sendall((json.dumps({'command': 'cancel'}) + '\n').encode('utf-8'))
+                continue
+            if not line:
+                break
+            message = json.loads(line.decode('utf-8'))
+            if message['type'] == 'progress':
+                if progress is not None:
+                    progress(message['message'])
+            else:
+                result = message
+                break
+    except (IOError, OSError, ValueError, socket.error):
+        pass
+    finally:
+        client.close()
+    return result
+
+
+def printProgress(message):
+    print(message)
+
+
+def convertWithServer(argumentList, socketPath=kDefaultSocketPath, progress=printProgress):
+    # converts by running server or in this process if server is not available
+    startTime = time.time()
+    request = {'command': 'convert', 'arguments': argumentList, 'folder': os.getcwd()}
+    result = sendRequest(request, socketPath, progress)
+    if result is not None:
+        return result
+
+    usdzconvert = importlib.import_module('usdzconvert')
+    result = {'type': 'result', 'exitCode': kConvertErrorReturnValue, 'error': '', 'cancelled': False}
+    try:
+        result['exitCode'] = usdzconvert.tryProcess(argumentList)
+    except Exception as e:
+        result['error'] = str(e)
+    result['time'] = time.time() - startTime
+    return result
+
+
+def tryProcessWithServer(argumentList, socketPath=kDefaultSocketPath):
+    return convertWithServer(argumentList, socketPath)['exitCode']
+
+
+def serve(socketPath=kDefaultSocketPath, verbose=False):
+    if not hasattr(socket, 'AF_UNIX'):
+        print('usdzconvert server needs Unix domain sockets.')
+        return kConvertErrorReturnValue
+
+    socketFolder = os.path.dirname(os.path.abspath(socketPath))
+    if socketPath == kDefaultSocketPath:
+        try:
+            if not os.path.isdir(socketFolder):
+                os.mkdir(socketFolder, 0o700)
+            os.chmod(socketFolder, 0o700)
+        except OSError:
+            # folder of other user is reported below
+            pass
+    if not isSecureFolder(socketFolder):
+        print('usdzconvert server socket folder can be changed by other users:', socketFolder)
+        return kConvertErrorReturnValue
+
+    if os.path.lexists(socketPath):
+        if not isOwnSocket(socketPath):
+            print('usdzconvert server socket belongs to other user:', socketPath)
+            return kConvertErrorReturnValue
+        if isServerRunning(socketPath):
+            print('usdzconvert server is already running:', socketPath)
+            return kConvertErrorReturnValue
+        # socket file is left by stopped server
+        os.remove(socketPath)
+
+    # launcher is started while server has only one thread
+    try:
+        launcher = Launcher(verbose)
+    except RuntimeError as e:
+        print(str(e))
+        return kConvertErrorReturnValue
+    server = ConvertServer(socketPath, RequestHandler)
+    server.launcher = launcher
+    # only this user can connect
+    os.chmod(socketPath, 0o600)
+    print('usdzconvert server is listening:', socketPath)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        launcher.stop()
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+    return 0
+
+
+def printUsage():
+    print('usage: usdzconvertServer [-socket path] [-v]\n\
+                         [-stop]\n\
+       usdzconvertServer [-socket path] -convert usdzconvert arguments\n\
+\n\
+Runs usdzconvert server which keeps modules loaded between conversions.\n\
+  -socket path          Unix socket path. Default is ' + kDefaultSocketPath + '\n\
+  -v                    Verbose output.\n\
+  -stop                 Stop running server.\n\
+  -convert arguments    Convert with running server, or in this process if\n\
+                        server is not running.')
+
+
+def main(argumentList):
+    socketPath = kDefaultSocketPath
+    verbose = False
+    argumentIndex = 0
+    while argumentIndex < len(argumentList):
+        argument = argumentList[argumentIndex]
+        argumentIndex += 1
+        if argument == '-socket' and argumentIndex < len(argumentList):
+            socketPath = argumentList[argumentIndex]
+            argumentIndex += 1
+        elif argument == '-v':
+            verbose = True
+        elif argument == '-stop':
+            if sendRequest({'command': 'stop'}, socketPath) is None:
+                print('usdzconvert server is not running:', socketPath)
+                return kConvertErrorReturnValue
+            return 0
+        elif argument == '-convert':
+            return tryProcessWithServer(argumentList[argumentIndex:], socketPath)
+        else:
+            printUsage()
+            return 0 if argument == '-h' or argument == '--help' else kConvertErrorReturnValue
+    return serve(socketPath, verbose)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
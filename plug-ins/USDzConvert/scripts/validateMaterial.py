@@ -1,7 +1,7 @@
 import argparse
 import os, shutil, sys
 
-from pxr import *
+from pxr import Sdf, UsdShade
 
 class TermColors:
     WARN = '\033[93m'
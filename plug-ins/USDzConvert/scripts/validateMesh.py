@@ -1,7 +1,7 @@
 import argparse
 import os, shutil, sys
 
-from pxr import *
+from pxr import Sdf, UsdGeom
 
 class TermColors:
 	WARN = '\033[93m'